@@ -3,6 +3,8 @@ Feature: Example Steps to use when configuring a test cases
             # Declare a container with just name and label 
             Given the container "container_name" under the label "container_label"
             Given the container "container_name" within the label "container_label"
+            # Select a container declared earlier in the scenario; declaring a container selects it
+            Given the container "container_name" is selected
             # Declare more attributes of container using a tabel
             Given the following container configuration
                   | name           | label           | status           |
@@ -56,6 +58,10 @@ Feature: Example Steps to use when configuring a test cases
                   | fromAddress | example.com |
                   | date        | 1/01/2020   |
 
+            # Generate artifacts from every row of a CSV or JSONL dataset file
+            Given artifacts generated from "datasets/domains.csv"
+            Given artifacts labeled "artifact_label" generated from "datasets/domains.jsonl"
+
 
         Scenario: Declaring Playbooks
             Given the playbook "playbook_name"
@@ -67,17 +73,32 @@ Feature: Example Steps to use when configuring a test cases
             Given the prompt "prompt_name" has the following responses:
                   | The first answer to the questions  |
                   | The second answer to the questions |
+            # Answer prompts of every playbook in the scenario, one row per prompt name and response
+            Given every playbook answers the following prompts
+                  | prompt_name | The first answer to the questions  |
+                  | prompt_name | The second answer to the questions |
      
 
         Scenario: Creating Declared & Configured Resources
              # MANDATORY: The objects must be created before anything can be ran or validated
              Then the container and artifacts are created
+             # Create every declared container at the same time
+             When every container and its artifacts are created
 
 
         Scenario: Running playbooks
              # Use this step when multiple playbooks are declared using the "Given the playbook "playbook_name" step"
              When the playbooks are run
              When the playbook "playbook_name" is ran
+             # Start playbooks without waiting, then wait on them by polling only their run records
+             When the playbook "playbook_name" is started
+             When the playbooks are started
+             Then the playbook "playbook_name" finishes within "300" seconds
+             Then the started playbooks finish within "600" seconds
+             # Run the playbook on copies of the declared container at a rate and concurrency, sampling a few for validation
+             When the playbook "playbook_name" is load tested
+                | containers | rate | concurrency | sample |
+                | 100        | 2    | 10          | 3      |
 
         Scenario: Declare and run a single playbook
              # Use this step when you only need to run a single playbook. The container/Artifacts must be created
@@ -88,6 +109,7 @@ Feature: Example Steps to use when configuring a test cases
             # This step is optional if running a playbook. After a playbook is ran, the most recent container data is
             # downloaded to the container context
              Then the results are collected
+             Then the results are collected for every container
 
         Scenario: Uploading files
              # Files must be stored inside the repository under the "resources" folder 
@@ -98,6 +120,9 @@ Feature: Example Steps to use when configuring a test cases
              Then a "color" pin is created with the text "text top of the pin"
              # Validate the color, message, and data of a pin 
              Then a "color" pin is created with the message "message" and data "data"
+             # Validate a pin by part of its message or data, or by a regular expression
+             Then a "color" pin is created containing the text "partial text"
+             Then a "color" pin is created matching the pattern "[0-9]+ domains blocked"
              # Check that a container attribute has an expected value
              Then the container has the "container_field" of "value"
              # Check that the container.data[key] has the provided list of keys and values
@@ -110,10 +135,22 @@ Feature: Example Steps to use when configuring a test cases
              Then the note "note_title" is created
              Then "comment_string" is commented
              Then the comment "comment_string" is added
+             # Match notes and comments by part of their text or a regular expression
+             Then a note with a title containing "partial title" is created
+             Then a note with a title matching "Enrichment for .*" is created
+             Then a comment containing "partial comment" is added
+             Then a comment matching ".* is currently not blocked" is added
+            # Search the words of every note and comment, such as for an indicator
+            Then a note mentions "evil.com"
+            Then a comment mentions "10.0.0.1"
 
         Scenario: Switching Container context
             # Use this step if your process creates a second container that needs checks ran against it. 
              Then a container is created under the label "container_label"
+             # Run any validation against a declared container by name
+             Then in the container "container_name", the note "note_title" is created
+             # Delete every container in the scenario, or tag the scenario with @cleanup
+             Then every container is deleted
     
 
         Scenario: Validating Artifacts
@@ -127,8 +164,11 @@ Feature: Example Steps to use when configuring a test cases
              Then the artifact "artifact_name" has the cef "cef_key_name" key
              # Check that an artifact's CEF does not have a given key  
              Then the artifact "artifact_name" does not have the cef "cef_key"
-             # Check that a quantity of labeled artifacts exist. Useful when multiple artifacts are created
+             # Check the quantity of artifacts by label, name, cef key, or tag using "at least", "exactly", or "at most"
              Then there are at least "quantity" artifacts labeled "artifact_label"
+             Then there are exactly "quantity" artifacts named "artifact_name"
+             Then there are at most "quantity" artifacts with the cef "cef_key" key
+             Then there are at least "quantity" artifacts tagged "tag_name"
 
 
         Scenario: Validating Playbooks
@@ -146,16 +186,33 @@ Feature: Example Steps to use when configuring a test cases
              Then the action "action_name" is "status"
             # Validate that a given action was not ran 
              Then the action "action_name" did not run
+            # Validate that a finished playbook ran within a number of seconds, from its start until its last update
+             Then the playbook "playbook_name" completes within "30" seconds
+            # Validate that every run of an action took less than a number of seconds
+             Then the action "action_name" takes less than "5" seconds
+            # Run a validation on every container sampled by a load test
+             Then on every sampled container, the artifact "artifact_name" has the "tags" of "[tag]"
+            # Check the results of a load test
+             Then the load test success rate is at least "99" percent
+             Then the load test "p95" latency is below "120" seconds
+             Then the load test sustains at least "30" containers per minute
             # Validate that an action has a value
              Then the action "action_name" has the "field" below
                 """
         Example body of text
                 """
              Then the action "action_name" has the "field" of "value"
+            # Search the words of every action result, such as for an indicator
+             Then an action result contains "10.0.0.1"
+             Then the action "action_name" result contains "evil.com"
+             Then no action result contains "10.0.0.1"
 
         Scenario: Miscellanous Steps
-            # Use this step to force the browser to open and see the code objects inside the terminal 
+            # Stop the test and write the container to debug/container_<id>.json.gz
              Then debug
+            # Save the container to a snapshot and load it again for offline validation
+             Then the container is saved to "snapshots/container.json.gz"
+            Given the container snapshot "snapshots/container.json.gz"
              Then open the browser
             # Open the browser without failing the running test case
              Then the browser is opened
@@ -1,9 +1,30 @@
 from soarsdk.objects import Container
 from soarsdk.client import PhantomClient
 from behave.runner import Context
-from behave.model import Scenario, Step
+from behave.model import Feature, Scenario, Step
 import steps.utility_functions as utils
+import os
+from typing import Optional
 import re
+import sys
+
+# Hooks import the library modules by name, the same way the step files import each other
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "steps"))
+import scenario_timings as timings
+import request_scheduler as scheduling
+import connection_pool as pooling
+import playbook_cache as caching
+import prompt_policy as prompts
+import scenario_metrics as metrics
+import sampling_profiler as profiling
+import warm_start as warming
+import outline_batch as batching
+import fetch_planner as planning
+import container_index as containers
+import preflight as preflighting
+import watchdog as watching
+import change_selection as changes
+import run_history as history
 
 # Optional configuration step
 # def after_scenario(context, scenario):
@@ -14,22 +35,250 @@ import re
 def before_all(context: Context):
     context.replacement_vars: dict = {}
 
+    # Durations are only recorded when a timings file is requested, e.g. by the parallel runner
+    timings_file: str = context.config.userdata.get("timings_file")
+    context.scenario_timings = (
+        timings.ScenarioTimings(timings_file).load() if timings_file else None
+    )
+    # Client side rate limiting, enabled with -D rate_limit=<requests per second>
+    context.request_scheduler = scheduling.RequestScheduler.from_userdata(
+        context.config.userdata
+    )
+    # Suite scoped keep-alive session shared by every scenario, enabled with -D soar_url=... or SOAR_URL
+    context.connection_pool = pooling.SoarConnectionPool.from_config(
+        context.config.userdata, scheduler=context.request_scheduler
+    )
+    # Prompt responses for every playbook, compiled once from -D prompt_policy=<file.json>
+    policy_file: str = context.config.userdata.get("prompt_policy")
+    context.prompt_policy = (
+        prompts.PromptPolicy.from_file(policy_file) if policy_file else None
+    )
+    # Cached playbook results for @cacheable scenarios, enabled with -D playbook_cache=<directory>
+    cache_directory: str = context.config.userdata.get("playbook_cache")
+    context.playbook_cache = (
+        caching.PlaybookCache(cache_directory) if cache_directory else None
+    )
+    # Results collections only download what the following steps read, disabled with -D fetch_plan=false
+    context.fetch_planner = (
+        None
+        if str(context.config.userdata.get("fetch_plan", "true")).lower() in ("0", "false", "no")
+        else planning.FetchPlanner()
+    )
+    # Packed containers of @batch Scenario Outlines, shared by their Examples rows
+    context.outline_batches: dict = {}
+    # Containers shared by the @read_only scenarios of a feature, enabled with -D warm_start=true
+    context.warm_start = (
+        warming.WarmStart()
+        if str(context.config.userdata.get("warm_start", "")).lower() in ("1", "true", "yes")
+        else None
+    )
+    # Time limits of every step and scenario, enabled with -D step_timeout=<seconds> and/or -D scenario_timeout=<seconds>
+    context.watchdog = watching.ScenarioWatchdog.from_userdata(context.config.userdata)
+    if context.watchdog:
+        utils.wrap_step_calls(context, context.watchdog.call)
+    # Every scenario and step of the run is stored in -D history_db=<file.sqlite>. Parallel workers given the same
+    # -D history_run=<label> share one run
+    history_db: str = context.config.userdata.get("history_db")
+    context.run_history = history.RunHistory(history_db) if history_db else None
+    if context.run_history:
+        context.run_history.start_run(context.config.userdata.get("history_run"), sys.argv[1:])
+    client = context.connection_pool.client() if context.connection_pool else None
+    # Fingerprints of every scenario stored in -D change_map=<file.json>. With -D select_changed=true, scenarios that
+    # passed last time and haven't changed since are skipped
+    change_map: str = context.config.userdata.get("change_map")
+    context.change_selection = (
+        changes.ChangeSelection(
+            change_map,
+            select=str(context.config.userdata.get("select_changed", "")).lower() in ("1", "true", "yes"),
+        ).load()
+        if change_map
+        else None
+    )
+    if context.change_selection:
+        context.change_selection.prepare(context, client, context._runner.features)
+    # Playbooks and container labels of the selected scenarios must exist, checked before any container is created.
+    # Disabled with -D preflight=false
+    context.preflight = None
+    if client and str(context.config.userdata.get("preflight", "true")).lower() not in ("0", "false", "no"):
+        context.preflight = preflighting.Preflight().run(context, client, context._runner.features)
+        if context.fetch_planner:
+            # Result collections name the playbook runs without looking up each playbook again
+            context.fetch_planner.playbook_names.update(context.preflight.playbook_names)
+
+
+def after_all(context: Context):
+    if context.scenario_timings:
+        context.scenario_timings.save()
+    if context.change_selection:
+        context.change_selection.save()
+        print(f"Change based selection: {context.change_selection.metrics()}")
+    if context.run_history:
+        context.run_history.finish_run()
+        print(f"Run history: {context.run_history.recorded} scenarios recorded in {context.run_history.path}")
+        context.run_history.close()
+    if context.request_scheduler:
+        print(f"SOAR request scheduler: {context.request_scheduler.metrics()}")
+    if context.prompt_policy:
+        print(f"Prompt policy answers: {context.prompt_policy.metrics()}")
+    if context.playbook_cache:
+        print(f"Playbook result cache: {context.playbook_cache.metrics()}")
+    if context.warm_start:
+        print(f"Warm started containers: {context.warm_start.metrics()}")
+    if context.watchdog:
+        print(f"Scenario watchdog: {context.watchdog.metrics()}")
+    if context.preflight:
+        print(f"Preflight: {context.preflight.metrics()}")
+    if context.fetch_planner:
+        print(f"Planned result collections: {context.fetch_planner.metrics()}")
+    if context.connection_pool:
+        context.connection_pool.close()
+
+
+def after_feature(context: Context, feature: Feature) -> None:
+    client = context.connection_pool.client() if context.connection_pool else None
+    if context.warm_start:
+        context.warm_start.release(client)
+    for _, batch in context.outline_batches.values():
+        if batch.cleanup and batch.container and batch.container.id and client:
+            client.delete_container(batch.container)
+    context.outline_batches.clear()
+
 
 def before_scenario(context: Context, scenario: Scenario) -> None:
     """Initializes replacement variables and establishes a connection"""
-    context.phantom = None
+    if context.watchdog:
+        context.watchdog.start_scenario()
+    # Scenarios tagged @profile, or every scenario with -D profile=true, are sampled into -D profile_dir
+    if profiling.PROFILE_TAG in scenario.effective_tags or str(
+        context.config.userdata.get("profile", "")
+    ).lower() in ("1", "true", "yes"):
+        context.profiler = profiling.SamplingProfiler(
+            interval=float(context.config.userdata.get("profile_interval", 0.005))
+        ).start()
+
+    # Scenarios tagged @offline only validate saved container snapshots
+    if "offline" in scenario.effective_tags:
+        context.phantom = None
+        return
+
+    context.phantom = (
+        context.connection_pool.client() if context.connection_pool else None
+    )
 
     if not context.phantom:
         raise NotImplementedError(
             f"Authentication and connection details not implemented in the environment.py file"
         )
 
+    # The connection pool already routes its session through the scheduler
+    if context.request_scheduler and not context.connection_pool:
+        scheduling.install(context.phantom.session, context.request_scheduler)
+
+    if context.prompt_policy:
+        context.prompt_policy.install(context.phantom)
+
+    # Per scenario SOAR load, reported by the soar_formatter formatters
+    context.scenario_metrics = metrics.ScenarioMetrics()
+    context.scenario_metrics.install(context.phantom)
+
 
 def before_step(context: Context, step: Step) -> None:
+    if getattr(context, "profiler", None):
+        context.profiler.label = f"{step.keyword} {step.name}"
     if hasattr(context, "container"):
         utils.context_variable_replacement(context.container, context.replacement_vars)
+    # Refresh a container changed by earlier steps once, and fetch what the last results collection left out
+    if context.fetch_planner and getattr(context, "phantom", None):
+        context.fetch_planner.ensure(
+            context, step, refresh=lambda: containers.refresh_container(context)
+        )
+    # Armed last so a timeout can only interrupt the step itself. The runs are cancelled from the watchdog's thread
+    # with a client of its own, since the step may be using the scenario's session
+    if context.watchdog and getattr(context, "phantom", None):
+        context.watchdog.arm(
+            step,
+            cancel=lambda: watching.cancel_active_runs(
+                context.connection_pool.client() if context.connection_pool else context.phantom,
+                metrics.scenario_containers(context),
+            ),
+            waits=watching.wait_seconds(context, step),
+        )
 
 
 def after_step(context: Context, step: Step) -> None:
+    timeout: Optional[dict] = context.watchdog.disarm(step) if context.watchdog else None
     if hasattr(context, "container"):
         utils.context_variable_replacement(context.container, context.replacement_vars)
+    if context.fetch_planner:
+        step_function = planning.step_function(context, step)
+        if getattr(step_function, "soar_refreshes", False):
+            context.fetch_planner.complete(getattr(context, "container", None))
+        elif getattr(step_function, "soar_mutates", False):
+            context.fetch_planner.mark_stale(getattr(context, "container", None))
+    # Fails a timed out step that caught the watchdog's exception and kept going
+    if timeout and step.status != "failed":
+        raise watching.ScenarioTimeout(watching.describe(timeout))
+
+
+def after_scenario(context: Context, scenario: Scenario) -> None:
+    scenario_metrics = getattr(context, "scenario_metrics", None)
+    if scenario_metrics:
+        scenario.soar_metrics = scenario_metrics.as_dict(
+            metrics.scenario_containers(context)
+        )
+        scenario_metrics.uninstall()
+    if getattr(context, "load_test", None):
+        scenario.soar_metrics = {
+            **getattr(scenario, "soar_metrics", {}),
+            "load_test": context.load_test.report(),
+        }
+
+    profiler = getattr(context, "profiler", None)
+    if profiler:
+        profiler.stop()
+        profiler.write(
+            profiling.profile_path(
+                context.config.userdata.get("profile_dir", "profiles"),
+                scenario.filename,
+                scenario.line,
+                scenario.name,
+            )
+        )
+
+    if context.fetch_planner:
+        context.fetch_planner.reset()
+
+    # Scenarios tagged @cleanup, and scenarios stopped by the watchdog, delete every container they created
+    timed_out: bool = bool(context.watchdog and context.watchdog.timeout)
+    if timed_out:
+        scenario.soar_metrics = {
+            **getattr(scenario, "soar_metrics", {}),
+            "watchdog": context.watchdog.timeout,
+        }
+    if (
+        ("cleanup" in scenario.effective_tags or timed_out)
+        and getattr(context, "containers", None)
+        and context.phantom
+    ):
+        # Warm started containers are deleted once the feature is finished
+        context.containers.delete_all(
+            context.phantom,
+            skip=lambda container: bool(
+                context.warm_start and context.warm_start.is_template(container)
+            )
+            or batching.batch_of(context, container) is not None,
+        )
+
+    if context.change_selection:
+        context.change_selection.record(context, scenario)
+
+    if context.scenario_timings and scenario.status != "skipped":
+        context.scenario_timings.record(
+            timings.scenario_key(scenario.filename, scenario.name), scenario.duration
+        )
+    if context.run_history and scenario.status != "skipped":
+        context.run_history.record_scenario(
+            timings.scenario_key(scenario.filename, scenario.name),
+            scenario,
+            getattr(scenario, "soar_metrics", None),
+        )
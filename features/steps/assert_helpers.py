@@ -55,3 +55,33 @@ def check_playbook_actions(playbooks, action_name, playbook_name=None):
                 if action.name == action_name and action.status == "success":
                     return action.status
     return False
+
+
+QUANTITY_COMPARISONS: dict = {
+    "at least": lambda actual, expected: actual >= expected,
+    "exactly": lambda actual, expected: actual == expected,
+    "at most": lambda actual, expected: actual <= expected,
+}
+
+
+def assert_quantity(actual: int, comparison: str, quantity: str, description: str) -> None:
+    """Compares a counted quantity against the expected quantity of a step
+
+    Args:
+        actual (int): Counted quantity
+        comparison (str): One of "at least", "exactly", or "at most"
+        quantity (str): Expected quantity from the step
+        description (str): Description of what was counted, used in the error message
+
+    Raises:
+        ValueError: If the comparison isn't supported
+        AssertionError: If the counted quantity doesn't satisfy the comparison
+    """
+    if comparison not in QUANTITY_COMPARISONS:
+        raise ValueError(
+            f'Unsupported comparison "{comparison}". Use one of {list(QUANTITY_COMPARISONS)}'
+        )
+    if not QUANTITY_COMPARISONS[comparison](actual, int(quantity)):
+        raise AssertionError(
+            f"Expected {comparison} {quantity} {description}, but found {actual}"
+        )
@@ -0,0 +1,146 @@
+import json
+from typing import Any
+
+"""
+Structural comparison of expected table values against nested CEF or container data dictionaries. The comparison
+never modifies the downloaded objects and reports every difference found in a single traversal.
+"""
+
+_LITERALS: dict = {"true": True, "false": False, "null": None, "none": None}
+
+
+class Difference:
+    MISSING: str = "missing"
+    CHANGED: str = "changed"
+    UNEXPECTED: str = "unexpected"
+
+    def __init__(self, path: str, kind: str, expected: Any = None, actual: Any = None):
+        """A single difference between the expected and actual structures
+
+        Args:
+            path (str): Dotted path of the key, list positions are written as [index]
+            kind (str): missing, changed, or unexpected
+            expected (Any): Expected value at the path
+            actual (Any): Actual value at the path
+        """
+        self.path: str = path
+        self.kind: str = kind
+        self.expected: Any = expected
+        self.actual: Any = actual
+
+    def __str__(self) -> str:
+        if self.kind == Difference.MISSING:
+            return f"{self.path}: missing (expected {self.expected!r})"
+        if self.kind == Difference.UNEXPECTED:
+            return f"{self.path}: unexpected (actual {self.actual!r})"
+        return f"{self.path}: expected {self.expected!r} | actual {self.actual!r}"
+
+    def __repr__(self) -> str:
+        return f"Difference({self})"
+
+
+def coerce_cell(value: Any) -> Any:
+    """Converts a table cell to the python type it represents. Numbers are only converted when the conversion
+    is lossless (e.g. "007" stays a string), JSON objects and lists are parsed.
+    """
+    if not isinstance(value, str):
+        return value
+    stripped: str = value.strip()
+    if stripped.lower() in _LITERALS:
+        return _LITERALS[stripped.lower()]
+    if stripped[:1] in ("{", "[") and stripped[-1:] in ("}", "]"):
+        try:
+            return json.loads(stripped)
+        except ValueError:
+            return value
+    for number_type in (int, float):
+        try:
+            number = number_type(stripped)
+        except ValueError:
+            continue
+        if str(number) == stripped:
+            return number
+    return value
+
+
+def _as_text(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+
+
+def _leaf_equal(expected: Any, actual: Any) -> bool:
+    """Leaves match when equal, or when their text forms match (e.g. 8080 and "8080", True and "true")"""
+    return expected == actual or _as_text(expected) == _as_text(actual)
+
+
+def structural_diff(expected: Any, actual: Any, root: str = "", strict: bool = False) -> list[Difference]:
+    """Computes every difference between the expected and actual structures in one traversal
+
+    Args:
+        expected (Any): Expected values, e.g. a table as a dictionary. Table cells are compared as written first and
+            coerced with coerce_cell() only when the text doesn't match
+        actual (Any): Actual values from the downloaded object. Never modified
+        root (str): Path prefix used in the report
+        strict (bool): Report keys present in actual but absent from expected
+
+    Returns:
+        differences (list[Difference]): Empty when the structures match
+    """
+    differences: list[Difference] = []
+    pending: list[tuple[Any, Any, str]] = [(expected, actual, root)]
+
+    while pending:
+        expected_value, actual_value, path = pending.pop()
+
+        # Identical subtrees are skipped without descending into them
+        if expected_value is actual_value or expected_value == actual_value:
+            continue
+
+        if isinstance(expected_value, dict) and isinstance(actual_value, dict):
+            for key in reversed(list(expected_value)):
+                key_path: str = f"{path}.{key}" if path else str(key)
+                if key not in actual_value:
+                    differences.append(
+                        Difference(key_path, Difference.MISSING, expected=expected_value[key])
+                    )
+                else:
+                    pending.append((expected_value[key], actual_value[key], key_path))
+            if strict:
+                for key in sorted(actual_value.keys() - expected_value.keys(), key=str):
+                    key_path = f"{path}.{key}" if path else str(key)
+                    differences.append(
+                        Difference(key_path, Difference.UNEXPECTED, actual=actual_value[key])
+                    )
+        elif (
+            isinstance(expected_value, list)
+            and isinstance(actual_value, list)
+            and len(expected_value) == len(actual_value)
+        ):
+            for position in reversed(range(len(expected_value))):
+                pending.append(
+                    (expected_value[position], actual_value[position], f"{path}[{position}]")
+                )
+        elif isinstance(expected_value, str) and not isinstance(actual_value, str):
+            # The cell text didn't match, compare the value it represents, e.g. "8080" or '{"port": 8080}'
+            coerced: Any = coerce_cell(expected_value)
+            if isinstance(coerced, (dict, list)):
+                pending.append((coerced, actual_value, path))
+            elif not _leaf_equal(coerced, actual_value):
+                differences.append(
+                    Difference(path or "<root>", Difference.CHANGED, coerced, actual_value)
+                )
+        elif isinstance(expected_value, (dict, list)) or not _leaf_equal(
+            expected_value, actual_value
+        ):
+            differences.append(
+                Difference(path or "<root>", Difference.CHANGED, expected_value, actual_value)
+            )
+
+    return differences
+
+
+def format_diff(differences: list[Difference], limit: int = 25) -> str:
+    """Compact multi-line report of the differences"""
+    lines: list[str] = [f"  {difference}" for difference in differences[:limit]]
+    if len(differences) > limit:
+        lines.append(f"  ... {len(differences) - limit} more differences")
+    return "\n".join(lines)
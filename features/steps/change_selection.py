@@ -0,0 +1,231 @@
+import json
+import os
+from typing import Iterable, Optional
+from behave.model import Feature, Scenario
+from behave.runner import Context
+from soarsdk.client import PhantomClient
+from playbook_cache import PLAYBOOK_VERSION_FIELDS, canonical_digest, file_digest
+from preflight import BATCH_SIZE, PLAYBOOKS, step_references
+from scenario_metrics import scenario_containers
+from scenario_timings import scenario_key
+import utility_functions as utils
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - file locking is unavailable on Windows
+    fcntl = None
+
+"""
+Module to run only the scenarios a change can affect. Every run stores, per scenario, the playbooks it used, digests of
+its steps, of the step definition modules its steps match, of the other library modules, and of the versions of its
+playbooks on the server, together with its outcome. With selection enabled, scenarios whose digests all match a passing
+run are skipped, and scenarios that failed or never ran are ordered first.
+"""
+
+
+def _bare_name(playbook_name: str) -> str:
+    # Playbooks may be referenced with their repository, e.g. local/triage_blocked_domains
+    return playbook_name.split("/")[-1]
+
+
+def playbook_versions(client: PhantomClient, names: Iterable[str]) -> dict[str, str]:
+    """Digest of the version fields of every playbook, queried in batches of names. Playbooks missing on the server
+    get the digest of no records
+    """
+    wanted: list[str] = sorted({_bare_name(name) for name in names})
+    records: dict[str, list[dict]] = {name: [] for name in wanted}
+    for start in range(0, len(wanted), BATCH_SIZE):
+        for record in client._handle_request(
+            method="GET",
+            url="playbook?",
+            params={"_filter_name__in": json.dumps(wanted[start : start + BATCH_SIZE]), "page_size": 0},
+            return_data_only=True,
+        ) or []:
+            records.setdefault(record.get("name"), []).append(
+                {field: record.get(field) for field in PLAYBOOK_VERSION_FIELDS}
+            )
+    return {
+        name: canonical_digest(sorted(records.get(_bare_name(name), []), key=lambda record: str(record.get("id"))))
+        for name in names
+    }
+
+
+def scenario_digest(scenario: Scenario) -> str:
+    """Digest of the tags and steps of a scenario, background steps and tables included"""
+    return canonical_digest(
+        {
+            "tags": sorted(scenario.effective_tags),
+            "steps": [
+                [
+                    step.keyword,
+                    step.name,
+                    step.text,
+                    [step.table.headings, [list(row) for row in step.table]] if step.table else None,
+                ]
+                for step in scenario.all_steps
+            ],
+        }
+    )
+
+
+def step_modules(context: Context) -> set[str]:
+    """Files of every registered step definition"""
+    return {os.path.abspath(function.__code__.co_filename) for function in utils.step_definitions(context)}
+
+
+def support_digest(modules: set[str]) -> str:
+    """Digest of environment.py and the library modules that don't define steps. Changing them can affect any scenario"""
+    steps_directory: str = os.path.dirname(os.path.abspath(__file__))
+    paths: list[str] = [os.path.join(os.path.dirname(steps_directory), "environment.py")] + [
+        os.path.join(steps_directory, name) for name in os.listdir(steps_directory) if name.endswith(".py")
+    ]
+    return canonical_digest(
+        {
+            os.path.basename(path): file_digest(path)
+            for path in sorted(paths)
+            if os.path.exists(path) and os.path.abspath(path) not in modules
+        }
+    )
+
+
+class ChangeSelection:
+    def __init__(self, path: str, select: bool = False):
+        """Scenario fingerprints stored between runs inside of a JSON file
+
+        Args:
+            path (str): Location of the change map
+            select (bool): Skip the scenarios that haven't changed since they last passed
+
+        Attributes:
+            entries (dict): Scenario key to the fingerprint and status of its last run
+            fingerprints (dict): Scenario key to the fingerprint of this run
+        """
+        self.path: str = path
+        self.select: bool = select
+        self.entries: dict[str, dict] = {}
+        self.fingerprints: dict[str, dict] = {}
+        self.skipped: int = 0
+        self.changed: int = 0
+        self._recorded: dict[str, dict] = {}
+
+    def load(self) -> "ChangeSelection":
+        """Reads the change map if it exists"""
+        self.entries = self._read()
+        return self
+
+    def is_changed(self, key: str) -> bool:
+        """True when the scenario never passed or anything it depends on differs from its last run"""
+        previous: Optional[dict] = self.entries.get(key)
+        current: dict = self.fingerprints[key]
+        if not previous or previous.get("status") != "passed":
+            return True
+        return any(previous.get(field) != current[field] for field in ("scenario", "modules", "support")) or any(
+            previous.get("playbooks", {}).get(name) != version for name, version in current["playbooks"].items()
+        )
+
+    def prepare(self, context: Context, client: Optional[PhantomClient], features: list[Feature]) -> None:
+        """Fingerprints every selected scenario, skips the unchanged ones when selecting, and moves the scenarios that
+        failed or never ran to the front of the run
+        """
+        modules: set[str] = step_modules(context)
+        support: str = support_digest(modules)
+        scenarios: dict[str, Scenario] = {}
+        references: dict[str, set[str]] = {}
+        module_files: dict[str, set[str]] = {}
+        for feature in features:
+            for scenario in feature.walk_scenarios():
+                if not scenario.should_run(context.config):
+                    continue
+                key: str = scenario_key(scenario.filename, scenario.name)
+                scenarios[key] = scenario
+                references[key] = set(self.entries.get(key, {}).get("playbooks", {}))
+                module_files[key] = set()
+                for step in scenario.all_steps:
+                    references[key] |= step_references(context, step)[PLAYBOOKS]
+                    match = utils.step_match(context, step)
+                    if match:
+                        module_files[key].add(os.path.abspath(match.func.__code__.co_filename))
+
+        names: set[str] = set().union(*references.values()) if references else set()
+        versions: dict[str, str] = playbook_versions(client, names) if client and names else {}
+        for key, scenario in scenarios.items():
+            self.fingerprints[key] = {
+                "scenario": scenario_digest(scenario),
+                "modules": {os.path.basename(path): file_digest(path) for path in sorted(module_files[key])},
+                "support": support,
+                "playbooks": {name: versions.get(name) for name in sorted(references[key])},
+            }
+            if self.is_changed(key):
+                self.changed += 1
+            elif self.select:
+                scenario.skip()
+                scenario.skip_reason = "unchanged since its last passing run"
+                self.skipped += 1
+
+        if self.select:
+            self.order(features)
+
+    def order(self, features: list[Feature]) -> None:
+        """Runs features and scenarios with a failed or new scenario first, keeping the order otherwise"""
+
+        def settled(scenario: Scenario) -> bool:
+            rows: list[Scenario] = getattr(scenario, "scenarios", None) or [scenario]
+            return all(
+                self.entries.get(scenario_key(row.filename, row.name), {}).get("status") == "passed" for row in rows
+            )
+
+        for feature in features:
+            feature.scenarios.sort(key=settled)
+        features.sort(key=lambda feature: all(settled(scenario) for scenario in feature.scenarios))
+
+    def record(self, context: Context, scenario: Scenario) -> None:
+        """Stores the fingerprint and outcome of a finished scenario, with every playbook that ran on its containers.
+        Playbooks first seen here are versioned by the next run. Entries are written with save()
+        """
+        key: str = scenario_key(scenario.filename, scenario.name)
+        fingerprint: Optional[dict] = self.fingerprints.get(key)
+        if fingerprint is None or scenario.status not in ("passed", "failed"):
+            return
+        playbooks: dict[str, Optional[str]] = dict(fingerprint["playbooks"])
+        for container in scenario_containers(context):
+            for playbook in container.playbooks:
+                if playbook.name and (playbook.run_id or playbook.id):
+                    playbooks.setdefault(playbook.name, None)
+        self._recorded[key] = {**fingerprint, "playbooks": playbooks, "status": str(scenario.status.name)}
+
+    def save(self) -> None:
+        """Merges the recorded scenarios into the change map. The file is locked while merging so several behave
+        processes can share it
+        """
+        if not self._recorded:
+            return
+
+        lock_path: str = self.path + ".lock"
+        with open(lock_path, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                stored: dict[str, dict] = self._read()
+                stored.update(self._recorded)
+                temp_path: str = f"{self.path}.{os.getpid()}.tmp"
+                with open(temp_path, "w") as map_file:
+                    json.dump(stored, map_file, indent=2, sort_keys=True)
+                os.replace(temp_path, self.path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        self.entries = stored
+        self._recorded = {}
+
+    def metrics(self) -> dict:
+        return {"scenarios": len(self.fingerprints), "changed": self.changed, "skipped": self.skipped}
+
+    def _read(self) -> dict[str, dict]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as map_file:
+            try:
+                return dict(json.load(map_file))
+            except ValueError:
+                return {}
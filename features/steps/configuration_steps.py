@@ -11,9 +11,15 @@ from exceptions import ContainerNotConfigured
 from exceptions import ArtifactNotConfigured
 from exceptions import PlaybooksNotConfigured
 from exceptions import ActionNotFound
+from dataset_artifacts import DatasetArtifacts
+from prompt_policy import PromptPolicy
+from container_registry import get_registry, register_container, select_container
+from fetch_planner import mutates, requires
+from preflight import references
 
 
 @given("the following container configuration")
+@references(labels="label")
 def table_container_configuration(context: Context):
     """Configure a container by listing a table with all the variables defined in one step. You must have a a row header of 'name' and 'label' at minimum.
     Example: Given the following container configuration
@@ -26,7 +32,7 @@ def table_container_configuration(context: Context):
         ContainerMissingAttributes: If the container isn't created with the minimal attributes
     """
     row_dict = table_to_array(context.table)[0]
-    context.container = Container(**row_dict)
+    register_container(context, row_dict.get("name"), Container(**row_dict))
     try:
         assert context.container.name and context.container.label
     except AssertionError:
@@ -36,6 +42,7 @@ def table_container_configuration(context: Context):
 
 @given('the container "{container_name}" under the label "{label}"')
 @given('the container "{container_name}" within the label "{label}"')
+@references(labels="label")
 def container_step_configuration(context: Context, container_name: str, label: str):
     """Initialize a container object with a required name and label.
     Example: Given the container "Behave Test Example" within the label "example_label"
@@ -48,8 +55,10 @@ def container_step_configuration(context: Context, container_name: str, label: s
     Raises:
         ContainerMissingAttributes: If the container isn't created with the minimal attributes
     """
-    context.container = Container(
-        name=container_name, label=label, tags=["phantom-test-cases"]
+    register_container(
+        context,
+        container_name,
+        Container(name=container_name, label=label, tags=["phantom-test-cases"]),
     )
     try:
         assert container_name and label
@@ -57,6 +66,22 @@ def container_step_configuration(context: Context, container_name: str, label: s
         raise ContainerMissingAttributes()
 
 
+@step('the container "{container_name}" is selected')
+def select_declared_container(context: Context, container_name: str):
+    """Selects a container declared earlier in the scenario. Every following step configures, runs, or validates the
+    selected container. Declaring a container selects it automatically.
+    Example: Given the container "Source alert" is selected
+
+    Params:
+        context (Context): scenario context
+        container_name (str): name the container was declared with
+
+    Raises:
+        ContainerNotRegistered: If no container was declared under the name
+    """
+    select_container(context, container_name)
+
+
 @given('the container has the following "{attribute}" below')
 def container_assign_attr_table(context: Context, attribute: str):
     """Assigns custom_fields or data attributes to a container utilizing a table configuration
@@ -223,7 +248,39 @@ def bulk_artifacts_table(context: Context):
         context.container.add_artifact(Artifact(**row))
 
 
+@given('artifacts generated from "{dataset_file}"')
+@given('artifacts labeled "{label}" generated from "{dataset_file}"')
+def generated_artifacts(context: Context, dataset_file: str, label: str = "event"):
+    """Declares artifacts generated from every row of a CSV or JSONL dataset. The name, label, tags, and severity
+    columns set the artifact attributes and every other column becomes a CEF field. Rows are streamed and posted in
+    batches when the container is created, they are never stored on the container.
+    Example: Given artifacts generated from "datasets/domains.csv"
+
+    Parameters:
+        context (Context): scenario data
+        dataset_file (str): path to a .csv, .jsonl, or .ndjson file
+        label (str): label of rows without a label column. Defaults to event
+
+    Raises:
+        ContainerNotConfigured: Container must initialized before artifacts are created
+        FileNotFoundError: If the dataset file doesn't exist
+    """
+    assert_container(context.container)
+    if not os.path.exists(dataset_file):
+        raise FileNotFoundError(f"Dataset file {dataset_file} not found")
+
+    get_registry(context).add_dataset(
+        context.container,
+        DatasetArtifacts(
+            dataset_file,
+            label=label,
+            batch_size=int(context.config.userdata.get("dataset_batch_size", 500)),
+        ),
+    )
+
+
 @given('the playbook "{playbook_name}"')
+@references(playbooks="playbook_name")
 def declare_playbook(context: Context, playbook_name: str):
     """Add a playbook to a declared container within the context
     Example: Given the playbook "playbook_name"
@@ -261,7 +318,31 @@ def configure_prompt(context: Context, prompt_name: str):
     playbook.prompts[prompt_name] = responses
 
 
+@given("every playbook answers the following prompts")
+def configure_prompt_policy(context: Context):
+    """Answers the prompts of every playbook run in the scenario. Each row holds a prompt name and one response, repeat
+    the prompt name for prompts with several questions. Responses declared for a specific playbook take precedence.
+    Example: Given every playbook answers the following prompts
+        | approve_block | Yes                       |
+        | approve_block | Blocked by the test suite |
+        | escalate      | No                        |
+
+    Parameters:
+        context (Context): scenario data
+    """
+    prompts: dict = table_to_prompt(context.table)
+    policy: PromptPolicy = getattr(context, "prompt_policy", None) or PromptPolicy([])
+    context.prompt_policy = policy.extended(
+        [{"prompt": prompt, "responses": responses} for prompt, responses in prompts.items()]
+    )
+    # Examples rows declared for a @batch container run without a client, see outline_batch.declare_scenario()
+    if context.phantom:
+        context.prompt_policy.install(context.phantom)
+
+
 @then('upload the file "{file_path}" to the container')
+@requires()
+@mutates
 def upload_file_to_container(context: Context, file_path: str):
     """Uploads a file to the context container within Phantom. Check PhantomClient.upload_file() for more details
     Example: Then upload the file "./test.json" to the container
@@ -0,0 +1,157 @@
+import copy
+import os
+import time
+from typing import Optional
+import requests
+from requests.adapters import HTTPAdapter
+from soarsdk.client import PhantomClient
+import request_scheduler as scheduling
+
+"""
+Suite scoped HTTP connection pool for the Splunk SOAR client. A single authenticated requests.Session with
+keep-alive connections is created in before_all and every scenario receives its own PhantomClient that reuses it.
+"""
+
+
+class SoarConnectionPool:
+    def __init__(
+        self,
+        url: str,
+        token: Optional[str] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        verify: bool = False,
+        pool_size: int = 10,
+        health_check_interval: float = 60.0,
+        scheduler: Optional[scheduling.RequestScheduler] = None,
+    ):
+        """Creates the shared session and authenticates once for the whole suite
+
+        Args:
+            url (str): Splunk SOAR base url
+            token (str, optional): ph-auth-token used for authentication
+            username (str, optional): Username for basic authentication
+            password (str, optional): Password for basic authentication
+            verify (bool): Enable TLS verification
+            pool_size (int): Maximum amount of keep-alive connections kept open to the server
+            health_check_interval (float): Seconds between connection health checks
+            scheduler (RequestScheduler, optional): Rate limiting scheduler that every request passes through
+
+        Raises:
+            ConnectionError: If neither a token or a username & password are provided
+        """
+        if not token and not (username and password):
+            raise ConnectionError(
+                "No credentials provided for the SOAR connection pool. Provide either a token or a username & password"
+            )
+
+        self.url: str = url
+        self.verify: bool = verify
+        self.pool_size: int = pool_size
+        self.health_check_interval: float = health_check_interval
+        self.scheduler: Optional[scheduling.RequestScheduler] = scheduler
+        self.last_health_check: float = 0.0
+        self.resets: int = 0
+
+        self.session: requests.Session = requests.Session()
+        self.session.headers.update({"Connection": "keep-alive"})
+        if token:
+            self.session.headers.update({"ph-auth-token": token})
+        else:
+            self.session.auth = (username, password)
+        self._mount_adapters()
+
+        # Authenticates once; scenarios receive copies of this client
+        self._client: PhantomClient = PhantomClient(
+            url, session=self.session, verify=verify
+        )
+        self.last_health_check = time.monotonic()
+
+    @classmethod
+    def from_config(
+        cls, userdata, scheduler: Optional[scheduling.RequestScheduler] = None
+    ) -> Optional["SoarConnectionPool"]:
+        """Creates a pool from behave -D options, falling back to SOAR_* environment variables.
+        Returns None when no server url is configured.
+
+        Example: behave -D soar_url=https://soar.example.com -D pool_size=20
+        """
+
+        def option(name: str, default=None):
+            return userdata.get(name, os.environ.get(name.upper(), default))
+
+        url: Optional[str] = option("soar_url")
+        if not url:
+            return None
+        return cls(
+            url=url,
+            token=option("soar_token"),
+            username=option("soar_username"),
+            password=option("soar_password"),
+            verify=str(option("soar_verify", False)).lower() in ("1", "true", "yes"),
+            pool_size=int(option("pool_size", 10)),
+            health_check_interval=float(option("health_check_interval", 60)),
+            scheduler=scheduler,
+        )
+
+    def _mount_adapters(self) -> None:
+        adapter_options: dict = {
+            "pool_connections": self.pool_size,
+            "pool_maxsize": self.pool_size,
+        }
+        if self.scheduler:
+            scheduling.install(self.session, self.scheduler, **adapter_options)
+        else:
+            adapter: HTTPAdapter = HTTPAdapter(**adapter_options)
+            self.session.mount("https://", adapter)
+            self.session.mount("http://", adapter)
+
+    def is_healthy(self) -> bool:
+        """Requests the server version over the pooled connections"""
+        try:
+            response: requests.Response = self.session.get(
+                self._client.rest_url + "version", verify=self.verify, timeout=10
+            )
+        except requests.exceptions.RequestException:
+            return False
+        return response.status_code == 200
+
+    def check_health(self, force: bool = False) -> None:
+        """Checks the pooled connections when the health check interval has passed. Stale connections are
+        dropped and the pool is rebuilt once before giving up.
+
+        Raises:
+            ConnectionError: If the server cannot be reached after rebuilding the pool
+        """
+        if not force and (
+            time.monotonic() - self.last_health_check < self.health_check_interval
+        ):
+            return
+
+        if not self.is_healthy():
+            self.reset()
+            if not self.is_healthy():
+                raise ConnectionError(
+                    f"Failed to reach the SOAR server {self.url} after resetting the connection pool"
+                )
+        self.last_health_check = time.monotonic()
+
+    def reset(self) -> None:
+        """Closes every pooled connection and mounts fresh adapters"""
+        for adapter in self.session.adapters.values():
+            adapter.close()
+        self._mount_adapters()
+        self.resets += 1
+
+    def client(self) -> PhantomClient:
+        """Returns a PhantomClient for a single scenario. The session (and its connections) is shared while
+        the request log and action builder cache start empty for every scenario.
+        """
+        self.check_health()
+        scenario_client: PhantomClient = copy.copy(self._client)
+        scenario_client.requests_log = []
+        scenario_client.action_builder = []
+        return scenario_client
+
+    def close(self) -> None:
+        self.session.close()
@@ -0,0 +1,351 @@
+import re
+from collections import Counter
+from functools import cached_property
+from typing import Any, Generator, Iterable, Optional
+from behave.runner import Context
+from soarsdk.objects import Container
+from playbook_cache import is_replayed
+from outline_batch import batch_of
+from fetch_planner import refresh_values
+
+"""
+Module to build lookup indexes over a downloaded container. Indexes are built once per results refresh and reused by
+every validation step instead of scanning the container's lists on each assertion. The token indexes over action
+results, notes, and comments can be large, so each is only built when a step first searches it.
+"""
+
+# Characters that end a literal run inside of a regular expression
+_REGEX_SPECIAL: str = ".^$*+?{}[]\\|()"
+_OPTIONAL_QUANTIFIERS: str = "*?"
+
+
+def _trigrams(text: str) -> set[str]:
+    text = text.lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _class_end(pattern: str, start: int) -> int:
+    """Position after the character class opened at start. Escaped characters, and a "]" right after the opening
+    "[" or "[^", don't close the class
+    """
+    i: int = start + 1
+    if pattern[i : i + 1] == "^":
+        i += 1
+    if pattern[i : i + 1] == "]":
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 2
+            continue
+        if pattern[i] == "]":
+            return i + 1
+        i += 1
+    return len(pattern)
+
+
+def regex_literals(pattern: str) -> list[str]:
+    """Returns literal substrings that every match of the pattern must contain. Patterns with alternation
+    return no literals since no single substring is required.
+    """
+    if "|" in pattern:
+        return []
+
+    literals: list[str] = []
+    current: str = ""
+    depth: int = 0
+    i: int = 0
+    while i < len(pattern):
+        char: str = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            escaped: str = pattern[i + 1]
+            i += 2
+            if depth == 0 and not escaped.isalnum():
+                current += escaped
+            else:
+                literals.append(current)
+                current = ""
+            continue
+        if char in "[{":
+            # Skip character classes and repetition counts entirely
+            if char == "{":
+                current = current[:-1]
+            literals.append(current)
+            current = ""
+            if char == "[":
+                i = _class_end(pattern, i)
+            else:
+                closing: int = pattern.find("}", i + 1)
+                i = closing + 1 if closing != -1 else len(pattern)
+            continue
+        if char in _OPTIONAL_QUANTIFIERS:
+            # The previous character may not appear in a match
+            current = current[:-1]
+        if char in _REGEX_SPECIAL:
+            literals.append(current)
+            current = ""
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth = max(0, depth - 1)
+        elif depth == 0:
+            current += char
+        i += 1
+    literals.append(current)
+    return [literal for literal in literals if len(literal) >= 3]
+
+
+class SubstringIndex:
+    def __init__(self, documents: Iterable[str]):
+        """Trigram inverted index answering substring and regular expression queries over a set of strings
+
+        Args:
+            documents (Iterable[str]): Strings to index, duplicates are stored once
+        """
+        self.documents: list[str] = list(
+            dict.fromkeys(str(document) for document in documents if document)
+        )
+        self.postings: dict[str, set[int]] = {}
+        for document_id, document in enumerate(self.documents):
+            for trigram in _trigrams(document):
+                self.postings.setdefault(trigram, set()).add(document_id)
+
+    def _candidates(self, literals: list[str]) -> Iterable[int]:
+        """Intersects the posting lists of every trigram in the literals"""
+        trigrams: set[str] = set()
+        for literal in literals:
+            trigrams |= _trigrams(literal)
+        if not trigrams:
+            return range(len(self.documents))
+
+        postings: list[set[int]] = sorted(
+            (self.postings.get(trigram, set()) for trigram in trigrams), key=len
+        )
+        return set.intersection(*postings)
+
+    def search(self, text: str, ignore_case: bool = False) -> list[str]:
+        """Returns the documents containing the text"""
+        needle: str = text.lower() if ignore_case else text
+        return [
+            self.documents[document_id]
+            for document_id in self._candidates([text])
+            if needle
+            in (
+                self.documents[document_id].lower()
+                if ignore_case
+                else self.documents[document_id]
+            )
+        ]
+
+    def search_regex(self, pattern: str) -> list[str]:
+        """Returns the documents matching the regular expression"""
+        compiled: re.Pattern = re.compile(pattern)
+        candidates: Iterable[int] = (
+            range(len(self.documents))
+            if compiled.flags & re.IGNORECASE
+            else self._candidates(regex_literals(pattern))
+        )
+        return [
+            self.documents[document_id]
+            for document_id in candidates
+            if compiled.search(self.documents[document_id])
+        ]
+
+
+class TextIndex:
+    def __init__(self, documents: Iterable[tuple[str, str]]):
+        """Token inverted index answering which strings mention a text, such as an indicator. Every word of the text
+        must be a word of the string, and the text must appear in the string on word boundaries, ignoring case. An
+        IP address of 10.0.0.1 is mentioned by "blocked 10.0.0.1" but not by "10.0.0.15".
+
+        Args:
+            documents (Iterable[tuple[str, str]]): Source and text of the strings to index, the source names where
+                the text came from such as the action name. Duplicates are stored once
+        """
+        self.documents: list[tuple[str, str]] = list(dict.fromkeys(documents))
+        self.postings: dict[str, set[int]] = {}
+        for document_id, (_, text) in enumerate(self.documents):
+            for token in set(_tokens(text)):
+                self.postings.setdefault(token, set()).add(document_id)
+
+    def search(self, text: str, sources: Optional[Iterable[str]] = None) -> list[tuple[str, str]]:
+        """Returns the source and text of the strings mentioning the text, optionally only from the given sources"""
+        tokens: set[str] = set(_tokens(text))
+        candidates: Iterable[int] = (
+            set.intersection(
+                *sorted((self.postings.get(token, set()) for token in tokens), key=len)
+            )
+            if tokens
+            else range(len(self.documents))
+        )
+        pattern: re.Pattern = re.compile(rf"(?<!\w){re.escape(text)}(?!\w)", re.IGNORECASE)
+        allowed: Optional[set[str]] = set(sources) if sources is not None else None
+        return [
+            self.documents[document_id]
+            for document_id in sorted(candidates)
+            if (allowed is None or self.documents[document_id][0] in allowed)
+            and pattern.search(self.documents[document_id][1])
+        ]
+
+
+def _tokens(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def string_leaves(value: Any) -> Generator[str, None, None]:
+    """Yields every string inside of nested dictionaries and lists"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from string_leaves(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from string_leaves(item)
+
+
+def _signature_sources(container: Container) -> tuple:
+    return (
+        container.pins,
+        container.comments,
+        container.notes,
+        container.artifacts,
+        container.playbooks,
+        # Refreshed action runs replace the actions list of the declared playbook
+        *(playbook.actions for playbook in container.playbooks),
+    )
+
+
+def container_signature(container: Container) -> tuple:
+    """Identifies the downloaded state of a container. soarsdk replaces or extends these lists whenever the
+    container is refreshed, so a changed signature means the index is stale. The lists themselves are kept so
+    their identity cannot be reused by newer lists.
+    """
+    return tuple((source, len(source)) for source in _signature_sources(container))
+
+
+class ContainerIndex:
+    def __init__(self, container: Container):
+        """Hash based lookups of the pins, comments, notes, and artifacts on a container
+
+        Attributes:
+            pins (set[tuple]): (style, message, data) of every pin
+            pin_texts (set[tuple]): (style, text) where text is either the pin message or data
+            comments (set[str]): Comment text on the container
+            note_titles (set[str]): Titles of the notes on the container
+            artifact_labels (Counter): Amount of artifacts per label
+            artifact_names (Counter): Amount of artifacts per name
+            artifact_cef_keys (Counter): Amount of artifacts with a non-empty value for each CEF key
+            artifact_tags (Counter): Amount of artifacts carrying each tag
+            result_text (TextIndex): Strings in the results, summaries, and messages of every action, by action name
+            note_text (TextIndex): Titles and contents of the notes, by note title
+            comment_text (TextIndex): Comments on the container
+        """
+        self.container: Container = container
+        self.signature: tuple = container_signature(container)
+
+        self.pins: set[tuple] = set()
+        self.pin_texts: set[tuple] = set()
+        self.pin_styles: dict[str, set[str]] = {}
+        for pin in container.pins:
+            self.pins.add((pin.style, pin.message, pin.data))
+            for text in (pin.message, pin.data):
+                self.pin_texts.add((pin.style, text))
+                if text:
+                    self.pin_styles.setdefault(str(text), set()).add(pin.style)
+
+        self.comments: set[str] = set(container.comments)
+        self.note_titles: set[str] = {note.title for note in container.notes}
+
+        self.artifact_labels: Counter = Counter()
+        self.artifact_names: Counter = Counter()
+        self.artifact_cef_keys: Counter = Counter()
+        self.artifact_tags: Counter = Counter()
+        for artifact in container.artifacts:
+            self.artifact_labels[artifact.label] += 1
+            self.artifact_names[artifact.name] += 1
+            self.artifact_cef_keys.update(
+                key
+                for key, value in (artifact.cef or {}).items()
+                if value is not None and value != ""
+            )
+            self.artifact_tags.update(set(artifact.tags or []))
+
+        self.pin_search: SubstringIndex = SubstringIndex(self.pin_styles)
+        self.comment_search: SubstringIndex = SubstringIndex(self.comments)
+        self.note_search: SubstringIndex = SubstringIndex(self.note_titles)
+
+    @cached_property
+    def result_text(self) -> TextIndex:
+        return TextIndex(
+            (action.name, text)
+            for playbook in self.container.playbooks
+            for action in playbook.actions
+            for text in string_leaves([action.result_data, action.result_summary, action.message])
+        )
+
+    @cached_property
+    def note_text(self) -> TextIndex:
+        return TextIndex(
+            (note.title, text)
+            for note in self.container.notes
+            for text in (note.title, note.content)
+            if text
+        )
+
+    @cached_property
+    def comment_text(self) -> TextIndex:
+        return TextIndex(("comment", str(comment)) for comment in self.container.comments if comment)
+
+    def is_current(self, container: Container) -> bool:
+        sources: tuple = _signature_sources(container)
+        return len(sources) == len(self.signature) and all(
+            source is current and length == len(current)
+            for (source, length), current in zip(
+                self.signature, sources
+            )
+        )
+
+    def pin_styles_matching(self, texts: list[str]) -> set[str]:
+        """Returns the pin styles used by any of the matched pin texts"""
+        styles: set[str] = set()
+        for text in texts:
+            styles |= self.pin_styles.get(text, set())
+        return styles
+
+
+def get_container_index(
+    context: Context, container: Optional[Container] = None
+) -> ContainerIndex:
+    """Returns the index of the container (defaults to context.container), rebuilding it if the container was
+    refreshed since the index was built. Indexes are stored on the scenario context.
+    """
+    container = container or context.container
+    indexes: Optional[dict] = getattr(context, "container_indexes", None)
+    if indexes is None:
+        indexes = context.container_indexes = {}
+
+    cached: Optional[tuple] = indexes.get(id(container))
+    if cached and cached[0] is container and cached[1].is_current(container):
+        return cached[1]
+
+    index: ContainerIndex = ContainerIndex(container)
+    indexes[id(container)] = (container, index)
+    return index
+
+
+def refresh_container(context: Context, container: Optional[Container] = None) -> ContainerIndex:
+    """Downloads the newest container values and rebuilds its index. Containers holding cached playbook results
+    are not downloaded again.
+    """
+    container = container or context.container
+    batch = batch_of(context, container)
+    if batch:
+        batch.once(
+            "refresh",
+            container,
+            lambda packed: is_replayed(context, packed)
+            or refresh_values(context, packed),
+        )
+    elif not is_replayed(context, container):
+        refresh_values(context, container)
+    return get_container_index(context, container)
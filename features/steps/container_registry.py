@@ -0,0 +1,160 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+from behave.runner import Context
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container
+from dataset_artifacts import DatasetArtifacts
+from container_index import get_container_index
+from fetch_planner import refresh_values
+from playbook_cache import is_replayed
+from warm_start import READ_ONLY_TAG
+from outline_batch import get_batch
+from exceptions import ContainerNotConfigured, ContainerNotRegistered
+
+"""
+Module to keep several named containers on one scenario. context.container always points at the selected container
+so existing steps keep working, while the registry lets steps create, refresh, and delete every container at once.
+"""
+
+
+class ContainerRegistry:
+    def __init__(self, workers: int = 4):
+        """Named containers declared within a scenario, in declaration order
+
+        Args:
+            workers (int): Containers created, refreshed, or deleted at the same time
+        """
+        self.workers: int = workers
+        self.containers: dict[str, Container] = {}
+        self.datasets: dict[str, list[DatasetArtifacts]] = {}
+
+    def __iter__(self) -> Iterator[Container]:
+        return iter(list(self.containers.values()))
+
+    def __len__(self) -> int:
+        return len(self.containers)
+
+    def register(self, name: str, container: Container) -> Container:
+        """Adds the container under the name. A container declared twice under the same name replaces the first"""
+        self.containers[name] = container
+        self.datasets.setdefault(name, [])
+        return container
+
+    def get(self, name: str) -> Container:
+        """Raises:
+        ContainerNotRegistered: If no container was declared under the name
+        """
+        if name not in self.containers:
+            raise ContainerNotRegistered(name, list(self.containers))
+        return self.containers[name]
+
+    def name_of(self, container: Container) -> Optional[str]:
+        for name, registered in self.containers.items():
+            if registered is container:
+                return name
+        return None
+
+    def add_dataset(self, container: Container, dataset: DatasetArtifacts) -> None:
+        """Attaches generated artifacts to a container, registering containers that were set on the context directly"""
+        name: Optional[str] = self.name_of(container)
+        if name is None:
+            name = container.name
+            self.register(name, container)
+        self.datasets[name].append(dataset)
+
+    def create(self, client: PhantomClient, container: Container) -> Container:
+        """Creates a single container with its declared and generated artifacts"""
+        client.create_container(container)
+        for dataset in self.datasets.get(self.name_of(container), []):
+            dataset.create(client, container)
+        return container
+
+    def _each(self, action: Callable, containers: list[Container]) -> list:
+        """Runs the action on every container concurrently. Errors are raised once every action is finished"""
+        if not containers:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(containers))) as pool:
+            futures = [pool.submit(action, container) for container in containers]
+        return [future.result() for future in futures]
+
+    def create_all(self, client: PhantomClient) -> None:
+        """Creates every registered container which doesn't exist in Splunk SOAR yet"""
+        self._each(
+            lambda container: self.create(client, container),
+            [container for container in self if not container.id],
+        )
+
+    def refresh_all(
+        self, refresh: Callable[[Container], object], skip: Callable = lambda container: False
+    ) -> None:
+        """Downloads the newest values of every created container with refresh(), e.g.
+        PhantomClient.update_container_values, except the containers skip() returns True for
+        """
+        self._each(
+            refresh,
+            [container for container in self if container.id and not skip(container)],
+        )
+
+    def delete_all(self, client: PhantomClient, skip: Callable = lambda container: False) -> None:
+        """Deletes every created container from Splunk SOAR, except the containers skip() returns True for"""
+        self._each(
+            client.delete_container,
+            [container for container in self if container.id and not skip(container)],
+        )
+
+
+def get_registry(context: Context) -> ContainerRegistry:
+    """Returns the container registry of the scenario, creating it on first use"""
+    registry: Optional[ContainerRegistry] = getattr(context, "containers", None)
+    if registry is None:
+        registry = context.containers = ContainerRegistry(
+            workers=int(context.config.userdata.get("container_workers", 4))
+        )
+    return registry
+
+
+def register_container(context: Context, name: str, container: Container) -> Container:
+    """Registers the container and selects it as context.container"""
+    context.container = get_registry(context).register(name, container)
+    return container
+
+
+def select_container(context: Context, name: str) -> Container:
+    """Selects a registered container as context.container"""
+    context.container = get_registry(context).get(name)
+    return context.container
+
+
+def create_selected_container(context: Context) -> Container:
+    if not getattr(context, "container", None):
+        raise ContainerNotConfigured()
+    registry: ContainerRegistry = get_registry(context)
+    batch = get_batch(context)
+    if batch:
+        # Examples rows of a @batch outline share one container holding the artifacts of every row
+        return batch.create(
+            context, context.container, lambda packed: registry.create(context.phantom, packed)
+        )
+    warm_start = getattr(context, "warm_start", None)
+    tags = context.scenario.effective_tags
+    if warm_start and READ_ONLY_TAG in tags:
+        # Scenarios that don't change their container share one container per configuration
+        return warm_start.create(
+            context.container,
+            registry.datasets.get(registry.name_of(context.container), []),
+            lambda: registry.create(context.phantom, context.container),
+            cleanup="cleanup" in tags,
+        )
+    return registry.create(context.phantom, context.container)
+
+
+def refresh_all_containers(context: Context) -> None:
+    """Refreshes every registered container concurrently through the fetch planner, then rebuilds their indexes"""
+    registry: ContainerRegistry = get_registry(context)
+    registry.refresh_all(
+        lambda container: refresh_values(context, container),
+        skip=lambda container: is_replayed(context, container),
+    )
+    for container in registry:
+        if container.id:
+            get_container_index(context, container)
@@ -0,0 +1,115 @@
+import csv
+import itertools
+import json
+import os
+import threading
+from typing import Any, Generator, Iterable
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container
+from utility_functions import list_parse
+
+"""
+Module to generate artifacts from CSV or JSONL fixture files. Rows are streamed through a generator pipeline and
+posted in bulk, so memory use stays flat no matter how many rows the dataset has.
+"""
+
+# Columns mapped to artifact attributes, every other column becomes a CEF field
+ARTIFACT_COLUMNS: tuple = ("name", "label", "tags", "severity")
+
+
+def iter_dataset_rows(path: str) -> Generator[dict, None, None]:
+    """Yields the rows of a CSV (with a header row) or JSONL file one at a time
+
+    Raises:
+        FileNotFoundError: If the dataset file doesn't exist
+        ValueError: If the file extension isn't .csv, .jsonl, or .ndjson
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Dataset file {path} not found")
+
+    extension: str = os.path.splitext(path)[1].lower()
+    with open(path, newline="") as dataset:
+        if extension == ".csv":
+            yield from csv.DictReader(dataset)
+        elif extension in (".jsonl", ".ndjson"):
+            for line in dataset:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(
+                f"Unsupported dataset {path}. Provide a .csv, .jsonl, or .ndjson file"
+            )
+
+
+def row_to_artifact(row: dict, index: int, container_id: int, label: str) -> dict:
+    """Converts a dataset row into an artifact creation payload
+
+    Args:
+        row (dict): Dataset row
+        index (int): Position of the row in the dataset, used for default artifact names
+        container_id (int): ID of the created container
+        label (str): Label used when the row doesn't have a label column
+    """
+    tags: Any = row.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tag for tag in list_parse(tags) if tag]
+
+    return {
+        "container_id": container_id,
+        "name": row.get("name") or f"generated artifact {index}",
+        "label": row.get("label") or label,
+        "severity": row.get("severity") or "low",
+        "tags": tags,
+        "cef": {
+            key: value
+            for key, value in row.items()
+            if key not in ARTIFACT_COLUMNS and value not in (None, "")
+        },
+        "run_automation": False,
+    }
+
+
+def batched(items: Iterable, size: int) -> Generator[list, None, None]:
+    """Yields lists of at most size items without materializing the iterable"""
+    iterator = iter(items)
+    batch: list = list(itertools.islice(iterator, size))
+    while batch:
+        yield batch
+        batch = list(itertools.islice(iterator, size))
+
+
+class DatasetArtifacts:
+    def __init__(self, path: str, label: str = "event", batch_size: int = 500):
+        """Lazy declaration of artifacts generated from a dataset file. Nothing is read until the artifacts are created
+
+        Args:
+            path (str): CSV or JSONL dataset file
+            label (str): Artifact label for rows without a label column
+            batch_size (int): Artifacts posted per request
+
+        Attributes:
+            created (int): Artifacts created on every container so far, the dataset may be created on several
+                containers at once, e.g. by a load test
+        """
+        self.path: str = path
+        self.label: str = label
+        self.batch_size: int = batch_size
+        self.created: int = 0
+        self._lock: threading.Lock = threading.Lock()
+
+    def payloads(self, container_id: int) -> Generator[dict, None, None]:
+        return (
+            row_to_artifact(row, index, container_id, self.label)
+            for index, row in enumerate(iter_dataset_rows(self.path), start=1)
+        )
+
+    def create(self, client: PhantomClient, container: Container) -> int:
+        """Posts the generated artifacts to the created container in bulk. Returns the amount created on the container"""
+        created: int = 0
+        for batch in batched(self.payloads(container.id), self.batch_size):
+            # The artifact endpoint accepts a list of artifacts; soarsdk only exposes single artifact creation
+            client._handle_request(method="POST", url="artifact", json=batch)
+            created += len(batch)
+        with self._lock:
+            self.created += created
+        return created
@@ -33,3 +33,25 @@ class ArtifactNotConfigured(Exception):
 class ActionNotFound(Exception):
     def __init__(self, action_name: str, *args: object) -> None:
         super().__init__(f"The action {action_name} was not found on the container.")
+
+
+class ContainerNotRegistered(Exception):
+    def __init__(self, container_name: str, registered: list = None, *args: object) -> None:
+        super().__init__(
+            f'The container "{container_name}" has not been declared in this scenario. Declared containers: {registered or []}'
+        )
+
+
+class PreflightFailed(Exception):
+    def __init__(self, problems: list = None, *args: object) -> None:
+        super().__init__(
+            f"Referenced names were not found on the server, no containers were created: {', '.join(problems or [])}"
+        )
+
+
+class ScenarioTimeout(Exception):
+    # Raised from the watchdog thread, which can only pass a class. Subclasses carry the timing details
+    details: str = "The scenario ran out of time"
+
+    def __init__(self, *args: object) -> None:
+        super().__init__(*(args or (self.details,)))
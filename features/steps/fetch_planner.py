@@ -0,0 +1,357 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+import requests
+from behave.model import Step
+from behave.model_core import Status
+from behave.runner import Context
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Action, Container, Playbook
+from scenario_metrics import response_size
+import utility_functions as utils
+
+"""
+Module to download only the parts of a container the rest of a scenario reads. Step definitions declare what they read
+with @requires, and collecting the results looks ahead at the scenario's remaining steps to fetch just those parts.
+A later step that reads something outside the plan fetches it on demand before it runs. Steps without a declaration
+read everything, so unannotated custom steps always see a fully downloaded container.
+
+Steps marked @mutates flag the container as stale. The first step that reads a stale container refreshes it once,
+however many changes came before, and collecting results of a container that hasn't changed downloads nothing.
+"""
+
+CONTAINER: str = "container"
+ARTIFACTS: str = "artifacts"
+PLAYBOOKS: str = "playbooks"
+ACTIONS: str = "actions"
+# Action results (app runs) of every action, the most expensive part of a container
+RESULTS: str = "results"
+LOGS: str = "logs"
+PINS: str = "pins"
+COMMENTS: str = "comments"
+NOTES: str = "notes"
+RESOURCES: tuple = (CONTAINER, ARTIFACTS, PLAYBOOKS, ACTIONS, RESULTS, LOGS, PINS, COMMENTS, NOTES)
+# Resources that can't be fetched without the resources they belong to
+DEPENDENCIES: dict[str, set[str]] = {ACTIONS: {PLAYBOOKS}, RESULTS: {PLAYBOOKS, ACTIONS}, LOGS: {PLAYBOOKS}}
+
+
+def requires(*resources: str) -> Callable:
+    """Declares the parts of the container a step definition reads. Place it below the step decorator
+    Example:
+        @then('the playbook "{playbook_name}" has the status of "{status}"')
+        @requires(PLAYBOOKS)
+        def assert_playbook_status(context, playbook_name, status): ...
+    """
+    unknown: set[str] = set(resources) - set(RESOURCES)
+    if unknown:
+        raise ValueError(f"Unknown container resources {sorted(unknown)}, use {RESOURCES}")
+
+    def decorator(step_function: Callable) -> Callable:
+        step_function.soar_requires = set(resources)
+        return step_function
+
+    return decorator
+
+
+def collects(step_function: Callable) -> Callable:
+    """Marks a step that collects results. Steps after it are planned by that collection"""
+    step_function.soar_collects = True
+    return step_function
+
+
+def refreshes(step_function: Callable) -> Callable:
+    """Marks a step that downloads the whole container itself, such as running playbooks"""
+    step_function.soar_refreshes = True
+    return step_function
+
+
+def mutates(step_function: Callable) -> Callable:
+    """Marks a step that changes the selected container on the server, or lets it change, such as starting a
+    playbook or adding a note. The next step reading the container refreshes it first.
+    """
+    step_function.soar_mutates = True
+    return step_function
+
+
+def with_dependencies(resources: set[str]) -> set[str]:
+    expanded: set[str] = set(resources)
+    for resource in resources:
+        expanded |= DEPENDENCIES.get(resource, set())
+    return expanded
+
+
+def step_function(context: Context, step: Step) -> Optional[Callable]:
+    match = utils.step_match(context, step)
+    return match.func if match else None
+
+
+def declared_resources(function: Optional[Callable]) -> set[str]:
+    """Resources read by a step definition. Undeclared steps read every resource"""
+    return set(getattr(function, "soar_requires", RESOURCES))
+
+
+def is_refresh_point(function: Optional[Callable]) -> bool:
+    return getattr(function, "soar_collects", False) or getattr(function, "soar_refreshes", False)
+
+
+class FetchState:
+    def __init__(self, container: Container, resources: set[str], stale: bool = False):
+        """What is known about the downloaded values of a container
+
+        Attributes:
+            resources (set[str]): Resources downloaded since the container last changed
+            stale (bool): A step changed the container on the server after the last download
+        """
+        self.container: Container = container
+        self.resources: set[str] = set(resources)
+        self.stale: bool = stale
+
+
+class FetchPlanner:
+    def __init__(self):
+        """Plans and performs partial container downloads for every scenario of the run
+
+        Attributes:
+            states (dict): Download state of each container of the scenario
+            costs (dict): Calls and bytes observed per resource over the run, used to estimate the savings
+        """
+        self.states: dict[int, FetchState] = {}
+        self.playbook_names: dict[int, str] = {}
+        self.costs: dict[str, Counter] = {resource: Counter() for resource in RESOURCES}
+        self.collections: int = 0
+        self.coalesced: int = 0
+        self.automatic: int = 0
+        self.on_demand: int = 0
+        self.skipped: Counter = Counter()
+        # Step about to run whose stale container is being refreshed, it is planned together with the later steps
+        self.pending_step: Optional[Step] = None
+        self._lock: threading.Lock = threading.Lock()
+        self._measured: threading.local = threading.local()
+        # Fetches running on each session, containers may be fetched concurrently with one client
+        self._fetching: Counter = Counter()
+
+    def state(self, container: Optional[Container]) -> Optional[FetchState]:
+        state: Optional[FetchState] = self.states.get(id(container)) if container is not None else None
+        return state if state and state.container is container else None
+
+    def plan(self, context: Context) -> set[str]:
+        """Resources read by the steps after the running step, up to the next step that collects or refreshes"""
+        remaining: list[Step] = [
+            step for step in context.scenario.all_steps if step.status == Status.untested
+        ][1:]
+        planned: set[str] = {CONTAINER}
+        if self.pending_step is not None:
+            planned |= declared_resources(step_function(context, self.pending_step))
+        for step in remaining:
+            function: Optional[Callable] = step_function(context, step)
+            if is_refresh_point(function):
+                break
+            planned |= declared_resources(function)
+        return with_dependencies(planned)
+
+    def refresh(self, context: Context, container: Container) -> set[str]:
+        """Collects the results of the container, downloading only the planned resources that aren't current.
+        Collecting a container that hasn't changed since its last download downloads nothing.
+        """
+        planned: set[str] = self.plan(context)
+        state: Optional[FetchState] = self.state(container)
+        current: set[str] = state.resources if state and not state.stale else set()
+        missing: set[str] = planned - current
+        # The container record is downloaded with every fetch
+        downloaded: set[str] = missing | {CONTAINER} if missing else set()
+        if downloaded:
+            self.fetch(context.phantom, container, downloaded)
+        with self._lock:
+            self.collections += 1
+            self.coalesced += 0 if downloaded else 1
+            self.skipped.update(set(RESOURCES) - downloaded)
+        self.states[id(container)] = FetchState(container, current | planned)
+        return planned
+
+    def ensure(
+        self,
+        context: Context,
+        step: Step,
+        refresh: Callable[[], object],
+        container: Optional[Container] = None,
+    ) -> None:
+        """Prepares the container for a step. A stale container is refreshed once by refresh() when the first step
+        reading it runs, and resources left out by the last collection are fetched on demand.
+        """
+        container = container or getattr(context, "container", None)
+        state: Optional[FetchState] = self.state(container)
+        if not state or not container.id:
+            return
+        function: Optional[Callable] = step_function(context, step)
+        needed: set[str] = with_dependencies(declared_resources(function))
+        if is_refresh_point(function) or not needed:
+            return
+
+        if state.stale:
+            self.pending_step = step
+            try:
+                refresh()
+            finally:
+                self.pending_step = None
+            with self._lock:
+                self.automatic += 1
+            state = self.state(container)
+            if state is None or state.stale:
+                # Containers with replayed results are not downloaded again
+                state = self.states[id(container)] = FetchState(container, set(RESOURCES))
+
+        missing: set[str] = needed - state.resources
+        if not missing:
+            return
+        self.fetch(context.phantom, container, missing)
+        state.resources |= missing
+        with self._lock:
+            self.on_demand += 1
+            self.skipped.subtract(missing)
+
+    def mark_stale(self, container: Optional[Container]) -> None:
+        """A step changed the container on the server, the next step reading it refreshes it first"""
+        if container is None or not container.id:
+            return
+        state: Optional[FetchState] = self.state(container)
+        if state:
+            state.stale = True
+        else:
+            self.states[id(container)] = FetchState(container, set(), stale=True)
+
+    def complete(self, container: Optional[Container]) -> None:
+        """The container was downloaded completely outside of the planner"""
+        if container is not None and container.id:
+            self.states[id(container)] = FetchState(container, set(RESOURCES))
+
+    def reset(self) -> None:
+        self.states.clear()
+
+    def on_response(self, response: requests.Response, *args, **kwargs) -> None:
+        resource: Optional[str] = getattr(self._measured, "resource", None)
+        if resource:
+            size: int = response_size(response, stream=bool(kwargs.get("stream")))
+            with self._lock:
+                self.costs[resource]["calls"] += 1
+                self.costs[resource]["bytes"] += size
+
+    @contextmanager
+    def measure(self, resource: str) -> Iterator[None]:
+        self._measured.resource = resource
+        try:
+            yield
+        finally:
+            self._measured.resource = None
+            with self._lock:
+                self.costs[resource]["fetches"] += 1
+
+    def fetch(self, client: PhantomClient, container: Container, resources: set[str]) -> None:
+        """Downloads the resources of the container, the same way PhantomClient.update_container_values does"""
+        hooks: list = client.session.hooks["response"]
+        with self._lock:
+            # One hook per session, concurrent fetches measure their own resource through self._measured
+            if not self._fetching[id(hooks)]:
+                hooks.append(self.on_response)
+            self._fetching[id(hooks)] += 1
+        try:
+            with self.measure(CONTAINER):
+                container.update(client.get_containers(params={"_filter_id": container.id})[0])
+            if ARTIFACTS in resources:
+                with self.measure(ARTIFACTS):
+                    container.artifacts = client.get_artifacts(
+                        params={"_filter_container__exact": container.id}
+                    )
+            if resources & {PLAYBOOKS, ACTIONS, RESULTS, LOGS}:
+                self._fetch_playbooks(client, container, resources)
+            if PINS in resources:
+                with self.measure(PINS):
+                    # get_pins() extends the pins, which duplicates them on every collection
+                    container.pins = []
+                    client.get_pins(container=container)
+            if COMMENTS in resources:
+                with self.measure(COMMENTS):
+                    client.get_comments(container=container)
+            if NOTES in resources:
+                with self.measure(NOTES):
+                    client.get_notes(container=container)
+        finally:
+            with self._lock:
+                self._fetching[id(hooks)] -= 1
+                if not self._fetching[id(hooks)]:
+                    del self._fetching[id(hooks)]
+                    hooks.remove(self.on_response)
+
+    def _fetch_playbooks(self, client: PhantomClient, container: Container, resources: set[str]) -> None:
+        with self.measure(PLAYBOOKS):
+            records: list[dict] = client._handle_request(
+                method="GET",
+                url="playbook_run?",
+                params={"_filter_container__exact": container.id, "include_expensive": True},
+                return_data_only=True,
+            )
+            playbooks: list[Playbook] = [Playbook(**record) for record in records]
+            for playbook in playbooks:
+                if playbook.playbook_id not in self.playbook_names:
+                    self.playbook_names[playbook.playbook_id] = client.get_playbook_name_from_id(
+                        playbook.playbook_id
+                    )
+                playbook.name = self.playbook_names[playbook.playbook_id]
+
+        if RESULTS in resources:
+            with self.measure(RESULTS):
+                for playbook in playbooks:
+                    playbook.actions = client.get_action_runs({"_filter_playbook_run": playbook.id})
+        elif ACTIONS in resources:
+            with self.measure(ACTIONS):
+                for playbook in playbooks:
+                    playbook.actions = [
+                        Action(**action)
+                        for action in client._handle_request(
+                            method="GET",
+                            url="action_run?",
+                            params={"_filter_playbook_run": playbook.id},
+                            return_data_only=True,
+                        )
+                    ]
+        if LOGS in resources:
+            with self.measure(LOGS):
+                for playbook in playbooks:
+                    playbook.logs = client.get_playbook_logs(playbook=playbook)
+
+        for playbook in playbooks:
+            declared: Optional[Playbook] = container.get_playbook(name=playbook.name)
+            if declared:
+                declared.update(playbook)
+            else:
+                container.playbooks.append(playbook)
+
+    def metrics(self) -> dict:
+        """Collections, on demand fetches, and the calls and bytes saved, estimated from the average cost of each
+        resource whenever it was fetched during the run
+        """
+        saved_calls: float = 0.0
+        saved_bytes: float = 0.0
+        for resource, skipped in self.skipped.items():
+            cost: Counter = self.costs[resource]
+            if skipped > 0 and cost["fetches"]:
+                saved_calls += skipped * cost["calls"] / cost["fetches"]
+                saved_bytes += skipped * cost["bytes"] / cost["fetches"]
+        return {
+            "collections": self.collections,
+            "coalesced_collections": self.coalesced,
+            "automatic_refreshes": self.automatic,
+            "on_demand_fetches": self.on_demand,
+            "skipped": {resource: count for resource, count in sorted(self.skipped.items()) if count > 0},
+            "estimated_calls_saved": round(saved_calls),
+            "estimated_bytes_saved": round(saved_bytes),
+        }
+
+
+def refresh_values(context: Context, container: Container) -> None:
+    """Downloads the container through the fetch planner when enabled, or completely otherwise"""
+    planner: Optional[FetchPlanner] = getattr(context, "fetch_planner", None)
+    if planner and getattr(context, "scenario", None):
+        planner.refresh(context, container)
+    else:
+        context.phantom.update_container_values(container)
@@ -1,3 +1,4 @@
+import time
 from soarsdk.objects import Container
 from soarsdk.objects import Playbook
 from soarsdk.objects import Artifact
@@ -6,9 +7,21 @@ from utility_functions import *
 from exceptions import *
 from behave import then, when
 from behave.model import Row, Table
+from container_index import refresh_container
+from playbook_cache import run_playbooks
+from playbook_tracker import PlaybookRunTracker, get_tracker
+from load_test import LoadTest, LoadTestSettings
+from fetch_planner import collects, mutates, refreshes, requires
+from preflight import apply_resolved, references
+from container_registry import (
+    create_selected_container,
+    get_registry,
+    refresh_all_containers,
+)
 
 
 @when("the playbooks are run")
+@refreshes
 def run_all_playbooks(context: Context):
     """Runs through every playbook declared inside the FeatureFile; answering prompts as they appear
     Example: When the playbook are run
@@ -20,7 +33,7 @@ def run_all_playbooks(context: Context):
         PlaybookNotRan: If the playbook failed to be ran
 
     """
-    context.phantom.run_playbooks(context.container)
+    run_playbooks(context)
     if context.container.playbooks:
         for playbook in context.container.playbooks:
             try:
@@ -30,14 +43,17 @@ def run_all_playbooks(context: Context):
 
 
 @then("the results are collected")
+@collects
 def step_impl(context):
     """Updates every object inside the container with the newest information. Use this after running a playbook to check the values of your test resources
     Example: Then the results are collected
     """
-    context.phantom.update_container_values(context.container)
+    refresh_container(context)
 
 
 @when('the playbook "{playbook_name}" is ran')
+@references(playbooks="playbook_name")
+@refreshes
 def step_impl(context, playbook_name):
     """Run a given playbook after connecting to sandbox. Useful when multiple playbooks are required to run in different orders"""
     playbook: Playbook = context.container.get_playbook(name=playbook_name)
@@ -47,23 +63,181 @@ def step_impl(context, playbook_name):
 
     if "ignore_exception" in context.scenario.tags:
         try:
-            context.phantom.run_playbooks(context.container)
+            run_playbooks(context)
         except soarsdk.Exceptions.PlaybookException:
             pass
     else:
-        context.phantom.run_playbooks(context.container)
+        run_playbooks(context)
+
+
+def answer_started_prompts(context: Context, tracker: PlaybookRunTracker) -> None:
+    """Answers pending prompts of started playbooks. Approvals are only checked when a started playbook declares
+    prompt responses or a prompt policy is configured.
+    """
+    playbooks: list[Playbook] = [run.playbook for run in tracker.pending() if run.playbook]
+    if not playbooks or not (
+        getattr(context, "prompt_policy", None)
+        or any(playbook.prompts for playbook in playbooks)
+    ):
+        return
+
+    approvals: list[dict] = context.phantom.check_approvals(tracker.container)
+    for approval in approvals or []:
+        playbook: Playbook = next(
+            (playbook for playbook in playbooks if approval.get("name") in playbook.prompts),
+            playbooks[0],
+        )
+        context.phantom.answer_approvals(
+            container=tracker.container, playbook=playbook, approvals=[approval]
+        )
+
+
+def wait_for_runs(
+    context: Context, tracker: PlaybookRunTracker, timeout: float, run_ids: list = None
+) -> None:
+    """Waits on started runs while answering their prompts, counting the time as playbook wait time"""
+    start: float = time.monotonic()
+    try:
+        tracker.wait(
+            run_ids=run_ids,
+            timeout=timeout,
+            on_tick=lambda: answer_started_prompts(context, tracker),
+        )
+    finally:
+        if getattr(context, "scenario_metrics", None):
+            context.scenario_metrics.add_wait(time.monotonic() - start)
+
+
+@when('the playbook "{playbook_name}" is started')
+@references(playbooks="playbook_name")
+@requires()
+@mutates
+def start_playbook(context: Context, playbook_name: str):
+    """Starts a playbook without waiting for it to finish. Use the step 'Then the started playbooks finish within
+    "seconds" seconds' to wait on it. Waiting only polls the playbook and action runs of the container.
+    Example: When the playbook "local/triage_blocked_domains" is started
+    """
+    if not context.container:
+        raise ContainerNotConfigured()
+
+    playbook: Playbook = context.container.get_playbook(name=playbook_name)
+    if not playbook or playbook.run_id:
+        playbook = Playbook(name=playbook_name)
+        context.container.add_playbooks(playbook)
+    apply_resolved(context)
+    get_tracker(context).start(playbook)
+
+
+@when("the playbooks are started")
+@requires()
+@mutates
+def start_all_playbooks(context: Context):
+    """Starts every declared playbook that hasn't run yet without waiting for them to finish
+    Example: When the playbooks are started
+    """
+    if not context.container:
+        raise ContainerNotConfigured()
+    if not context.container.playbooks:
+        raise PlaybooksNotConfigured()
+
+    apply_resolved(context)
+    tracker: PlaybookRunTracker = get_tracker(context)
+    for playbook in context.container.playbooks:
+        if not playbook.run_id:
+            tracker.start(playbook)
+
+
+@then('the started playbooks finish within "{seconds}" seconds')
+@requires()
+@mutates
+def wait_started_playbooks(context: Context, seconds: str):
+    """Waits for every started playbook to finish, answering their prompts. The playbook status is updated on the
+    container; collect the results to download the actions, pins, and notes.
+    Example: Then the started playbooks finish within "300" seconds
+
+    Raises:
+        TimeoutError: If a started playbook is still running after the given seconds
+    """
+    tracker: PlaybookRunTracker = get_tracker(context)
+    wait_for_runs(context, tracker, float(seconds))
+
+
+@then('the playbook "{playbook_name}" finishes within "{seconds}" seconds')
+@requires()
+@mutates
+def wait_started_playbook(context: Context, playbook_name: str, seconds: str):
+    """Waits for one started playbook to finish, answering its prompts
+    Example: Then the playbook "local/triage_blocked_domains" finishes within "300" seconds
+
+    Raises:
+        PlaybookNotRan: If the playbook wasn't started
+        TimeoutError: If the playbook is still running after the given seconds
+    """
+    playbook: Playbook = context.container.get_playbook(name=playbook_name)
+    if not playbook or not playbook.run_id:
+        raise PlaybookNotRan(f"Playbook {playbook_name} was not started")
+
+    wait_for_runs(context, get_tracker(context), float(seconds), [playbook.run_id])
+
+
+@when('the playbook "{playbook_name}" is load tested')
+@references(playbooks="playbook_name")
+def load_test_playbook(context: Context, playbook_name: str):
+    """Creates copies of the declared container at a target rate and runs the playbook on each copy. The success
+    rate, p50/p95/p99 latency from creation until the run finished, and containers per minute are printed and
+    kept for the load test checks. Sampled containers are collected so validations can run against them with
+    'Then on every sampled container, ...'. Every copy is registered, tag the scenario @cleanup to delete them.
+    Example: When the playbook "triage_blocked_domains" is load tested
+                | containers | rate | concurrency | sample | timeout |
+                | 200        | 2    | 20          | 5      | 600     |
+
+    Params:
+        containers: Containers to create
+        rate: Containers created per second (default 1)
+        concurrency: Containers created or running the playbook at the same time (default 10)
+        sample: Containers collected for validation (default 1)
+        timeout: Seconds a single playbook run may take (default 600)
+    """
+    if not getattr(context, "container", None):
+        raise ContainerNotConfigured()
+
+    registry = get_registry(context)
+    load_test: LoadTest = LoadTest(
+        context.phantom,
+        context.container,
+        playbook_name,
+        LoadTestSettings.from_row(table_to_array(context.table)[0]),
+        datasets=registry.datasets.get(registry.name_of(context.container), []),
+        poll_interval=float(context.config.userdata.get("poll_interval", 2)),
+        on_tick=lambda tracker: answer_started_prompts(context, tracker),
+    )
+    start: float = time.monotonic()
+    try:
+        load_test.run()
+    finally:
+        if getattr(context, "scenario_metrics", None):
+            context.scenario_metrics.add_wait(time.monotonic() - start)
+        for run in load_test.runs:
+            if run.container.id:
+                registry.register(run.container.name, run.container)
+    context.load_test = load_test
+
+    samples: list[Container] = [run.container for run in load_test.samples()]
+    registry.refresh_all(
+        context.phantom.update_container_values,
+        skip=lambda container: not any(container is sample for sample in samples),
+    )
+    print(f"Load test: {load_test.report()}")
 
 
 @when("the container and artifacts are created")
+@requires()
 def step_impl(context):
     """Creates the Container & Artifact objects within Phantom. This starts making resources in Phantom to run playbook on.
     Declare any resources (containers/artifacts) before using this step.
     Example: Then the container and artifacts are created
     """
-    if not context.container:
-        raise ContainerNotConfigured()
-
-    context.phantom.create_container(context.container)
+    create_selected_container(context)
 
     assert context.container.id
     for artifact in context.container.artifacts:
@@ -71,7 +245,43 @@ def step_impl(context):
         assert artifact.container
 
 
+@when("every container and its artifacts are created")
+def create_every_container(context: Context):
+    """Creates every container declared in the scenario at the same time. Containers that already exist are skipped.
+    The amount of containers created at once is set with -D container_workers (default 4)
+    Example: When every container and its artifacts are created
+    """
+    registry = get_registry(context)
+    if not len(registry):
+        raise ContainerNotConfigured()
+
+    registry.create_all(context.phantom)
+    for container in registry:
+        assert container.id
+
+
+@then("the results are collected for every container")
+@collects
+def collect_every_container(context: Context):
+    """Downloads the newest information of every created container in the scenario at the same time
+    Example: Then the results are collected for every container
+    """
+    refresh_all_containers(context)
+
+
+@then("every container is deleted")
+@requires()
+def delete_every_container(context: Context):
+    """Deletes every created container in the scenario from Splunk SOAR. Tag a scenario with @cleanup to do this
+    automatically once the scenario finishes.
+    Example: Then every container is deleted
+    """
+    get_registry(context).delete_all(context.phantom)
+
+
 @then('the note "{note_title}" with the content of "{note_content}"')
+@requires()
+@mutates
 def step_impl(context, note_title, note_content):
     """Creates a note on the initialized container"""
     if not context.container:
@@ -83,6 +293,8 @@ def step_impl(context, note_title, note_content):
 
 @then("close the container")
 @then("the container is closed")
+@requires()
+@mutates
 def step_impl(context):
     if not context.container:
         raise ContainerNotConfigured()
@@ -0,0 +1,203 @@
+import copy
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container, Playbook
+from dataset_artifacts import DatasetArtifacts
+from playbook_tracker import PlaybookRunTracker
+
+"""
+Module to put a playbook under load. Copies of the declared container are created at a target rate with a bounded
+number of containers in flight, the playbook is started on each copy, and the time from creation until the run finishes
+is measured. A few copies are kept as samples so the usual validation steps can run against them.
+"""
+
+# Latency percentiles reported for the successful runs
+LATENCY_PERCENTILES: tuple = ("p50", "p95", "p99")
+
+
+class LoadTestSettings:
+    def __init__(
+        self,
+        containers: int,
+        rate: float = 1.0,
+        concurrency: int = 10,
+        sample: int = 1,
+        timeout: float = 600.0,
+    ):
+        """Shape of a load test
+
+        Args:
+            containers (int): Containers to create
+            rate (float): Containers created per second
+            concurrency (int): Containers created or running the playbook at the same time
+            sample (int): Containers kept for validation steps, spread evenly over the test
+            timeout (float): Seconds a single playbook run may take
+        """
+        self.containers: int = containers
+        self.rate: float = rate
+        self.concurrency: int = concurrency
+        self.sample: int = min(sample, containers)
+        self.timeout: float = timeout
+
+    @classmethod
+    def from_row(cls, row: dict) -> "LoadTestSettings":
+        """Settings from a step table row. Missing columns keep their defaults"""
+        fields: dict = {"containers": int, "rate": float, "concurrency": int, "sample": int, "timeout": float}
+        return cls(**{key: cast(row[key]) for key, cast in fields.items() if row.get(key)})
+
+
+class LoadTestRun:
+    def __init__(self, number: int, container: Container):
+        """One container of the load test
+
+        Attributes:
+            latency (float): Seconds from the creation request until the playbook run finished
+            status (str): Final playbook run status, or "error" when the container or run failed
+            error (str): Exception raised while creating the container or waiting on the run
+        """
+        self.number: int = number
+        self.container: Container = container
+        self.latency: Optional[float] = None
+        self.status: Optional[str] = None
+        self.error: Optional[str] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "success"
+
+
+def percentile(values: list[float], percent: float) -> Optional[float]:
+    """Nearest rank percentile"""
+    if not values:
+        return None
+    ordered: list[float] = sorted(values)
+    return ordered[max(math.ceil(percent / 100 * len(ordered)) - 1, 0)]
+
+
+class LoadTest:
+    def __init__(
+        self,
+        client: PhantomClient,
+        container: Container,
+        playbook_name: str,
+        settings: LoadTestSettings,
+        datasets: list[DatasetArtifacts] = (),
+        poll_interval: float = 2.0,
+        on_tick: Optional[Callable[[PlaybookRunTracker], None]] = None,
+    ):
+        """Runs a playbook on copies of a declared container
+
+        Args:
+            client (PhantomClient): Client shared by every worker
+            container (Container): Declared container, not created. Every copy has its artifacts and datasets
+            playbook_name (str): Playbook started on each copy
+            settings (LoadTestSettings): Amount, rate, and concurrency
+            datasets (list[DatasetArtifacts]): Generated artifacts declared for the container
+            poll_interval (float): Seconds between playbook run polls of a copy
+            on_tick (Callable, optional): Called with the run tracker of a copy while its run is active
+        """
+        self.client: PhantomClient = client
+        self.container: Container = container
+        self.playbook_name: str = playbook_name
+        self.settings: LoadTestSettings = settings
+        self.datasets: list[DatasetArtifacts] = list(datasets)
+        self.poll_interval: float = poll_interval
+        self.on_tick: Optional[Callable[[PlaybookRunTracker], None]] = on_tick
+        self.runs: list[LoadTestRun] = []
+        self.started_at: Optional[float] = None
+
+    def copy_container(self, number: int) -> Container:
+        copied: Container = copy.deepcopy(self.container)
+        copied.name = f"{self.container.name} #{number}"
+        copied.playbooks = []
+        # The declared container may already exist when the scenario created it before the load test
+        copied.id = None
+        for artifact in copied.artifacts:
+            artifact.id = None
+            artifact.container = None
+        return copied
+
+    def _drive(self, run: LoadTestRun) -> LoadTestRun:
+        start: float = time.monotonic()
+        try:
+            self.client.create_container(run.container)
+            for dataset in self.datasets:
+                dataset.create(self.client, run.container)
+            playbook: Playbook = Playbook(name=self.playbook_name)
+            run.container.add_playbooks(playbook)
+            tracker = PlaybookRunTracker(self.client, run.container, self.poll_interval)
+            tracker.start(playbook)
+            tracker.wait(
+                timeout=self.settings.timeout,
+                on_tick=(lambda: self.on_tick(tracker)) if self.on_tick else None,
+            )
+            run.status = playbook.status
+        except Exception as error:
+            run.status = "error"
+            run.error = f"{type(error).__name__}: {error}"
+        run.finished_at = time.monotonic()
+        run.latency = run.finished_at - start
+        return run
+
+    def run(self) -> "LoadTest":
+        """Creates the containers at the target rate, never more than the concurrency in flight at once"""
+        slots: threading.Semaphore = threading.Semaphore(self.settings.concurrency)
+        interval: float = 1 / self.settings.rate if self.settings.rate > 0 else 0.0
+        self.started_at = time.monotonic()
+        next_start: float = self.started_at
+        futures: list[Future] = []
+        with ThreadPoolExecutor(
+            max_workers=self.settings.concurrency, thread_name_prefix="load-test"
+        ) as pool:
+            for number in range(1, self.settings.containers + 1):
+                slots.acquire()
+                delay: float = next_start - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                # Containers delayed by a full pool don't catch up in a burst once slots free up
+                next_start = max(next_start, time.monotonic()) + interval
+                run: LoadTestRun = LoadTestRun(number, self.copy_container(number))
+                self.runs.append(run)
+                future: Future = pool.submit(self._drive, run)
+                future.add_done_callback(lambda _: slots.release())
+                futures.append(future)
+        for future in futures:
+            future.result()
+        return self
+
+    def samples(self) -> list[LoadTestRun]:
+        """Created containers kept for validation, spread evenly over the test"""
+        created: list[LoadTestRun] = [run for run in self.runs if run.container.id]
+        if not created or not self.settings.sample:
+            return []
+        step: float = len(created) / self.settings.sample
+        return [created[int(position * step)] for position in range(min(self.settings.sample, len(created)))]
+
+    def report(self) -> dict:
+        latencies: list[float] = [run.latency for run in self.runs if run.succeeded]
+        finished: list[float] = [run.finished_at for run in self.runs if run.finished_at]
+        elapsed: float = (max(finished) - self.started_at) if finished and self.started_at else 0.0
+        succeeded: int = sum(1 for run in self.runs if run.succeeded)
+        return {
+            "playbook": self.playbook_name,
+            "containers": len(self.runs),
+            "succeeded": succeeded,
+            "success_rate": round(100 * succeeded / len(self.runs), 2) if self.runs else 0.0,
+            **{f"{name}_seconds": _rounded(percentile(latencies, float(name[1:]))) for name in LATENCY_PERCENTILES},
+            "containers_per_minute": round(succeeded / elapsed * 60, 2) if elapsed else 0.0,
+            "elapsed_seconds": round(elapsed, 3),
+            "statuses": {
+                status: sum(1 for run in self.runs if run.status == status)
+                for status in sorted({run.status for run in self.runs})
+            },
+            "errors": sorted({run.error for run in self.runs if run.error})[:10],
+        }
+
+
+def _rounded(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds, 3) if seconds is not None else None
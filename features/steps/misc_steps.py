@@ -9,6 +9,11 @@ import json
 import time
 from behave.runner import Context
 from soarsdk.objects import Container
+from container_index import refresh_container
+from playbook_cache import mark_replayed
+from container_registry import register_container
+from snapshot import SnapshotLimits, load_snapshot, write_snapshot
+from fetch_planner import mutates, requires
 
 """
 Module for misc functions and utilities 
@@ -16,6 +21,8 @@ Module for misc functions and utilities
 
 
 @then('wait for "{count}" seconds')
+@requires()
+@mutates
 def wait(context: Context, count: str):
     """Waits for a period of time. Useful when working with an active playbook or a delayed result.
 
@@ -26,16 +33,61 @@ def wait(context: Context, count: str):
     time.sleep(int(count))
 
 
+def snapshot_limits(userdata, prefix: str = "snapshot") -> SnapshotLimits:
+    """Snapshot limits from behave -D options, e.g. -D snapshot_fields=id,artifacts -D snapshot_max_depth=6"""
+
+    def limit(name: str, default: str = None):
+        value = userdata.get(f"{prefix}_{name}", default)
+        return int(value) if value not in (None, "") else None
+
+    fields: str = userdata.get(f"{prefix}_fields")
+    return SnapshotLimits(
+        fields=[field.strip() for field in fields.split(",")] if fields else None,
+        max_depth=limit("max_depth"),
+        max_string=limit("max_string", "2000"),
+        max_items=limit("max_items", "100"),
+    )
+
+
 @then("debug")
 @then("throw error")
 def step_impl(context: Context):
-    """Stops the execution of the test and prints the Container object to the console"""
-    print(context.container.toJson())
-    assert 1 == 2
+    """Stops the execution of the test and writes the container to a compressed snapshot under -D debug_dir (default
+    debug). Long strings and lists are truncated; see README for the snapshot options.
+    """
+    path: str = os.path.join(
+        context.config.userdata.get("debug_dir", "debug"),
+        f"container_{context.container.id or context.container.name}.json.gz",
+    )
+    size: int = write_snapshot(path, context.container, snapshot_limits(context.config.userdata))
+    raise AssertionError(f"Stopped by the debug step. Container written to {path} ({size} bytes)")
+
+
+@then('the container is saved to "{path}"')
+def save_container_snapshot(context: Context, path: str):
+    """Writes the complete container to a snapshot file, compressed when the path ends with .gz. The snapshot can be
+    loaded later with the step 'Given the container snapshot "path"' to validate it without a SOAR server.
+    Example: Then the container is saved to "snapshots/blocked_domain.json.gz"
+    """
+    write_snapshot(path, context.container)
+
+
+@given('the container snapshot "{path}"')
+def load_container_snapshot(context: Context, path: str):
+    """Loads a container saved with 'Then the container is saved to "path"' as the context container. Collecting the
+    results keeps the loaded values. Tag the scenario with @offline to run it without a SOAR connection.
+    Example: Given the container snapshot "snapshots/blocked_domain.json.gz"
+    """
+    container: Container = load_snapshot(path)
+    if not isinstance(container, Container):
+        raise ValueError(f"The snapshot {path} does not contain a container")
+    register_container(context, container.name, container)
+    mark_replayed(context, container)
 
 
 @then("the browser is opened")
 @then("open the browser")
+@requires()
 def open_browser(context: Context) -> None:
     """
     Forces the container to open on the default web browser.
@@ -54,7 +106,7 @@ def delete_container(context: Context) -> None:
 def download_context_container(context: Context, container_id: int):
     """Downloads an existing container and stores it into the context. Useful when debugging existing containers"""
     context.container: Container = Container(id=container_id)
-    context.phantom.update_container_values(context.container)
+    refresh_container(context)
 
 
 @then('ask the user to "{prompt}"')
@@ -0,0 +1,227 @@
+import copy
+import json
+from typing import Any, Callable, Optional
+from behave.model import Scenario, ScenarioOutline, Step
+from behave.runner import Context
+from soarsdk.objects import Artifact, Container
+import utility_functions as utils
+
+"""
+Batch mode for Scenario Outlines tagged @batch. The first Examples row to reach the creation step declares every other
+row, packs the artifacts of all rows into one container (artifact names are suffixed with " #<row>"), and creates it.
+Playbooks run once on the packed container and every row validates a view of it holding only its own artifacts under
+their declared names, so each row is still reported as its own scenario. Playbooks, prompt answers, pins, notes,
+comments, and artifacts added after creation belong to the whole container and are shared by every row.
+"""
+
+BATCH_TAG: str = "batch"
+CREATION_STEP: str = "the container and artifacts are created"
+# Context values set by the steps that declare a row, restored once the row is declared
+ROW_VALUES: tuple = ("container", "containers", "phantom", "replacement_vars", "prompt_policy", "data")
+
+
+def declared_values(container: Container) -> str:
+    """Declared container values and playbook names, without the artifacts"""
+    values: dict = {key: value for key, value in vars(container).items() if key not in ("artifacts", "playbooks")}
+    values["playbooks"] = sorted(playbook.name for playbook in container.playbooks)
+    return json.dumps(values, sort_keys=True, default=str)
+
+
+def step_source(step: Step) -> str:
+    """Gherkin text of a step with its table or text, as context.execute_steps() parses it"""
+    lines: list[str] = [f"{step.keyword} {step.name}"]
+    if step.text is not None:
+        lines.extend(['"""', *step.text.splitlines(), '"""'])
+    if step.table:
+        for cells in [step.table.headings, *step.table.rows]:
+            lines.append("| " + " | ".join(str(cell).replace("|", "\\|") for cell in cells) + " |")
+    return "\n".join(lines)
+
+
+def declare_scenario(context: Context, scenario: Scenario) -> Container:
+    """Runs the steps of a scenario up to its creation step and returns the container they declared. The steps run
+    through context.execute_steps() without a client, so the step hooks run as usual. The context values of the row
+    steps, such as the selected container, replacement variables, or a prompt policy, are restored afterwards and
+    never reach the running scenario.
+    """
+    steps: list[Step] = []
+    for step in scenario.all_steps:
+        if step.name == CREATION_STEP:
+            break
+        steps.append(step)
+
+    saved: dict[str, Any] = {name: getattr(context, name) for name in ROW_VALUES if hasattr(context, name)}
+    try:
+        context.container = None
+        context.containers = None
+        context.phantom = None
+        context.replacement_vars = dict(context.replacement_vars)
+        if steps:
+            context.execute_steps("\n".join(step_source(step) for step in steps))
+
+        declared: Optional[Container] = context.container
+        if declared is None:
+            raise ValueError(f"Examples row {scenario.name} does not declare a container")
+        if context.containers and any(context.containers.datasets.values()):
+            raise ValueError("Artifacts generated from datasets can't be batched, remove the @batch tag")
+        utils.context_variable_replacement(declared, context.replacement_vars)
+        return declared
+    finally:
+        for name in ROW_VALUES:
+            if name in saved:
+                setattr(context, name, saved[name])
+            elif hasattr(context, name):
+                delattr(context, name)
+
+
+class OutlineBatch:
+    def __init__(self, scenarios: list[Scenario]):
+        """Shared container of the Examples rows of one Scenario Outline
+
+        Args:
+            scenarios (list[Scenario]): Row scenarios of the outline that run, in Examples order
+
+        Attributes:
+            container (Container): Packed container once created
+            artifact_rows (dict): Packed artifact name to the row number and declared artifact name
+            cleanup (bool): Delete the packed container at the end of the feature
+        """
+        self.scenarios: list[Scenario] = scenarios
+        self.container: Optional[Container] = None
+        self.artifact_rows: dict[str, tuple[int, str]] = {}
+        self.views: dict[int, Container] = {}
+        self.cleanup: bool = False
+        self.error: Optional[BaseException] = None
+        # Run and refresh requests already sent for the packed container, and how many each row has asked for
+        self.done: dict[str, int] = {"run": 0, "refresh": 0}
+        self.requested: dict[tuple[str, int], int] = {}
+        self.outcomes: dict[tuple[str, int], Any] = {}
+
+    def row_of(self, scenario: Scenario) -> int:
+        return next(number for number, row in enumerate(self.scenarios, 1) if row is scenario)
+
+    def pack(self, containers: dict[int, Container]) -> Container:
+        """One container with the artifacts of every row
+
+        Raises:
+            ValueError: If the rows declare different container values or playbooks
+        """
+        first: Container = containers[min(containers)]
+        packed: Container = copy.deepcopy(first)
+        packed.artifacts = []
+        for row, container in sorted(containers.items()):
+            if declared_values(container) != declared_values(first):
+                raise ValueError(
+                    f"Examples row {row} declares a different container or playbooks than row {min(containers)}. "
+                    f"Only rows that differ in their artifacts can be batched"
+                )
+            for artifact in container.artifacts:
+                batched: Artifact = copy.deepcopy(artifact)
+                batched.name = f"{artifact.name} #{row}"
+                self.artifact_rows[batched.name] = (row, artifact.name)
+                packed.artifacts.append(batched)
+        return packed
+
+    def create(
+        self, context: Context, container: Container, create: Callable[[Container], Container]
+    ) -> Container:
+        """Creates the packed container on the first call and turns the row's declared container into its view"""
+        row: int = self.row_of(context.scenario)
+        if self.container is None and self.error is None:
+            try:
+                declared: dict[int, Container] = {
+                    number: container
+                    if scenario is context.scenario
+                    else declare_scenario(context, scenario)
+                    for number, scenario in enumerate(self.scenarios, 1)
+                }
+                packed: Container = self.pack(declared)
+                create(packed)
+                self.container = packed
+            except Exception as error:
+                self.error = error
+                raise
+        if self.error is not None:
+            raise self.error
+        self.cleanup = self.cleanup or "cleanup" in context.scenario.effective_tags
+        self.views[row] = container
+        return self.view(row)
+
+    def view(self, row: int) -> Container:
+        """Updates the row's view with the newest values of the packed container"""
+        view: Container = self.views[row]
+        view.__dict__.update(self.container.__dict__)
+        view.artifacts = []
+        for artifact in self.container.artifacts:
+            if artifact.name not in self.artifact_rows:
+                # Added after creation, e.g. by a playbook, and shared by every row like notes and comments
+                view.artifacts.append(artifact)
+                continue
+            number, name = self.artifact_rows[artifact.name]
+            if number == row:
+                artifact = copy.copy(artifact)
+                artifact.name = name
+                view.artifacts.append(artifact)
+        return view
+
+    def is_view(self, container: Container) -> bool:
+        return any(view is container for view in self.views.values())
+
+    def once(self, kind: str, container: Container, action: Callable[[Container], Any]) -> Any:
+        """Runs the action on the packed container when the row is the first to reach its n-th run or refresh. Later
+        rows reuse the outcome, errors included, so every row reports the same result.
+        """
+        row: int = next(number for number, view in self.views.items() if view is container)
+        count: int = self.requested.get((kind, row), 0)
+        self.requested[(kind, row)] = count + 1
+        try:
+            if count >= self.done[kind]:
+                self.done[kind] += 1
+                try:
+                    self.outcomes[(kind, count)] = action(self.container)
+                except Exception as error:
+                    self.outcomes[(kind, count)] = error
+                    raise
+            outcome: Any = self.outcomes.get((kind, count))
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+        finally:
+            self.view(row)
+
+
+def get_batch(context: Context) -> Optional[OutlineBatch]:
+    """Batch of the running scenario when it is an Examples row of a @batch Scenario Outline"""
+    scenario: Scenario = context.scenario
+    if BATCH_TAG not in scenario.effective_tags or getattr(scenario, "_row", None) is None:
+        return None
+
+    outline: Optional[ScenarioOutline] = next(
+        (
+            outline
+            for outline in scenario.feature.scenarios
+            if isinstance(outline, ScenarioOutline)
+            and any(row is scenario for row in outline.scenarios)
+        ),
+        None,
+    )
+    if outline is None:
+        return None
+
+    cached: Optional[tuple] = context.outline_batches.get(id(outline))
+    if cached and cached[0] is outline:
+        return cached[1]
+    rows: list[Scenario] = [
+        row for row in outline.scenarios if row is scenario or row.should_run(context.config)
+    ]
+    batch: OutlineBatch = OutlineBatch(rows)
+    context.outline_batches[id(outline)] = (outline, batch)
+    return batch
+
+
+def batch_of(context: Context, container: Container) -> Optional[OutlineBatch]:
+    """Batch whose view the container is"""
+    for _, batch in getattr(context, "outline_batches", {}).values():
+        if batch.is_view(container):
+            return batch
+    return None
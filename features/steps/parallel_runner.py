@@ -0,0 +1,235 @@
+import argparse
+import collections
+import heapq
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional
+from behave.parser import parse_file
+from behave.tag_expression import TagExpression
+from scenario_timings import ScenarioTimings, scenario_key
+
+"""
+Runs scenarios across parallel behave processes. Scenarios are assigned to workers longest job first using the
+durations recorded from previous runs, and idle workers steal queued scenarios from the busiest worker.
+
+Usage:
+    python features/steps/parallel_runner.py features/ --workers 4 --timings .behave_timings.json
+"""
+
+SERIAL_TAG: str = "serial"
+
+
+class ScenarioJob:
+    def __init__(self, location: str, key: str, tags: list[str], estimate: float):
+        """A single scenario (or scenario outline row) to run in its own behave process
+
+        Args:
+            location (str): "file:line" location understood by behave
+            key (str): Timing key of the scenario, see scenario_timings.scenario_key()
+            tags (list[str]): Effective tags of the scenario
+            estimate (float): Expected duration in seconds
+        """
+        self.location: str = location
+        self.key: str = key
+        self.tags: list[str] = tags
+        self.estimate: float = estimate
+        self.returncode: Optional[int] = None
+        self.duration: float = 0.0
+        self.output: str = ""
+
+    @property
+    def serial(self) -> bool:
+        return SERIAL_TAG in self.tags
+
+
+def find_feature_files(paths: list[str]) -> list[str]:
+    """Expands the provided files and directories into a sorted list of feature files"""
+    feature_files: list[str] = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                feature_files.extend(
+                    os.path.join(root, name)
+                    for name in files
+                    if name.endswith(".feature")
+                )
+        else:
+            feature_files.append(path)
+    return sorted(feature_files)
+
+
+def collect_jobs(
+    paths: list[str], timings: ScenarioTimings, tags: Optional[list[str]] = None
+) -> list[ScenarioJob]:
+    """Parses the feature files and returns one job per scenario matching the tag expression.
+    Tags such as @ignore_exception are kept on the scenario since every job runs through behave itself.
+    """
+    tag_expression: TagExpression = TagExpression(tags or [])
+    jobs: list[ScenarioJob] = []
+
+    for feature_file in find_feature_files(paths):
+        feature = parse_file(feature_file)
+        if not feature:
+            continue
+        for scenario in feature.walk_scenarios():
+            scenario_tags: list[str] = list(scenario.effective_tags)
+            if not tag_expression.check(scenario_tags):
+                continue
+            key: str = scenario_key(scenario.filename, scenario.name)
+            jobs.append(
+                ScenarioJob(
+                    location=f"{scenario.filename}:{scenario.line}",
+                    key=key,
+                    tags=scenario_tags,
+                    estimate=timings.estimate(key),
+                )
+            )
+    return jobs
+
+
+def assign_jobs(
+    jobs: list[ScenarioJob], workers: int
+) -> list[collections.deque]:
+    """Longest-processing-time-first bin packing. Each job is given to the worker with the lowest estimated
+    load, which keeps the slowest worker within 4/3 of the optimal schedule.
+    """
+    queues: list[collections.deque] = [collections.deque() for _ in range(workers)]
+    loads: list[tuple[float, int]] = [(0.0, worker) for worker in range(workers)]
+    heapq.heapify(loads)
+
+    for job in sorted(jobs, key=lambda job: job.estimate, reverse=True):
+        load, worker = heapq.heappop(loads)
+        queues[worker].append(job)
+        heapq.heappush(loads, (load + job.estimate, worker))
+    return queues
+
+
+class WorkStealingPool:
+    def __init__(self, queues: list[collections.deque], run_job) -> None:
+        """Runs the assigned queues with one thread per worker. A worker whose queue is empty steals the
+        smallest queued job from the worker with the most estimated time remaining.
+
+        Args:
+            queues (list[deque]): Jobs per worker ordered longest first
+            run_job (Callable[[ScenarioJob], None]): Executes a single job
+        """
+        self.queues: list[collections.deque] = queues
+        self.run_job = run_job
+        self.lock: threading.Lock = threading.Lock()
+        self.steals: int = 0
+
+    def _remaining(self, worker: int) -> float:
+        return sum(job.estimate for job in self.queues[worker])
+
+    def _next_job(self, worker: int) -> Optional[ScenarioJob]:
+        with self.lock:
+            if self.queues[worker]:
+                return self.queues[worker].popleft()
+
+            victim: int = max(range(len(self.queues)), key=self._remaining)
+            if not self.queues[victim]:
+                return None
+            self.steals += 1
+            return self.queues[victim].pop()
+
+    def _work(self, worker: int) -> None:
+        job: Optional[ScenarioJob] = self._next_job(worker)
+        while job:
+            self.run_job(job)
+            job = self._next_job(worker)
+
+    def run(self) -> None:
+        threads: list[threading.Thread] = [
+            threading.Thread(target=self._work, args=(worker,), daemon=True)
+            for worker in range(len(self.queues))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def behave_job_runner(timings_path: str, behave_args: list[str]):
+    """Returns a function executing a job inside of a new behave process"""
+    print_lock: threading.Lock = threading.Lock()
+
+    def run_job(job: ScenarioJob) -> None:
+        command: list[str] = [
+            sys.executable,
+            "-m",
+            "behave",
+            job.location,
+            "-D",
+            f"timings_file={timings_path}",
+            *behave_args,
+        ]
+        start: float = time.monotonic()
+        process = subprocess.run(command, capture_output=True, text=True)
+        job.duration = time.monotonic() - start
+        job.returncode = process.returncode
+        job.output = process.stdout + process.stderr
+
+        with print_lock:
+            result: str = "passed" if job.returncode == 0 else "failed"
+            print(f"{result:<7} {job.duration:8.1f}s  {job.location}")
+            if job.returncode != 0:
+                print(job.output)
+
+    return run_job
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Run behave scenarios in parallel, balanced by historical durations"
+    )
+    parser.add_argument("paths", nargs="*", default=["features"])
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--timings", default=".behave_timings.json")
+    parser.add_argument(
+        "-t",
+        "--tags",
+        action="append",
+        help="behave tag expression used to select scenarios, may be repeated",
+    )
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    # Arguments after "--" are passed through to every behave process
+    behave_args: list[str] = []
+    if "--" in argv:
+        behave_args = argv[argv.index("--") + 1 :]
+        argv = argv[: argv.index("--")]
+    args = parser.parse_args(argv)
+
+    timings: ScenarioTimings = ScenarioTimings(args.timings).load()
+    jobs: list[ScenarioJob] = collect_jobs(args.paths, timings, args.tags)
+    run_job = behave_job_runner(args.timings, behave_args)
+
+    parallel_jobs: list[ScenarioJob] = [job for job in jobs if not job.serial]
+    serial_jobs: list[ScenarioJob] = [job for job in jobs if job.serial]
+
+    start: float = time.monotonic()
+    pool: WorkStealingPool = WorkStealingPool(
+        assign_jobs(parallel_jobs, max(1, args.workers)), run_job
+    )
+    pool.run()
+
+    # Scenarios tagged @serial share global SOAR state and run alone once the parallel jobs are finished, in the
+    # order of the feature files
+    for job in serial_jobs:
+        run_job(job)
+
+    failed: list[ScenarioJob] = [job for job in jobs if job.returncode != 0]
+    print(
+        f"\n{len(jobs) - len(failed)} passed, {len(failed)} failed, {pool.steals} stolen "
+        f"in {time.monotonic() - start:.1f}s with {args.workers} workers"
+    )
+    for job in failed:
+        print(f"  failed: {job.location}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
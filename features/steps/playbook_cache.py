@@ -0,0 +1,217 @@
+import hashlib
+import json
+import os
+from typing import Optional
+from behave.runner import Context
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container, Playbook
+from snapshot import load_snapshot, save_snapshot
+from outline_batch import batch_of
+from preflight import apply_resolved
+
+"""
+Opt-in cache of playbook run results. Scenarios tagged @cacheable run deterministic playbooks; when the declared
+container, its artifacts, the playbooks, and the playbook versions on the server match an earlier run, the cached run,
+action, pin, comment, and note data is replayed into the container instead of running the playbooks.
+"""
+
+CACHE_TAG: str = "cacheable"
+
+# Declared values that change the input of a playbook. Server assigned values (ids, times) are left out
+CONTAINER_INPUT_FIELDS: tuple = (
+    "name",
+    "label",
+    "severity",
+    "sensitivity",
+    "status",
+    "description",
+    "custom_fields",
+    "tags",
+    "data",
+)
+ARTIFACT_INPUT_FIELDS: tuple = ("name", "label", "cef", "tags", "severity_id", "data")
+# Playbook record fields that change whenever the playbook is saved on the server. Missing fields are ignored
+PLAYBOOK_VERSION_FIELDS: tuple = ("id", "version", "python_version", "latest_update_time", "update_time")
+
+
+def file_digest(path: str) -> str:
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def configuration_inputs(container: Container, datasets: list = ()) -> dict:
+    """Declared configuration of a container and its artifacts, without server assigned values"""
+    return {
+        "container": {field: getattr(container, field, None) for field in CONTAINER_INPUT_FIELDS},
+        "artifacts": sorted(
+            (
+                {field: getattr(artifact, field, None) for field in ARTIFACT_INPUT_FIELDS}
+                for artifact in container.artifacts
+            ),
+            key=lambda artifact: json.dumps(artifact, sort_keys=True, default=str),
+        ),
+        "datasets": [
+            {"label": dataset.label, "sha256": file_digest(dataset.path)} for dataset in datasets
+        ],
+    }
+
+
+def canonical_digest(inputs: dict) -> str:
+    """sha256 of the inputs in a canonical JSON form"""
+    canonical: str = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _playbook_name(playbook: Playbook) -> str:
+    # Playbooks may be declared with their repository, e.g. local/triage_blocked_domains
+    return (playbook.name or "").split("/")[-1]
+
+
+class PlaybookCache:
+    def __init__(self, directory: str):
+        """Stores one snapshot file per input fingerprint
+
+        Args:
+            directory (str): Folder holding the cached snapshots
+        """
+        self.directory: str = directory
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def playbook_versions(self, client: PhantomClient, playbooks: list[Playbook]) -> dict:
+        """Returns the version fields of each playbook as stored on the server"""
+        versions: dict = {}
+        for name in sorted({_playbook_name(playbook) for playbook in playbooks}):
+            records: list[dict] = client._handle_request(
+                method="GET",
+                url="playbook?",
+                params={"_filter_name__exact": name},
+                return_data_only=True,
+            )
+            versions[name] = sorted(
+                (
+                    {field: record.get(field) for field in PLAYBOOK_VERSION_FIELDS}
+                    for record in records
+                ),
+                key=lambda record: str(record.get("id")),
+            )
+        return versions
+
+    def fingerprint(
+        self,
+        client: PhantomClient,
+        container: Container,
+        datasets: list = (),
+        prompt_policy: Optional[str] = None,
+    ) -> str:
+        """Canonical sha256 of everything the playbook run depends on
+
+        Args:
+            client (PhantomClient): Client used to look up the playbook versions
+            container (Container): Declared container with its artifacts and playbooks
+            datasets (list[DatasetArtifacts]): Artifacts generated for the container
+            prompt_policy (str, optional): Digest of the prompt policy answering the playbook prompts
+        """
+        inputs: dict = {
+            **configuration_inputs(container, datasets),
+            # Playbooks run in declaration order, earlier runs are part of the input of later ones
+            "playbooks": [
+                {
+                    "name": _playbook_name(playbook),
+                    "prompts": playbook.prompts,
+                    "ran": bool(playbook.run_id or playbook.id),
+                }
+                for playbook in container.playbooks
+            ],
+            "versions": self.playbook_versions(client, container.playbooks),
+            "prompt_policy": prompt_policy,
+        }
+        return canonical_digest(inputs)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def load(self, key: str) -> Optional[Container]:
+        if not os.path.exists(self.path(key)):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return load_snapshot(self.path(key))
+
+    def store(self, key: str, container: Container) -> None:
+        save_snapshot(self.path(key), container)
+
+    def metrics(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def replay(container: Container, cached: Container) -> None:
+    """Copies the cached results into the container. The container keeps its own id"""
+    for field, value in vars(cached).items():
+        if field != "id":
+            setattr(container, field, value)
+
+
+def is_replayed(context: Context, container: Container) -> bool:
+    """Replayed containers hold cached results, downloading them again would discard those results"""
+    return any(
+        replayed is container for replayed in getattr(context, "replayed_containers", [])
+    )
+
+
+def mark_replayed(context: Context, container: Container) -> None:
+    """Marks a container whose values came from a snapshot instead of the server"""
+    if not hasattr(context, "replayed_containers"):
+        context.replayed_containers = []
+    context.replayed_containers.append(container)
+
+
+def run_playbooks(context: Context, container: Optional[Container] = None) -> bool:
+    """Runs the container's playbooks, replaying cached results for @cacheable scenarios when -D playbook_cache
+    is set. Results of live runs are cached only when the run finished without an exception.
+
+    Returns:
+        replayed (bool): True when the results came from the cache
+    """
+    container = container or context.container
+    batch = batch_of(context, container)
+    if batch:
+        # Rows of a @batch outline run the playbooks once on the packed container
+        return batch.once("run", container, lambda packed: run_playbooks(context, packed))
+
+    cache: Optional[PlaybookCache] = getattr(context, "playbook_cache", None)
+    if not cache or CACHE_TAG not in context.scenario.effective_tags:
+        apply_resolved(context, container)
+        context.phantom.run_playbooks(container)
+        return False
+
+    registry = getattr(context, "containers", None)
+    datasets: list = (
+        registry.datasets.get(registry.name_of(container), []) if registry else []
+    )
+    policy = getattr(context, "prompt_policy", None)
+    key: str = cache.fingerprint(
+        context.phantom, container, datasets, policy.digest if policy else None
+    )
+    cached: Optional[Container] = cache.load(key)
+    if cached:
+        replay(container, cached)
+        mark_replayed(context, container)
+        return True
+
+    if is_replayed(context, container):
+        # Earlier playbooks were replayed and never ran on this container, so every playbook runs live
+        container.playbooks = [
+            Playbook(name=playbook.name, prompts=playbook.prompts)
+            for playbook in container.playbooks
+        ]
+        context.replayed_containers.remove(container)
+
+    apply_resolved(context, container)
+    context.phantom.run_playbooks(container)
+    cache.store(key, container)
+    return False
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Optional
+from soarsdk.objects import Action, Container, Playbook
+
+"""
+Module to measure how long playbooks and actions ran, from the timestamps Splunk SOAR stores on the playbook and
+action runs downloaded when the results are collected. A playbook run has no end time of its own, so a finished run
+ends at its last update.
+"""
+
+ACTIVE_STATUSES: tuple = ("pending", "running")
+
+
+def parse_time(value: Optional[str]) -> Optional[datetime]:
+    """Parses a Splunk SOAR timestamp such as 2023-05-01T12:30:00.123456Z"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def _seconds(start: Optional[str], end: Optional[str]) -> Optional[float]:
+    started, ended = parse_time(start), parse_time(end)
+    if not started or not ended:
+        return None
+    return max((ended - started).total_seconds(), 0.0)
+
+
+def playbook_duration(playbook: Playbook) -> Optional[float]:
+    """Seconds between the start and the last update of a finished run. None while the run is active"""
+    if playbook.status in ACTIVE_STATUSES:
+        return None
+    return _seconds(playbook.start_time, playbook.update_time)
+
+
+def action_duration(action: Action) -> Optional[float]:
+    """Seconds between the start and end of the action. None while the action is running"""
+    return _seconds(action.start_time, action.end_time)
+
+
+def _rounded(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds, 3) if seconds is not None else None
+
+
+def duration_breakdown(container: Container) -> list[dict]:
+    """Duration of every playbook run and its actions on the container, in run order"""
+    breakdown: list[dict] = []
+    for playbook in container.playbooks:
+        if not (playbook.run_id or playbook.id):
+            continue
+        breakdown.append(
+            {
+                "playbook": playbook.name,
+                "status": playbook.status,
+                "seconds": _rounded(playbook_duration(playbook)),
+                "actions": [
+                    {
+                        "action": action.name,
+                        "status": action.status,
+                        "seconds": _rounded(action_duration(action)),
+                    }
+                    for action in sorted(playbook.actions, key=lambda action: action.start_time or "")
+                ],
+            }
+        )
+    return breakdown
+
+
+def format_breakdown(breakdown: list[dict]) -> str:
+    """Durations as an indented table, slowest actions first within each playbook"""
+    lines: list[str] = []
+    for playbook in breakdown:
+        lines.append(f"{playbook['playbook']} ({playbook['status']}): {playbook['seconds']}s")
+        for action in sorted(playbook["actions"], key=lambda action: -(action["seconds"] or 0)):
+            lines.append(f"    {action['action']} ({action['status']}): {action['seconds']}s")
+    return "\n".join(lines)
@@ -0,0 +1,200 @@
+import time
+from typing import Callable, Optional
+from behave.runner import Context
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container, Playbook
+
+"""
+Module to follow playbook runs on a container without downloading the container. Each tick asks the playbook_run
+endpoint only for records updated since the last change seen, and action runs are only requested on ticks where a
+playbook run changed.
+"""
+
+PENDING: str = "pending"
+RUNNING: str = "running"
+# Any other status reported by the server (success, failed, cancelled, ...) ends the run
+ACTIVE_STATUSES: tuple = (PENDING, RUNNING)
+
+
+class TrackedRun:
+    def __init__(self, run_id: int, playbook: Optional[Playbook] = None):
+        """Local state of a single playbook run
+
+        Args:
+            run_id (int): playbook_run id
+            playbook (Playbook, optional): Declared playbook updated with the run status
+        """
+        self.run_id: int = run_id
+        self.playbook: Optional[Playbook] = playbook
+        self.state: str = PENDING
+        self.update_time: Optional[str] = None
+        self.actions: dict[int, str] = {}
+        self.callbacks: list[Callable[["TrackedRun"], None]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.state not in ACTIVE_STATUSES
+
+    def apply(self, record: dict) -> bool:
+        """Moves the run to the status of the record. Returns True when the run just finished"""
+        if self.finished or record.get("update_time") == self.update_time:
+            return False
+        self.update_time = record.get("update_time")
+        self.state = record.get("status") or self.state
+        if self.playbook:
+            self.playbook.status = self.state
+            self.playbook.update_time = self.update_time
+        return self.finished
+
+
+class PlaybookRunTracker:
+    def __init__(self, client: PhantomClient, container: Container, poll_interval: float = 2.0):
+        """Follows the playbook runs of one container
+
+        Args:
+            client (PhantomClient): Client of the scenario
+            container (Container): Created container the playbooks run on
+            poll_interval (float): Seconds between ticks
+        """
+        self.client: PhantomClient = client
+        self.container: Container = container
+        self.poll_interval: float = poll_interval
+        self.runs: dict[int, TrackedRun] = {}
+        # Newest update_time seen on the container's playbook runs
+        self.since: Optional[str] = None
+        self.queries: int = 0
+
+    def track(
+        self,
+        run_id: int,
+        playbook: Optional[Playbook] = None,
+        on_complete: Optional[Callable[[TrackedRun], None]] = None,
+    ) -> TrackedRun:
+        run: TrackedRun = self.runs.setdefault(run_id, TrackedRun(run_id, playbook))
+        if on_complete:
+            run.callbacks.append(on_complete)
+        return run
+
+    def start(self, playbook: Playbook, scope: str = "all", **kwargs) -> TrackedRun:
+        """Starts the playbook on the container without waiting for it. Same request as PhantomClient.run_playbooks"""
+        response: dict = self.client._handle_request(
+            method="POST",
+            url="playbook_run",
+            json={
+                "container_id": self.container.id,
+                "playbook_id": playbook.playbook_id or playbook.name,
+                "scope": scope,
+                "run": True,
+            },
+        )
+        playbook.run_id = response.get("playbook_run_id")
+        playbook.id = playbook.run_id
+        return self.track(playbook.run_id, playbook, **kwargs)
+
+    def _records(self, url: str, params: dict) -> list[dict]:
+        self.queries += 1
+        return self.client._handle_request(
+            method="GET", url=url, params=params, return_data_only=True
+        )
+
+    def poll(self) -> list[TrackedRun]:
+        """One tick. Returns the runs that finished during the tick and fires their callbacks"""
+        params: dict = {
+            "_filter_container": self.container.id,
+            "page_size": 0,
+            "sort": "update_time",
+            "order": "asc",
+        }
+        if self.since:
+            # Greater or equal, records updated within the same timestamp as the last tick are compared locally.
+            # The client JSON-encodes string filters itself
+            params["_filter_update_time__gte"] = self.since
+        records: list[dict] = self._records("playbook_run", params)
+
+        finished: list[TrackedRun] = []
+        changed: list[TrackedRun] = []
+        for record in records:
+            self.since = max(self.since or "", record.get("update_time") or "") or None
+            run: Optional[TrackedRun] = self.runs.get(record.get("id"))
+            if run and record.get("update_time") != run.update_time:
+                changed.append(run)
+                if run.apply(record):
+                    finished.append(run)
+
+        if changed:
+            self._update_actions(changed)
+        for run in finished:
+            for callback in run.callbacks:
+                callback(run)
+        return finished
+
+    def _update_actions(self, runs: list[TrackedRun]) -> None:
+        """Action run statuses of the runs that changed during the tick"""
+        actions: list[dict] = self._records(
+            "action_run",
+            {
+                "_filter_playbook_run__in": str([run.run_id for run in runs]),
+                "page_size": 0,
+            },
+        )
+        for action in actions:
+            run: Optional[TrackedRun] = self.runs.get(action.get("playbook_run"))
+            if run:
+                run.actions[action.get("id")] = action.get("status")
+
+    def pending(self, run_ids: Optional[list[int]] = None) -> list[TrackedRun]:
+        return [
+            run
+            for run_id, run in self.runs.items()
+            if not run.finished and (run_ids is None or run_id in run_ids)
+        ]
+
+    def wait(
+        self,
+        run_ids: Optional[list[int]] = None,
+        timeout: float = 600.0,
+        on_tick: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Polls until the runs (defaults to every tracked run) have finished
+
+        Args:
+            run_ids (list[int], optional): Runs to wait on
+            timeout (float): Seconds to wait before giving up
+            on_tick (Callable, optional): Called every tick while runs are active, e.g. to answer prompts
+
+        Raises:
+            TimeoutError: If the runs are still active after the timeout
+        """
+        deadline: float = time.monotonic() + timeout
+        while True:
+            self.poll()
+            active: list[TrackedRun] = self.pending(run_ids)
+            if not active:
+                return
+            if time.monotonic() >= deadline:
+                raise TimeoutError(
+                    f"Playbook runs {[run.run_id for run in active]} on container {self.container.id} did not finish within {timeout} seconds"
+                )
+            if on_tick:
+                on_tick()
+            time.sleep(self.poll_interval)
+
+
+def get_tracker(context: Context, container: Optional[Container] = None) -> PlaybookRunTracker:
+    """Returns the run tracker of the container (defaults to context.container), stored on the scenario context"""
+    container = container or context.container
+    trackers: Optional[dict] = getattr(context, "playbook_trackers", None)
+    if trackers is None:
+        trackers = context.playbook_trackers = {}
+
+    cached: Optional[tuple] = trackers.get(id(container))
+    if cached and cached[0] is container:
+        return cached[1]
+
+    tracker: PlaybookRunTracker = PlaybookRunTracker(
+        context.phantom,
+        container,
+        poll_interval=float(context.config.userdata.get("poll_interval", 2)),
+    )
+    trackers[id(container)] = (container, tracker)
+    return tracker
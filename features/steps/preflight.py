@@ -0,0 +1,196 @@
+import json
+from typing import Callable, Iterable, Optional
+from behave.model import Feature, Scenario, Step
+from behave.runner import Context
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container
+from exceptions import PreflightFailed
+import utility_functions as utils
+
+"""
+Module to check the playbooks and container labels of the selected scenarios before any container is created. Step
+definitions declare which of their arguments name a playbook or a container label with @references. Every referenced
+name is resolved against the server in a few batched queries, and the playbook IDs are kept for the whole run so
+playbooks are started by ID instead of by name.
+"""
+
+PLAYBOOKS: str = "playbooks"
+LABELS: str = "labels"
+# Names per query, keeps the filter well below common URL length limits
+BATCH_SIZE: int = 50
+
+
+def references(**arguments: str) -> Callable:
+    """Declares the step arguments naming a playbook or a container label. Steps without the argument read the table
+    column of the same name. Place it below the step decorator
+    Example:
+        @given('the playbook "{playbook_name}"')
+        @references(playbooks="playbook_name")
+        def declare_playbook(context, playbook_name): ...
+    """
+    unknown: set[str] = set(arguments) - {PLAYBOOKS, LABELS}
+    if unknown:
+        raise ValueError(f"Unknown references {sorted(unknown)}, use {PLAYBOOKS} or {LABELS}")
+
+    def decorator(step_function: Callable) -> Callable:
+        step_function.soar_references = dict(arguments)
+        return step_function
+
+    return decorator
+
+
+def step_references(context: Context, step: Step) -> dict[str, set[str]]:
+    """Playbook names and container labels referenced by a step"""
+    found: dict[str, set[str]] = {PLAYBOOKS: set(), LABELS: set()}
+    match = utils.step_match(context, step)
+    declared: dict = getattr(match.func, "soar_references", {}) if match else {}
+    arguments: dict = {argument.name: argument.value for argument in match.arguments or []} if match else {}
+    for kind, name in declared.items():
+        if name in arguments:
+            found[kind].add(arguments[name])
+        elif step.table and name in step.table.headings:
+            found[kind].update(row[name] for row in step.table)
+    # Names with ${variables} are only known once the scenario runs
+    return {
+        kind: {str(value) for value in values if value and "${" not in str(value)}
+        for kind, values in found.items()
+    }
+
+
+def selected_scenarios(context: Context, features: Iterable[Feature]) -> Iterable[Scenario]:
+    """Scenarios selected by the tags and names of the run that talk to the server"""
+    for feature in features:
+        for scenario in feature.walk_scenarios():
+            if scenario.should_run(context.config) and "offline" not in scenario.effective_tags:
+                yield scenario
+
+
+def _batches(names: list[str]) -> Iterable[list[str]]:
+    for start in range(0, len(names), BATCH_SIZE):
+        yield names[start : start + BATCH_SIZE]
+
+
+class Preflight:
+    def __init__(self):
+        """Playbook and label lookups shared by the whole run
+
+        Attributes:
+            playbook_ids (dict): Referenced playbook name to the ID of the playbook on the server
+            playbook_names (dict): Playbook ID to its name, as returned by the server
+            labels (set[str]): Container labels on the server. None when the labels couldn't be listed
+            ambiguous (set[str]): Names matching playbooks in several repositories, left for the server to resolve
+        """
+        self.playbook_ids: dict[str, int] = {}
+        self.playbook_names: dict[int, str] = {}
+        self.labels: Optional[set[str]] = None
+        self.ambiguous: set[str] = set()
+        self.references: dict[str, set[str]] = {PLAYBOOKS: set(), LABELS: set()}
+        self.queries: int = 0
+        self.applied: int = 0
+
+    def scan(self, context: Context, features: Iterable[Feature]) -> dict[str, set[str]]:
+        """Collects the playbooks and labels referenced by every step of the selected scenarios"""
+        for scenario in selected_scenarios(context, features):
+            for step in scenario.all_steps:
+                for kind, names in step_references(context, step).items():
+                    self.references[kind] |= names
+        return self.references
+
+    def _get(self, client: PhantomClient, url: str, params: dict) -> list[dict]:
+        self.queries += 1
+        return client._handle_request(method="GET", url=url, params=params, return_data_only=True) or []
+
+    def resolve_playbooks(self, client: PhantomClient, names: Iterable[str]) -> list[str]:
+        """Looks up the playbooks in batches of names and returns the names that don't exist. Names may include
+        their repository, e.g. local/triage_blocked_domains
+        """
+        wanted: dict[str, tuple[Optional[str], str]] = {
+            name: tuple(name.split("/", 1)) if "/" in name else (None, name)
+            for name in sorted(set(names) - set(self.playbook_ids))
+        }
+        if not wanted:
+            return []
+
+        records: list[dict] = []
+        for batch in _batches(sorted({playbook for _, playbook in wanted.values()})):
+            records.extend(
+                self._get(client, "playbook?", {"_filter_name__in": json.dumps(batch), "page_size": 0})
+            )
+        repositories: dict = {}
+        if any(repository for repository, _ in wanted.values()):
+            repositories = {
+                record.get("id"): record.get("name") for record in self._get(client, "scm?", {"page_size": 0})
+            }
+
+        missing: list[str] = []
+        for name, (repository, playbook) in wanted.items():
+            matches: list[dict] = [
+                record
+                for record in records
+                if record.get("name") == playbook
+                and (repository is None or repositories.get(record.get("scm")) == repository)
+            ]
+            for record in matches:
+                self.playbook_names[record.get("id")] = record.get("name")
+            if not matches:
+                missing.append(name)
+            elif len(matches) > 1:
+                self.ambiguous.add(name)
+            else:
+                self.playbook_ids[name] = matches[0].get("id")
+        return missing
+
+    def check_labels(self, client: PhantomClient, labels: Iterable[str]) -> list[str]:
+        """Returns the labels that don't exist on the server. Labels are listed once from the event settings, when
+        the server doesn't return them no label is reported missing
+        """
+        if self.labels is None:
+            try:
+                self.queries += 1
+                settings: dict = client._handle_request(method="GET", url="system_settings/events")
+            except Exception:
+                settings = {}
+            listed = settings.get("label") if isinstance(settings, dict) else None
+            if not isinstance(listed, list):
+                return []
+            self.labels = set(listed)
+        return sorted(set(labels) - self.labels)
+
+    def run(self, context: Context, client: PhantomClient, features: Iterable[Feature]) -> "Preflight":
+        """Scans the features and resolves every reference
+
+        Raises:
+            PreflightFailed: If a referenced playbook or label doesn't exist on the server
+        """
+        self.scan(context, features)
+        problems: list[str] = [
+            f'playbook "{name}"' for name in self.resolve_playbooks(client, self.references[PLAYBOOKS])
+        ] + [f'container label "{label}"' for label in self.check_labels(client, self.references[LABELS])]
+        if problems:
+            raise PreflightFailed(problems)
+        return self
+
+    def apply(self, container: Optional[Container]) -> None:
+        """Starts the container's playbooks by their resolved ID instead of by name"""
+        for playbook in container.playbooks if container else []:
+            playbook_id: Optional[int] = self.playbook_ids.get(playbook.name)
+            if playbook_id and not playbook.playbook_id and not playbook.run_id:
+                playbook.playbook_id = playbook_id
+                self.applied += 1
+
+    def metrics(self) -> dict:
+        return {
+            "playbooks": len(self.references[PLAYBOOKS]),
+            "labels": len(self.references[LABELS]),
+            "labels_checked": self.labels is not None,
+            "ambiguous_playbooks": sorted(self.ambiguous),
+            "queries": self.queries,
+            "runs_started_by_id": self.applied,
+        }
+
+
+def apply_resolved(context: Context, container: Optional[Container] = None) -> None:
+    """Sets the resolved playbook IDs on the container (defaults to context.container) when the preflight ran"""
+    preflight: Optional[Preflight] = getattr(context, "preflight", None)
+    if preflight:
+        preflight.apply(container or context.container)
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import re
+import time
+from typing import Optional
+from soarsdk.client import PhantomClient
+from soarsdk.exceptions import MissingApprovalResponse
+from soarsdk.objects import Container, Playbook
+
+"""
+Module to answer playbook prompts from response rules instead of per-scenario prompt declarations. Rules are compiled
+once into a lookup table keyed by prompt name plus an ordered list of pattern rules, and every resolved lookup is
+memoized for the rest of the run.
+"""
+
+
+def _playbook_name(playbook_name: Optional[str]) -> str:
+    # Playbooks may be declared with their repository, e.g. local/approval_flow
+    return (playbook_name or "").split("/")[-1]
+
+
+class PromptRule:
+    def __init__(
+        self,
+        responses: list,
+        prompt: Optional[str] = None,
+        prompt_pattern: Optional[str] = None,
+        playbook: Optional[str] = None,
+        label: Optional[str] = None,
+    ):
+        """Responses for the prompts matching every condition given
+
+        Args:
+            responses (list): Responses in the order the prompt asks its questions
+            prompt (str, optional): Exact prompt name
+            prompt_pattern (str, optional): Regular expression the whole prompt name must match
+            playbook (str, optional): Name of the playbook raising the prompt, without the repository
+            label (str, optional): Label of the container the playbook runs on
+
+        Raises:
+            ValueError: If the rule has no responses, or both prompt and prompt_pattern are set
+        """
+        if not responses:
+            raise ValueError(f"Prompt rule {prompt or prompt_pattern} has no responses")
+        if prompt and prompt_pattern:
+            raise ValueError("Prompt rules take either a prompt or a prompt_pattern, not both")
+        self.responses: list = [str(response) for response in responses]
+        self.prompt: Optional[str] = prompt
+        self.pattern: Optional[re.Pattern] = re.compile(prompt_pattern) if prompt_pattern else None
+        self.playbook: Optional[str] = _playbook_name(playbook) if playbook else None
+        self.label: Optional[str] = label
+
+    def matches(self, prompt: str, playbook: str, label: str) -> bool:
+        if self.prompt is not None and self.prompt != prompt:
+            return False
+        if self.pattern and not self.pattern.fullmatch(prompt):
+            return False
+        if self.playbook and self.playbook != playbook:
+            return False
+        return not self.label or self.label == label
+
+
+class PromptPolicy:
+    def __init__(self, rules: list[PromptRule], source: Optional[str] = None):
+        """Compiles the rules. Rules for an exact prompt name are checked before pattern rules, otherwise rules
+        apply in the order given.
+
+        Args:
+            rules (list[PromptRule]): Response rules
+            source (str, optional): Canonical text of the rules, used to tell policies apart
+        """
+        self.rules: list[PromptRule] = rules
+        self.exact: dict[str, list[PromptRule]] = {}
+        self.patterns: list[PromptRule] = []
+        for rule in rules:
+            if rule.prompt is not None:
+                self.exact.setdefault(rule.prompt, []).append(rule)
+            else:
+                self.patterns.append(rule)
+
+        self.digest: str = hashlib.sha256((source or "").encode()).hexdigest()
+        self._resolved: dict[tuple, Optional[list]] = {}
+        self.latencies: list[float] = []
+
+    @classmethod
+    def from_rules(cls, rules: list[dict]) -> "PromptPolicy":
+        return cls(
+            [PromptRule(**rule) for rule in rules],
+            source=json.dumps(rules, sort_keys=True),
+        )
+
+    @classmethod
+    def from_file(cls, path: str) -> "PromptPolicy":
+        """Loads rules from a JSON file. The file is either a list of rules, or a mapping of prompt names to
+        responses as a shorthand for rules on the prompt name only.
+
+        Example:
+            [
+                {"prompt": "approve_block", "responses": ["Yes", "Blocked by the test suite"]},
+                {"prompt_pattern": "escalate_.*", "label": "workbench", "responses": ["No"]}
+            ]
+
+        Raises:
+            FileNotFoundError: If the policy file doesn't exist
+            ValueError: If a rule is invalid
+        """
+        with open(path) as policy_file:
+            rules = json.load(policy_file)
+        if isinstance(rules, dict):
+            rules = [{"prompt": prompt, "responses": responses} for prompt, responses in rules.items()]
+        return cls.from_rules(rules)
+
+    def extended(self, rules: list[dict]) -> "PromptPolicy":
+        """Returns a policy where the given rules are checked before the rules of this policy"""
+        policy: PromptPolicy = PromptPolicy(
+            [PromptRule(**rule) for rule in rules] + self.rules,
+            source=json.dumps(rules, sort_keys=True) + self.digest,
+        )
+        # Latency is reported for the whole run
+        policy.latencies = self.latencies
+        return policy
+
+    def resolve(self, prompt: str, playbook: Optional[str], label: Optional[str]) -> Optional[list]:
+        """Returns the responses for the prompt, None when no rule matches"""
+        key: tuple = (prompt, _playbook_name(playbook), label)
+        if key not in self._resolved:
+            self._resolved[key] = next(
+                (
+                    rule.responses
+                    for rule in self.exact.get(prompt, []) + self.patterns
+                    if rule.matches(*key)
+                ),
+                None,
+            )
+        return self._resolved[key]
+
+    def answer_approvals(
+        self,
+        client: PhantomClient,
+        container: Container,
+        playbook: Playbook,
+        approvals: list[dict],
+    ) -> None:
+        """Replacement for PhantomClient.answer_approvals. Responses declared on the playbook win over the policy
+
+        Raises:
+            MissingApprovalResponse: If neither the playbook or the policy has responses for a prompt
+        """
+        for approval in approvals:
+            start: float = time.monotonic()
+            prompt: str = approval.get("name")
+            responses: Optional[list] = playbook.prompts.get(prompt) or self.resolve(
+                prompt, playbook.name, container.label
+            )
+            if not responses:
+                raise MissingApprovalResponse(
+                    f"Failed to answer approvals on container {container.id}. No response for the prompt {prompt} of the playbook {playbook.name} in the playbook prompts or prompt policy"
+                )
+            client.answer_approval(approval.get("id"), responses)
+            self.latencies.append(time.monotonic() - start)
+
+    def install(self, client: PhantomClient) -> None:
+        """Answers the prompts raised while the client runs playbooks with this policy"""
+        client.answer_approvals = lambda container, playbook, approvals: self.answer_approvals(
+            client, container, playbook, approvals
+        )
+
+    def metrics(self) -> dict:
+        """Amount of prompts answered and the answer latency in seconds"""
+        latencies: list[float] = sorted(self.latencies)
+        if not latencies:
+            return {"answered": 0}
+        return {
+            "answered": len(latencies),
+            "p50_seconds": round(latencies[len(latencies) // 2], 3),
+            "p95_seconds": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+            "max_seconds": round(latencies[-1], 3),
+        }
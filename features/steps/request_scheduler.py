@@ -0,0 +1,249 @@
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - file locking is unavailable on Windows
+    fcntl = None
+
+"""
+Client side request scheduling for the Splunk SOAR REST API. Requests wait on a token bucket shared between
+threads (and optionally between processes through a state file), are released by priority, and idempotent
+requests are retried with jittered exponential backoff on 429 and 5xx responses.
+"""
+
+POLL_PRIORITY: int = 0
+DEFAULT_PRIORITY: int = 1
+BULK_PRIORITY: int = 2
+
+RETRY_STATUSES: frozenset = frozenset([429, 500, 502, 503, 504])
+IDEMPOTENT_METHODS: frozenset = frozenset(["GET", "HEAD", "OPTIONS", "PUT", "DELETE"])
+# Endpoints polled while waiting on playbooks. Answering these quickly keeps scenarios moving
+POLL_ENDPOINTS: tuple = ("playbook_run", "action_run", "approval", "version")
+BULK_ENDPOINTS: tuple = ("artifact", "upload_chunked", "container")
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, state_file: Optional[str] = None):
+        """Token bucket refilled at a constant rate
+
+        Args:
+            rate (float): Tokens added per second
+            capacity (float): Maximum amount of tokens, the allowed burst size
+            state_file (str, optional): File storing the bucket so multiple processes share one bucket
+        """
+        self.rate: float = rate
+        self.capacity: float = capacity
+        self.state_file: Optional[str] = state_file
+        self.tokens: float = capacity
+        self.updated: float = time.time()
+        self._lock: threading.Lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """Takes a token if one is available. Returns 0 on success, otherwise the seconds until a token is available"""
+        with self._lock:
+            if not self.state_file:
+                return self._take()
+
+            with open(self.state_file, "a+") as state:
+                if fcntl:
+                    fcntl.flock(state, fcntl.LOCK_EX)
+                try:
+                    state.seek(0)
+                    try:
+                        stored: dict = json.loads(state.read() or "{}")
+                    except ValueError:
+                        stored = {}
+                    self.tokens = stored.get("tokens", self.capacity)
+                    self.updated = stored.get("updated", time.time())
+
+                    wait: float = self._take()
+
+                    state.seek(0)
+                    state.truncate()
+                    state.write(json.dumps({"tokens": self.tokens, "updated": self.updated}))
+                    state.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(state, fcntl.LOCK_UN)
+            return wait
+
+    def _take(self) -> float:
+        now: float = time.time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RequestScheduler:
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[float] = None,
+        state_file: Optional[str] = None,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 30.0,
+    ):
+        """Releases requests through a shared token bucket, highest priority (lowest number) first
+
+        Args:
+            rate (float): Sustained requests per second allowed against the SOAR instance
+            burst (float, optional): Requests allowed in a burst. Defaults to the rate
+            state_file (str, optional): Shares the bucket across processes through this file
+            max_retries (int): Retries for idempotent requests that were throttled or failed server side
+            backoff_base (float): Base delay in seconds of the exponential backoff
+            backoff_cap (float): Maximum delay in seconds between retries
+        """
+        self.bucket: TokenBucket = TokenBucket(rate, burst or rate, state_file)
+        self.max_retries: int = max_retries
+        self.backoff_base: float = backoff_base
+        self.backoff_cap: float = backoff_cap
+
+        self._condition: threading.Condition = threading.Condition()
+        self._waiting: list[tuple[int, int]] = []
+        self._sequence = itertools.count()
+
+        self.requests: int = 0
+        self.retries: int = 0
+        self.throttled: int = 0
+        self.max_queue_depth: int = 0
+        self.wait_time: float = 0.0
+
+    @classmethod
+    def from_userdata(cls, userdata) -> Optional["RequestScheduler"]:
+        """Creates a scheduler from behave -D options. Returns None when rate_limit isn't configured
+
+        Example: behave -D rate_limit=10 -D rate_burst=20 -D rate_limit_file=/tmp/soar_bucket.json
+        """
+        if not userdata.get("rate_limit"):
+            return None
+        return cls(
+            rate=float(userdata["rate_limit"]),
+            burst=float(userdata.get("rate_burst", userdata["rate_limit"])),
+            state_file=userdata.get("rate_limit_file"),
+            max_retries=int(userdata.get("max_retries", 4)),
+        )
+
+    @property
+    def queue_depth(self) -> int:
+        """Amount of requests currently waiting for a token"""
+        return len(self._waiting)
+
+    def metrics(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "wait_seconds": round(self.wait_time, 3),
+        }
+
+    def priority(self, request: requests.PreparedRequest) -> int:
+        """Status polls are released before regular calls, bulk artifact and container posts last"""
+        path: str = urlparse(request.url).path.rstrip("/")
+        endpoint: str = path.split("/rest/")[-1].split("/")[0]
+        if endpoint in POLL_ENDPOINTS and request.method == "GET":
+            return POLL_PRIORITY
+        if endpoint in BULK_ENDPOINTS and request.method == "POST":
+            return BULK_PRIORITY
+        return DEFAULT_PRIORITY
+
+    def acquire(self, priority: int) -> None:
+        """Blocks until the request is first in line and the bucket has a token"""
+        start: float = time.monotonic()
+        with self._condition:
+            ticket: tuple[int, int] = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._waiting))
+            # A newly queued request may outrank the one currently waiting on the bucket
+            self._condition.notify_all()
+            try:
+                while True:
+                    wait: Optional[float] = None
+                    if self._waiting[0] == ticket:
+                        wait = self.bucket.try_acquire()
+                        if wait <= 0:
+                            break
+                    self._condition.wait(timeout=wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+            self.requests += 1
+            self.wait_time += time.monotonic() - start
+
+    def record(self, throttled: bool = False, retried: bool = False) -> None:
+        """Counts throttled responses and retried requests"""
+        with self._condition:
+            self.throttled += int(throttled)
+            self.retries += int(retried)
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full jitter exponential backoff. A Retry-After header sets the minimum delay"""
+        delay: float = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+
+class ScheduledAdapter(HTTPAdapter):
+    def __init__(self, scheduler: RequestScheduler, **kwargs):
+        """HTTPAdapter that sends every request through the RequestScheduler. Keyword arguments are passed to
+        requests.adapters.HTTPAdapter (pool_connections, pool_maxsize, ...)
+        """
+        self.scheduler: RequestScheduler = scheduler
+        super().__init__(**kwargs)
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        priority: int = self.scheduler.priority(request)
+        idempotent: bool = request.method in IDEMPOTENT_METHODS
+        attempt: int = 0
+
+        while True:
+            self.scheduler.acquire(priority)
+            try:
+                response: requests.Response = super().send(request, **kwargs)
+            except requests.exceptions.ConnectionError:
+                if not idempotent or attempt >= self.scheduler.max_retries:
+                    raise
+                response = None
+
+            if response is not None and response.status_code not in RETRY_STATUSES:
+                return response
+
+            if response is not None:
+                self.scheduler.record(throttled=True)
+                if not idempotent or attempt >= self.scheduler.max_retries:
+                    return response
+                retry_after: Optional[str] = response.headers.get("Retry-After")
+                response.close()
+            else:
+                retry_after = None
+
+            self.scheduler.record(retried=True)
+            time.sleep(self.scheduler.backoff(attempt, retry_after))
+            attempt += 1
+
+
+def install(session: requests.Session, scheduler: RequestScheduler, **adapter_kwargs) -> ScheduledAdapter:
+    """Routes every request of the session, such as PhantomClient.session, through the scheduler"""
+    adapter: ScheduledAdapter = ScheduledAdapter(scheduler, **adapter_kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return adapter
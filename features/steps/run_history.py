@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from behave.model import Scenario
+
+"""
+Module to keep the results of every run in a local SQLite database. The behave hooks record each scenario with its
+steps, outcome, containers, API calls, and playbook run times, and the command line reports the slowest scenarios and
+the scenarios that got slower compared to an earlier period.
+
+Usage:
+    behave -D history_db=.behave_history.sqlite
+    python features/steps/run_history.py .behave_history.sqlite slowest --days 30
+    python features/steps/run_history.py .behave_history.sqlite regressed --days 7 --baseline-days 30
+"""
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    label TEXT NOT NULL UNIQUE,
+    host TEXT,
+    arguments TEXT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    scenario_key TEXT NOT NULL,
+    feature TEXT,
+    name TEXT,
+    status TEXT NOT NULL,
+    duration REAL,
+    container_ids TEXT,
+    api_calls INTEGER,
+    bytes_downloaded INTEGER,
+    playbook_wait_seconds REAL,
+    recorded_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS steps (
+    id INTEGER PRIMARY KEY,
+    scenario_id INTEGER NOT NULL REFERENCES scenarios (id),
+    position INTEGER NOT NULL,
+    keyword TEXT,
+    name TEXT,
+    status TEXT,
+    duration REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS playbook_runs (
+    id INTEGER PRIMARY KEY,
+    scenario_id INTEGER NOT NULL REFERENCES scenarios (id),
+    playbook TEXT,
+    status TEXT,
+    seconds REAL
+);
+CREATE INDEX IF NOT EXISTS scenarios_by_key ON scenarios (scenario_key, recorded_at);
+CREATE INDEX IF NOT EXISTS scenarios_by_time ON scenarios (recorded_at, status);
+CREATE INDEX IF NOT EXISTS scenarios_by_run ON scenarios (run_id);
+CREATE INDEX IF NOT EXISTS steps_by_scenario ON steps (scenario_id);
+CREATE INDEX IF NOT EXISTS playbook_runs_by_playbook ON playbook_runs (playbook, scenario_id);
+"""
+
+# Characters of a failed step's error kept in the database
+ERROR_LENGTH: int = 2000
+
+
+def now() -> str:
+    """UTC timestamp that sorts in time order as text"""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def days_ago(days: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat(timespec="seconds")
+
+
+class RunHistory:
+    def __init__(self, path: str):
+        """SQLite store of the runs, scenarios, steps, and playbook runs. Several behave processes may write to the
+        same database, e.g. the workers of the parallel runner
+
+        Args:
+            path (str): Location of the database file, created when missing
+        """
+        self.path: str = path
+        self.connection: sqlite3.Connection = sqlite3.connect(path, timeout=30)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+        self.run_id: Optional[int] = None
+        self.recorded: int = 0
+
+    def start_run(self, label: Optional[str] = None, arguments: list[str] = ()) -> int:
+        """Creates the run, or joins the run of the same label so parallel workers share one run"""
+        label = label or f"{socket.gethostname()}-{os.getpid()}-{now()}"
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO runs (label, host, arguments, started_at) VALUES (?, ?, ?, ?)",
+                (label, socket.gethostname(), json.dumps(list(arguments)), now()),
+            )
+            self.run_id = self.connection.execute("SELECT id FROM runs WHERE label = ?", (label,)).fetchone()["id"]
+        return self.run_id
+
+    def record_scenario(self, key: str, scenario: Scenario, metrics: Optional[dict] = None) -> int:
+        """Stores a finished scenario with its steps and the playbook runs of its containers
+
+        Args:
+            key (str): Scenario key, see scenario_timings.scenario_key()
+            scenario (Scenario): Finished scenario
+            metrics (dict, optional): SOAR metrics of the scenario, see ScenarioMetrics.as_dict()
+        """
+        metrics = metrics or {}
+        with self.connection:
+            scenario_id: int = self.connection.execute(
+                "INSERT INTO scenarios (run_id, scenario_key, feature, name, status, duration, container_ids, "
+                "api_calls, bytes_downloaded, playbook_wait_seconds, recorded_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.run_id,
+                    key,
+                    str(scenario.filename),
+                    scenario.name,
+                    scenario.status.name,
+                    round(scenario.duration, 3),
+                    json.dumps(metrics.get("container_ids", [])),
+                    metrics.get("api_calls"),
+                    metrics.get("bytes_downloaded"),
+                    metrics.get("playbook_wait_seconds"),
+                    now(),
+                ),
+            ).lastrowid
+            self.connection.executemany(
+                "INSERT INTO steps (scenario_id, position, keyword, name, status, duration, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        scenario_id,
+                        position,
+                        step.keyword,
+                        step.name,
+                        step.status.name,
+                        round(step.duration, 3),
+                        (step.error_message or "")[:ERROR_LENGTH] or None,
+                    )
+                    for position, step in enumerate(scenario.all_steps, 1)
+                ],
+            )
+            self.connection.executemany(
+                "INSERT INTO playbook_runs (scenario_id, playbook, status, seconds) VALUES (?, ?, ?, ?)",
+                [
+                    (scenario_id, playbook["playbook"], playbook["status"], playbook["seconds"])
+                    for playbook in metrics.get("playbook_durations", [])
+                ],
+            )
+        self.recorded += 1
+        return scenario_id
+
+    def finish_run(self) -> None:
+        with self.connection:
+            self.connection.execute("UPDATE runs SET finished_at = ? WHERE id = ?", (now(), self.run_id))
+
+    def slowest(self, days: float = 30, limit: int = 10) -> list[sqlite3.Row]:
+        """Scenarios with the longest average duration over the last days"""
+        return self.connection.execute(
+            "SELECT scenario_key, COUNT(*) AS runs, AVG(duration) AS average, MAX(duration) AS longest, "
+            "SUM(status = 'failed') AS failures, AVG(api_calls) AS api_calls "
+            "FROM scenarios WHERE recorded_at >= ? GROUP BY scenario_key ORDER BY average DESC LIMIT ?",
+            (days_ago(days), limit),
+        ).fetchall()
+
+    def regressed(self, days: float = 7, baseline_days: float = 30, limit: int = 10) -> list[sqlite3.Row]:
+        """Passing scenarios whose average duration over the last days grew the most compared to the baseline days
+        before them
+        """
+        recent: str = days_ago(days)
+        return self.connection.execute(
+            "WITH recent AS ("
+            "  SELECT scenario_key, AVG(duration) AS average, COUNT(*) AS runs FROM scenarios"
+            "  WHERE status = 'passed' AND recorded_at >= ? GROUP BY scenario_key"
+            "), baseline AS ("
+            "  SELECT scenario_key, AVG(duration) AS average, COUNT(*) AS runs FROM scenarios"
+            "  WHERE status = 'passed' AND recorded_at >= ? AND recorded_at < ? GROUP BY scenario_key"
+            ") "
+            "SELECT recent.scenario_key, baseline.average AS before, recent.average AS after, "
+            "recent.average - baseline.average AS change, 100.0 * (recent.average / baseline.average - 1) AS percent, "
+            "baseline.runs AS before_runs, recent.runs AS after_runs "
+            "FROM recent JOIN baseline ON recent.scenario_key = baseline.scenario_key "
+            "WHERE baseline.average > 0 AND recent.average > baseline.average "
+            "ORDER BY recent.average / baseline.average DESC LIMIT ?",
+            (recent, days_ago(days + baseline_days), recent, limit),
+        ).fetchall()
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+def format_rows(rows: list[sqlite3.Row]) -> str:
+    """Rows as an aligned text table"""
+    if not rows:
+        return "No scenarios recorded for this period"
+    columns: list[str] = list(rows[0].keys())
+    cells: list[list[str]] = [
+        [f"{value:.2f}" if isinstance(value, float) else str(value) for value in row] for row in rows
+    ]
+    widths: list[int] = [max(len(column), *(len(line[index]) for line in cells)) for index, column in enumerate(columns)]
+    lines: list[str] = ["  ".join(column.ljust(width) for column, width in zip(columns, widths)).rstrip()]
+    lines.extend("  ".join(cell.ljust(width) for cell, width in zip(line, widths)).rstrip() for line in cells)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Report scenario durations recorded with -D history_db")
+    parser.add_argument("database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    slowest = commands.add_parser("slowest", help="scenarios with the longest average duration")
+    slowest.add_argument("--days", type=float, default=30)
+    slowest.add_argument("--limit", type=int, default=10)
+    regressed = commands.add_parser("regressed", help="scenarios that got slower than in the period before")
+    regressed.add_argument("--days", type=float, default=7, help="recent period")
+    regressed.add_argument("--baseline-days", type=float, default=30, help="period before the recent one")
+    regressed.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if not os.path.exists(args.database):
+        parser.error(f"{args.database} does not exist")
+    history: RunHistory = RunHistory(args.database)
+    try:
+        if args.command == "slowest":
+            rows: list[sqlite3.Row] = history.slowest(args.days, args.limit)
+        else:
+            rows = history.regressed(args.days, args.baseline_days, args.limit)
+        print(format_rows(rows))
+    finally:
+        history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Optional
+
+"""
+Low overhead sampling profiler for single scenarios. A background thread samples the stack of the thread running the
+scenario at a fixed interval and counts identical stacks. The output uses the folded stack format read by
+flamegraph.pl, speedscope, and inferno ("frame;frame;frame count" per line).
+"""
+
+PROFILE_TAG: str = "profile"
+FEATURES_DIRECTORY: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+_suite_files: dict[str, bool] = {}
+
+
+def _is_suite_frame(frame: FrameType) -> bool:
+    # behave compiles step files with paths relative to the working directory
+    filename: str = frame.f_code.co_filename
+    if filename not in _suite_files:
+        _suite_files[filename] = os.path.abspath(filename).startswith(FEATURES_DIRECTORY)
+    return _suite_files[filename]
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None):
+        """Samples the stack of one thread until stopped
+
+        Args:
+            interval (float): Seconds between samples
+            thread_id (int, optional): Thread to sample. Defaults to the thread calling start()
+        """
+        self.interval: float = interval
+        self.thread_id: Optional[int] = thread_id
+        self.samples: Counter = Counter()
+        self.label: str = "setup"
+        self._stop: threading.Event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self.thread_id = self.thread_id or threading.get_ident()
+        self._thread = threading.Thread(
+            target=self._run, name="scenario-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self.sample(frame)] += 1
+
+    def sample(self, frame: FrameType) -> str:
+        """Folded stack of the frame, rooted at the current step. Runner frames above the first frame from the
+        features directory (a step definition or hook) are left out; PhantomClient and library frames below it stay.
+        """
+        stack: list[FrameType] = []
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        stack.reverse()
+
+        start: int = next(
+            (position for position, frame in enumerate(stack) if _is_suite_frame(frame)),
+            0,
+        )
+        labels: list[str] = [frame_label(frame) for frame in stack[start:]]
+        # Semicolons separate frames in the folded format
+        return ";".join([self.label.replace(";", ","), *labels])
+
+    def folded(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.samples.most_common()
+        )
+
+    def write(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as output:
+            output.write(self.folded())
+
+
+def profile_path(directory: str, filename: str, line: int, scenario_name: str) -> str:
+    """File name for a scenario profile, unique per scenario and Examples row"""
+    name: str = re.sub(r"[^A-Za-z0-9_.-]+", "_", f"{os.path.basename(filename)}_{line}_{scenario_name}")
+    return os.path.join(directory, f"{name.strip('_')[:150]}.folded")
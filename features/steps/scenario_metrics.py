@@ -0,0 +1,104 @@
+import threading
+import time
+from typing import Optional
+import requests
+from behave.runner import Context
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container
+from playbook_durations import duration_breakdown
+
+"""
+Module to measure the Splunk SOAR load of a single scenario. The API calls and downloaded bytes are counted with a
+response hook on the client session and the time spent running playbooks is measured around run_playbooks.
+"""
+
+
+def response_size(response: requests.Response, stream: bool = False) -> int:
+    """Size of a response body from its Content-Length. Without one, the body is only measured when the request
+    doesn't stream it, since requests reads those bodies right after the response hooks anyway
+    """
+    length: Optional[str] = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    return 0 if stream else len(response.content or b"")
+
+
+class ScenarioMetrics:
+    def __init__(self):
+        """SOAR resource usage of one scenario
+
+        Attributes:
+            api_calls (int): Responses received from the REST API
+            bytes_downloaded (int): Size of the response bodies
+            playbook_wait_seconds (float): Time spent waiting on playbooks to finish
+        """
+        self.api_calls: int = 0
+        self.bytes_downloaded: int = 0
+        self.playbook_wait_seconds: float = 0.0
+        self._lock: threading.Lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+
+    def on_response(self, response: requests.Response, *args, **kwargs) -> None:
+        """requests response hook"""
+        size: int = response_size(response, stream=bool(kwargs.get("stream")))
+        with self._lock:
+            self.api_calls += 1
+            self.bytes_downloaded += size
+
+    def install(self, client: PhantomClient) -> None:
+        """Counts the requests of the client and times its playbook runs until uninstall() is called"""
+        self._session = client.session
+        self._session.hooks["response"].append(self.on_response)
+
+        run_playbooks = client.run_playbooks
+
+        def timed_run_playbooks(*args, **kwargs):
+            start: float = time.monotonic()
+            try:
+                return run_playbooks(*args, **kwargs)
+            finally:
+                self.add_wait(time.monotonic() - start)
+
+        client.run_playbooks = timed_run_playbooks
+
+    def add_wait(self, seconds: float) -> None:
+        """Adds time spent waiting on playbooks outside of run_playbooks, e.g. on started playbooks"""
+        with self._lock:
+            self.playbook_wait_seconds += seconds
+
+    def uninstall(self) -> None:
+        # The session may be shared with later scenarios through the connection pool
+        if self._session and self.on_response in self._session.hooks["response"]:
+            self._session.hooks["response"].remove(self.on_response)
+        self._session = None
+
+    def as_dict(self, containers: list[Container]) -> dict:
+        """Metrics of the scenario together with the containers it created"""
+        created: list[Container] = [container for container in containers if container.id]
+        return {
+            "container_ids": [container.id for container in created],
+            "artifact_count": sum(len(container.artifacts) for container in created),
+            "playbooks_run": sorted(
+                {
+                    playbook.name
+                    for container in created
+                    for playbook in container.playbooks
+                    if playbook.name and (playbook.run_id or playbook.id)
+                }
+            ),
+            "api_calls": self.api_calls,
+            "bytes_downloaded": self.bytes_downloaded,
+            "playbook_wait_seconds": round(self.playbook_wait_seconds, 3),
+            "playbook_durations": [
+                playbook for container in created for playbook in duration_breakdown(container)
+            ],
+        }
+
+
+def scenario_containers(context: Context) -> list[Container]:
+    """Every container of the scenario, registered or set on the context directly"""
+    containers: list[Container] = list(getattr(context, "containers", None) or [])
+    container: Optional[Container] = getattr(context, "container", None)
+    if container is not None and not any(container is known for known in containers):
+        containers.append(container)
+    return containers
@@ -0,0 +1,99 @@
+import json
+import os
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - file locking is unavailable on Windows
+    fcntl = None
+
+"""
+Module to persist per-scenario durations between runs. The parallel runner uses these timings to balance
+scenarios across workers
+"""
+
+DEFAULT_ESTIMATE: float = 60.0
+
+
+def scenario_key(filename: str, scenario_name: str) -> str:
+    """Returns the key used to store a scenario's duration. Scenario outline rows keep their "-- @1.1" suffix
+    so each Examples row is timed individually
+    """
+    return f"{filename}::{scenario_name.strip()}"
+
+
+class ScenarioTimings:
+    def __init__(self, path: str, smoothing: float = 0.5) -> None:
+        """Stores historical scenario durations inside of a JSON file
+
+        Args:
+            path (str): Location of the timings file
+            smoothing (float): Weight given to the newest duration when averaging with the stored one
+        """
+        self.path: str = path
+        self.smoothing: float = smoothing
+        self.durations: dict[str, float] = {}
+        self._recorded: dict[str, float] = {}
+
+    def load(self) -> "ScenarioTimings":
+        """Reads the timings file if it exists"""
+        self.durations = self._read()
+        return self
+
+    def estimate(self, key: str, default: Optional[float] = None) -> float:
+        """Returns the expected duration of a scenario. Unknown scenarios use the median of the known
+        durations so new scenarios are neither scheduled first nor starved
+        """
+        if key in self.durations:
+            return self.durations[key]
+        if default is not None:
+            return default
+        if not self.durations:
+            return DEFAULT_ESTIMATE
+        known: list[float] = sorted(self.durations.values())
+        return known[len(known) // 2]
+
+    def record(self, key: str, duration: float) -> None:
+        """Stores the duration of a finished scenario. Durations are written with save()"""
+        self._recorded[key] = duration
+
+    def save(self) -> None:
+        """Merges the recorded durations into the timings file. The file is locked while merging so several
+        behave processes can share the same file
+        """
+        if not self._recorded:
+            return
+
+        lock_path: str = self.path + ".lock"
+        with open(lock_path, "a") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                stored: dict[str, float] = self._read()
+                for key, duration in self._recorded.items():
+                    if key in stored:
+                        duration = (
+                            self.smoothing * duration
+                            + (1 - self.smoothing) * stored[key]
+                        )
+                    stored[key] = round(duration, 3)
+
+                temp_path: str = f"{self.path}.{os.getpid()}.tmp"
+                with open(temp_path, "w") as timings_file:
+                    json.dump(stored, timings_file, indent=2, sort_keys=True)
+                os.replace(temp_path, self.path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        self.durations = stored
+        self._recorded = {}
+
+    def _read(self) -> dict[str, float]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as timings_file:
+            try:
+                return dict(json.load(timings_file))
+            except ValueError:
+                return {}
@@ -0,0 +1,172 @@
+import gzip
+import json
+import os
+from typing import IO, Any, Iterator, Optional
+import soarsdk.objects
+from soarsdk.objects import PhantomObject
+
+"""
+Module to save and restore soarsdk objects as JSON. Objects are written with their type so a container loaded from a
+snapshot has the same Artifact, Playbook, Action, Pin, and Note objects as a downloaded container. Snapshots are
+written incrementally and can be limited in depth and size, so large containers never become one string in memory.
+"""
+
+TYPE_KEY: str = "__type__"
+FIELDS_KEY: str = "fields"
+GZIP_MAGIC: bytes = b"\x1f\x8b"
+# Amount of encoded text collected before writing to the file
+WRITE_BUFFER: int = 1 << 16
+
+# Every soarsdk object that can appear inside a snapshot, by class name
+PHANTOM_TYPES: dict[str, type] = {
+    name: value
+    for name, value in vars(soarsdk.objects).items()
+    if isinstance(value, type) and issubclass(value, PhantomObject)
+}
+
+
+class SnapshotLimits:
+    def __init__(
+        self,
+        fields: Optional[list[str]] = None,
+        max_depth: Optional[int] = None,
+        max_string: Optional[int] = None,
+        max_items: Optional[int] = None,
+    ):
+        """Bounds applied while writing a snapshot. None disables a limit
+
+        Args:
+            fields (list[str], optional): Attributes of the top level object to write, e.g. ["id", "artifacts"]
+            max_depth (int, optional): Nesting depth of dictionaries, lists, and objects. Deeper values are replaced
+                with a short description
+            max_string (int, optional): Characters kept of long strings such as CEF values or messages
+            max_items (int, optional): Entries kept of long lists such as action result_data
+        """
+        self.fields: Optional[list[str]] = fields
+        self.max_depth: Optional[int] = max_depth
+        self.max_string: Optional[int] = max_string
+        self.max_items: Optional[int] = max_items
+
+
+def _encode_scalar(value: Any, limits: SnapshotLimits) -> str:
+    if isinstance(value, str) and limits.max_string is not None and len(value) > limits.max_string:
+        value = f"{value[: limits.max_string]}...[truncated {len(value) - limits.max_string} characters]"
+    return json.dumps(value, default=str)
+
+
+def iter_snapshot(value: Any, limits: Optional[SnapshotLimits] = None, depth: int = 0) -> Iterator[str]:
+    """Yields the JSON text of the value piece by piece, in the format read by load_object()"""
+    limits = limits or SnapshotLimits()
+    nested: bool = isinstance(value, (PhantomObject, dict, list, tuple, set))
+    if nested and limits.max_depth is not None and depth >= limits.max_depth:
+        size: int = len(vars(value)) if isinstance(value, PhantomObject) else len(value)
+        yield json.dumps(f"<{type(value).__name__} with {size} entries>")
+        return
+
+    if isinstance(value, PhantomObject):
+        items = vars(value).items()
+        if depth == 0 and limits.fields:
+            items = [(key, field) for key, field in items if key in limits.fields]
+        yield f'{{"{TYPE_KEY}": {json.dumps(type(value).__name__)}, "{FIELDS_KEY}": '
+        yield from _iter_mapping(items, limits, depth)
+        yield "}"
+    elif isinstance(value, dict):
+        yield from _iter_mapping(value.items(), limits, depth)
+    elif isinstance(value, (list, tuple, set)):
+        values: list = list(value)
+        kept: list = values if limits.max_items is None else values[: limits.max_items]
+        yield "["
+        for position, item in enumerate(kept):
+            if position:
+                yield ", "
+            yield from iter_snapshot(item, limits, depth + 1)
+        if len(kept) < len(values):
+            yield (", " if kept else "") + json.dumps(f"...[truncated {len(values) - len(kept)} items]")
+        yield "]"
+    else:
+        yield _encode_scalar(value, limits)
+
+
+def _iter_mapping(items, limits: SnapshotLimits, depth: int) -> Iterator[str]:
+    yield "{"
+    for position, (key, field) in enumerate(items):
+        yield f"{', ' if position else ''}{json.dumps(str(key))}: "
+        yield from iter_snapshot(field, limits, depth + 1)
+    yield "}"
+
+
+def _open(path: str, mode: str, compress: bool = False) -> IO:
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def write_snapshot(
+    path: str,
+    value: Any,
+    limits: Optional[SnapshotLimits] = None,
+    compress: Optional[bool] = None,
+) -> int:
+    """Streams the snapshot to the file atomically so readers never see a partially written file
+
+    Args:
+        path (str): Output file. Compressed with gzip by default when the name ends with .gz
+        value (Any): Container or any other soarsdk object
+        limits (SnapshotLimits, optional): Field selection, depth, and size limits
+        compress (bool, optional): Overrides the compression chosen by the file name
+
+    Returns:
+        size (int): Size of the written file in bytes
+    """
+    compress = path.endswith(".gz") if compress is None else compress
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path: str = f"{path}.{os.getpid()}.tmp"
+    with _open(temp_path, "w", compress) as snapshot:
+        buffer: list[str] = []
+        buffered: int = 0
+        for chunk in iter_snapshot(value, limits):
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= WRITE_BUFFER:
+                snapshot.write("".join(buffer))
+                buffer, buffered = [], 0
+        snapshot.write("".join(buffer))
+    os.replace(temp_path, path)
+    return os.path.getsize(path)
+
+
+def load_object(value: Any) -> Any:
+    """Rebuilds the soarsdk objects of a parsed snapshot
+
+    Raises:
+        ValueError: If the snapshot contains a type that isn't a soarsdk object
+    """
+    if isinstance(value, list):
+        return [load_object(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if TYPE_KEY not in value:
+        return {key: load_object(field) for key, field in value.items()}
+
+    object_type: type = PHANTOM_TYPES.get(value[TYPE_KEY])
+    if not object_type:
+        raise ValueError(f"Unknown snapshot object type {value[TYPE_KEY]}")
+    # Attributes left out of the snapshot keep their defaults, saved attributes are restored as they were written
+    phantom_object: PhantomObject = object_type()
+    phantom_object.__dict__.update(
+        {key: load_object(field) for key, field in value.get(FIELDS_KEY, {}).items()}
+    )
+    return phantom_object
+
+
+def save_snapshot(path: str, value: Any) -> None:
+    """Writes the complete snapshot of the value"""
+    write_snapshot(path, value)
+
+
+def load_snapshot(path: str) -> Any:
+    """Loads a snapshot written by write_snapshot(), compressed or not"""
+    with open(path, "rb") as snapshot:
+        compressed: bool = snapshot.read(2) == GZIP_MAGIC
+    with _open(path, "r", compressed) as snapshot:
+        return load_object(json.load(snapshot))
@@ -0,0 +1,119 @@
+import json
+from abc import ABC, abstractmethod
+from typing import Optional
+from xml.sax.saxutils import quoteattr, escape
+from behave.formatter.base import Formatter
+from behave.model import Feature, Scenario
+
+"""
+Behave formatters that stream one record per finished scenario, including the SOAR metrics attached by the
+after_scenario hook. A scenario is written as soon as the next scenario starts (or its feature ends), so memory use
+does not grow with the size of the suite.
+
+Example: behave -f features.steps.soar_formatter:SoarJSONFormatter -o reports/results.jsonl
+"""
+
+
+def scenario_record(scenario: Scenario) -> dict:
+    """Result of a finished scenario with its SOAR metrics"""
+    failed_step = next(
+        (step for step in scenario.all_steps if step.status in ("failed", "undefined")),
+        None,
+    )
+    return {
+        "feature": scenario.feature.name,
+        "scenario": scenario.name,
+        "location": f"{scenario.filename}:{scenario.line}",
+        "tags": list(scenario.effective_tags),
+        "status": scenario.status.name,
+        "duration": round(scenario.duration, 3),
+        "failed_step": failed_step.name if failed_step else None,
+        "error": failed_step.error_message if failed_step else None,
+        "soar": getattr(scenario, "soar_metrics", {}),
+    }
+
+
+class StreamingScenarioFormatter(Formatter, ABC):
+    """Calls write_scenario() once for every finished scenario"""
+
+    def __init__(self, stream_opener, config):
+        super().__init__(stream_opener, config)
+        self.stream = self.open()
+        self.current_scenario: Optional[Scenario] = None
+
+    def _finish_scenario(self) -> None:
+        if self.current_scenario is not None:
+            self.write_scenario(self.current_scenario)
+            self.stream.flush()
+        self.current_scenario = None
+
+    def scenario(self, scenario: Scenario) -> None:
+        self._finish_scenario()
+        self.current_scenario = scenario
+
+    def eof(self) -> None:
+        self._finish_scenario()
+
+    @abstractmethod
+    def write_scenario(self, scenario: Scenario) -> None:
+        """Writes the record of a finished scenario to the stream"""
+
+
+class SoarJSONFormatter(StreamingScenarioFormatter):
+    """Writes one JSON object per scenario (JSON Lines)"""
+
+    name = "soar_json"
+    description = "JSON Lines of scenario results with SOAR resource metrics"
+
+    def write_scenario(self, scenario: Scenario) -> None:
+        self.stream.write(json.dumps(scenario_record(scenario), default=str) + "\n")
+
+
+class SoarJUnitFormatter(StreamingScenarioFormatter):
+    """Writes a JUnit XML report with one testsuite per feature. The SOAR metrics are written as testcase
+    properties. Suite totals are left out since they are only known once the suite is finished.
+    """
+
+    name = "soar_junit"
+    description = "JUnit XML streamed per scenario with SOAR resource metrics"
+
+    def __init__(self, stream_opener, config):
+        super().__init__(stream_opener, config)
+        self.stream.write('<?xml version="1.0" encoding="UTF-8"?>\n<testsuites>\n')
+        self.in_feature: bool = False
+
+    def feature(self, feature: Feature) -> None:
+        self.stream.write(f"  <testsuite name={quoteattr(feature.name)}>\n")
+        self.in_feature = True
+
+    def eof(self) -> None:
+        super().eof()
+        if self.in_feature:
+            self.stream.write("  </testsuite>\n")
+            self.in_feature = False
+
+    def write_scenario(self, scenario: Scenario) -> None:
+        record: dict = scenario_record(scenario)
+        self.stream.write(
+            f"    <testcase classname={quoteattr(record['feature'])} name={quoteattr(record['scenario'])}"
+            f" time={quoteattr(str(record['duration']))}>\n"
+        )
+        if record["status"] in ("failed", "undefined"):
+            self.stream.write(
+                f"      <failure message={quoteattr(str(record['failed_step']))}>"
+                f"{escape(str(record['error'] or ''))}</failure>\n"
+            )
+        elif record["status"] == "skipped":
+            self.stream.write("      <skipped/>\n")
+        if record["soar"]:
+            self.stream.write("      <properties>\n")
+            for key, value in record["soar"].items():
+                self.stream.write(
+                    f"        <property name={quoteattr(key)} value={quoteattr(json.dumps(value))}/>\n"
+                )
+            self.stream.write("      </properties>\n")
+        self.stream.write("    </testcase>\n")
+
+    def close(self) -> None:
+        self.stream.write("</testsuites>\n")
+        super().close()
@@ -3,12 +3,47 @@ import behave
 import soarsdk
 import json
 from behave.model import Row, Table
-from typing import Generator, Union, Any
+from typing import Callable, Generator, Optional, Union, Any
+from behave.matchers import Match
+from behave.model import Step
 from behave.runner import Context
 from soarsdk.objects import Container, Artifact
 import re
 
 
+def step_match(context: Context, step: Step) -> Optional[Match]:
+    """Returns the step definition match of a step, or None for undefined steps. Behave keeps its step registry on
+    the private context._runner, so every lookup goes through here.
+    """
+    return context._runner.step_registry.find_match(step)
+
+
+def wrap_step_calls(context: Context, around: Callable[[Callable[[], None]], None]) -> None:
+    """Runs every matched step definition through around(), which receives a function calling the step definition.
+    Only the call is wrapped, the step hooks and behave's own handling of the step run outside of it.
+    """
+    registry = context._runner.step_registry
+    find_match: Callable = registry.find_match
+
+    def find_wrapped_match(step: Step) -> Optional[Match]:
+        match: Optional[Match] = find_match(step)
+        if match is not None:
+            run: Callable = match.run
+            match.run = lambda step_context: around(lambda: run(step_context))
+        return match
+
+    registry.find_match = find_wrapped_match
+
+
+def step_definitions(context: Context) -> list[Callable]:
+    """Returns the function of every registered step definition"""
+    return [
+        matcher.func
+        for matchers in context._runner.step_registry.steps.values()
+        for matcher in matchers
+    ]
+
+
 def row_as_dict(row: Row) -> dict:
     """Returns as a context.table.row as a dictionary.
     Assumes the first row (row[0]) is the key and the second is the value.
@@ -5,10 +5,33 @@ from behave.model import Row, Table
 from typing import Generator, Union, Any
 from behave.runner import Context
 from soarsdk.objects import Container, Artifact, Action, Playbook
-from assert_helpers import assert_container
+from assert_helpers import assert_container, assert_quantity
+from container_index import ContainerIndex, get_container_index, refresh_container
+from container_registry import get_registry, register_container, select_container
+from cef_diff import Difference, format_diff, structural_diff
+from fetch_planner import (
+    ACTIONS,
+    ARTIFACTS,
+    COMMENTS,
+    CONTAINER,
+    NOTES,
+    PINS,
+    PLAYBOOKS,
+    RESULTS,
+    requires,
+)
+from load_test import LATENCY_PERCENTILES
+from playbook_durations import (
+    action_duration,
+    duration_breakdown,
+    format_breakdown,
+    playbook_duration,
+)
+from preflight import references
 
 
 @then('the playbook "{playbook_name}" has the status of "{status}"')
+@requires(PLAYBOOKS)
 def assert_playbook_status(context: Context, playbook_name: str, status: str):
     """Validates the success of the playbook_run's status field.
 
@@ -30,6 +53,7 @@ def assert_playbook_status(context: Context, playbook_name: str, status: str):
 
 
 @then("the playbook actions are successful")
+@requires(ACTIONS)
 def assert_all_actions_successful(context: Context) -> None:
     """Blanket level validation that asserts that all actions are successful. This validation step is not recommended for common usage as it removes the verbosity and documentation of test cases
 
@@ -50,6 +74,7 @@ def assert_all_actions_successful(context: Context) -> None:
 @then(
     'the callback "{callback_name}" playbook "{child_playbook_name}" of "{playbook_name}" is "{status}"'
 )
+@requires(PLAYBOOKS)
 def assert_callback_status(
     context: Context,
     playbook_name: str,
@@ -80,6 +105,7 @@ def assert_callback_status(
 
 
 @then('the playbook "{playbook_name}" action "{action_name}" is "{status}"')
+@requires(ACTIONS)
 def assert_playbook_action_status(
     context: Context, playbook_name: str, action_name: str, status: str
 ):
@@ -113,6 +139,7 @@ def assert_playbook_action_status(
 
 
 @then('the playbook "{playbook_name}" has not run')
+@requires(PLAYBOOKS)
 def validate_playbook_not_ran(context: Context, playbook_name: str) -> None:
     """Checks that a playbook has not run
     Example: the playbook "demo_playbook" has not run
@@ -126,6 +153,7 @@ def validate_playbook_not_ran(context: Context, playbook_name: str) -> None:
 
 
 @then('a "{color}" pin is created with the text "{message}"')
+@requires(PINS)
 def validate_pin_created(context: Context, color: str, message: str) -> None:
     """Validates that a pin is created with a given color and text
     Example: Then a "red" pin is created with the text "Failure"
@@ -133,21 +161,14 @@ def validate_pin_created(context: Context, color: str, message: str) -> None:
     Raises:
         AssertionError: If the Pin is not found with the corresponding message and color
     """
-    pins: list = context.container.pins
-    success: bool = False
-    for pin in pins:
-        if pin.data == message and pin.style == color:
-            success = True
-        if pin.message == message and pin.style == color:
-            success = True
-
-    if not success:
+    if (color, message) not in get_container_index(context).pin_texts:
         raise AssertionError(
-            f"{color} pin containing the message {message} not found in container. \n {pins}"
+            f"{color} pin containing the message {message} not found in container. \n {context.container.pins}"
         )
 
 
 @then('a "{color}" pin is created with the message "{message}" and data "{data}"')
+@requires(PINS)
 def validate_full_pin(context: Context, color: str, message: str, data: str) -> None:
     """Validates that a pin is created with a given color, message and data
     Example: Then a "red" pin is created with the message "Failure" and data "System Error"
@@ -155,17 +176,46 @@ def validate_full_pin(context: Context, color: str, message: str, data: str) ->
     Raises:
         AssertionError: If the Pin is not found with the corresponding message and color
     """
+    if (color, message, data) not in get_container_index(context).pins:
+        raise AssertionError(
+            f"{color} pin containing the message {message} and data {data} was not found. \n {context.container.pins}"
+        )
 
-    for pin in context.container.pins:
-        if pin.style == color and pin.message == message and pin.data == data:
-            return
 
-    raise AssertionError(
-        f"{color} pin containing the message {message} and data {data} was not found. \n {context.container.pins}"
-    )
+@then('a "{color}" pin is created containing the text "{text}"')
+@requires(PINS)
+def validate_pin_contains(context: Context, color: str, text: str) -> None:
+    """Validates that a pin of the given color has a message or data containing the text
+    Example: Then a "red" pin is created containing the text "evil.com"
+
+    Raises:
+        AssertionError: If no pin of the color contains the text
+    """
+    index: ContainerIndex = get_container_index(context)
+    if color not in index.pin_styles_matching(index.pin_search.search(text)):
+        raise AssertionError(
+            f"No {color} pin containing the text {text} was found. \n {context.container.pins}"
+        )
+
+
+@then('a "{color}" pin is created matching the pattern "{pattern}"')
+@requires(PINS)
+def validate_pin_matches(context: Context, color: str, pattern: str) -> None:
+    """Validates that a pin of the given color has a message or data matching the regular expression
+    Example: Then a "red" pin is created matching the pattern "[0-9]+ domains blocked"
+
+    Raises:
+        AssertionError: If no pin of the color matches the pattern
+    """
+    index: ContainerIndex = get_container_index(context)
+    if color not in index.pin_styles_matching(index.pin_search.search_regex(pattern)):
+        raise AssertionError(
+            f"No {color} pin matching the pattern {pattern} was found. \n {context.container.pins}"
+        )
 
 
 @then('the action "{action_name}" is "{status}"')
+@requires(ACTIONS)
 def validate_action_status(context: Context, action_name: str, status: str) -> None:
     """Compare an action result to either success or failed. This is for any playbook within the container.
        Looks for at least once successful instance of the action running successfully in the event there are
@@ -197,6 +247,7 @@ def validate_action_status(context: Context, action_name: str, status: str) -> N
 
 
 @then('the action "{action_name}" did not run')
+@requires(ACTIONS)
 def validate_action_absent(context: Context, action_name: str):
     """Ensure an action did not run.
     Example: Then the action run_query did not run
@@ -204,7 +255,57 @@ def validate_action_absent(context: Context, action_name: str):
     assert action_name not in context.container.action_names
 
 
+@then('the playbook "{playbook_name}" completes within "{seconds}" seconds')
+@requires(ACTIONS)
+def validate_playbook_duration(context: Context, playbook_name: str, seconds: str) -> None:
+    """Checks the run time of a finished playbook, from its start until its last update. Collect the results first.
+    Example: Then the playbook "triage_blocked_domains" completes within "30" seconds
+
+    Raises:
+        PlaybookNotRan: If the playbook is not found on the container
+        AssertionError: If the playbook is still running or ran longer than the limit
+    """
+    playbook: Playbook = context.container.get_playbook(name=playbook_name)
+    if not playbook:
+        raise PlaybookNotRan(f"No playbook {playbook_name} was found on the container.")
+
+    duration = playbook_duration(playbook)
+    if duration is None:
+        raise AssertionError(
+            f"Playbook {playbook_name} has no completed run to time, status {playbook.status}"
+        )
+    if duration > float(seconds):
+        raise AssertionError(
+            f"Playbook {playbook_name} ran for {duration:.3f} seconds, limit {seconds} seconds\n"
+            f"{format_breakdown(duration_breakdown(context.container))}"
+        )
+
+
+@then('the action "{action_name}" takes less than "{seconds}" seconds')
+@requires(ACTIONS)
+def validate_action_duration(context: Context, action_name: str, seconds: str) -> None:
+    """Checks the run time of every run of the action on the container. Collect the results first.
+    Example: Then the action "domain reputation" takes less than "5" seconds
+
+    Raises:
+        ActionNotFound: Action not found in the run history of the container
+        AssertionError: If a run of the action is unfinished or took at least the limit
+    """
+    if action_name not in context.container.action_names:
+        raise ActionNotFound(action_name)
+
+    for action in context.container.get_action(name=action_name):
+        duration = action_duration(action)
+        if duration is None or duration >= float(seconds):
+            raise AssertionError(
+                f"Action {action_name} (id {action.id}) took "
+                f"{'an unknown time' if duration is None else f'{duration:.3f} seconds'}, limit {seconds} seconds\n"
+                f"{format_breakdown(duration_breakdown(context.container))}"
+            )
+
+
 @then('the artifact "{artifact_name}" has the "{key}" of "{value}"')
+@requires(ARTIFACTS)
 def validate_artifact_attribute(
     context: Context, artifact_name: str, key: str, value: str
 ):
@@ -258,10 +359,12 @@ def validate_artifact_attribute(
 
 
 @then('the artifact "{artifact_name}" has the following "{sub_field}" values')
+@requires(ARTIFACTS)
 def validate_artifact_table(
     context: Context, artifact_name: str, sub_field: str
 ) -> None:
-    """Asserts that a given artifact has provided values underneath [cef | tags] field.
+    """Asserts that a given artifact has provided values underneath [cef | tags | cef sub-dictionary] field.
+    Every mismatching key is reported at once.
     Example: Then the artifact "test_artifact" has the following "cef" values
         |   name    |   bob     |
         |   age     |   26      |
@@ -269,12 +372,11 @@ def validate_artifact_table(
     Params:
         context (Context): Scenario Context
         artifact_name (str): Name of the artifact
-        sub_field (str): Specify either CEF or Tags attributes
+        sub_field (str): Specify either CEF, Tags, or the key of a dictionary inside of the CEF
     Raises:
         ArtifactNotConfigured: If matching artifact cannot be found on the container
         AssertionError: If provided subfield doesn't match the values of the artifact
     """
-    artifact_attr: list[str] = ["cef", "tags"]
     artifact: Artifact = context.container.get_artifact(artifact_name)
 
     if not artifact:
@@ -282,19 +384,28 @@ def validate_artifact_table(
             f"Artifact {artifact_name} not found in container artifacts: {context.container.artifact_names}"
         )
 
+    if sub_field == "tags":
+        assert_equal_unordered_lists(artifact.tags, table_to_list(context.table))
+        return
+
+    expected_values: dict = table_to_dictionary(context)
     if sub_field == "cef":
-        expected_values = table_to_dictionary(context)
-        for key, value in expected_values.items():
-            if not artifact.cef[key] == value:
-                raise AssertionError(
-                    f"Artifact {artifact.name} failed validations. Expected value: {value} | actual: {artifact.cef[key]}"
-                )
+        differences: list[Difference] = structural_diff(
+            expected_values, artifact.cef, root="cef"
+        )
+    else:
+        differences = structural_diff(
+            {sub_field: expected_values}, artifact.cef, root="cef"
+        )
 
-    elif sub_field == "tags":
-        assert_equal_unordered_lists(artifact.tags, table_to_list(context.table))
+    if differences:
+        raise AssertionError(
+            f"Artifact {artifact.name} failed validations with {len(differences)} differences:\n{format_diff(differences)}"
+        )
 
 
 @then('the artifact "{artifact_name}" has the cef "{cef_key}" key')
+@requires(ARTIFACTS)
 def validate_artifact_cef(context: Context, artifact_name: str, cef_key: str):
     """Asserts that a given artifact has provided given attribute that is not null
 
@@ -322,6 +433,7 @@ def validate_artifact_cef(context: Context, artifact_name: str, cef_key: str):
 
 
 @then('the artifact "{artifact_name}" does not have the cef "{cef_key}" key')
+@requires(ARTIFACTS)
 def step_impl(context: Context, artifact_name: str, cef_key: str):
     """Asserts that a given artifact has provided given cef _key
     Params:
@@ -348,6 +460,7 @@ def step_impl(context: Context, artifact_name: str, cef_key: str):
 
 
 @then('the container has the "{attr}" of "{expected_value}"')
+@requires(CONTAINER)
 def step_impl(context: Context, attr: str, expected_value: str):
     """Asserts that the container has an attribute of a certain value
     Example: the container "test_container" has the "status" of "new"
@@ -375,6 +488,7 @@ def step_impl(context: Context, attr: str, expected_value: str):
 
 
 @then('the container data has the following "{data_key}" values')
+@requires(CONTAINER)
 def validate_container_attributes_table(context: Context, data_key: str):
     """Asserts that the container's "data" attribute has the key value provided in a table format
     Example: the container data has the "foo" values
@@ -388,61 +502,115 @@ def validate_container_attributes_table(context: Context, data_key: str):
         KeyError: If the provided field isn't found in the container.data dictionary
         AssertionError: If any of the values for attribute do not match the provided table
     """
-    try:
-        # Check if the data key has a subkey as well
-        if ":" in data_key:
-            key, subkey = data_key.split(":")
-            container_data_values = context.container["data"][key][subkey]
-        else:
-            container_data_values = context.container["data"][data_key]
-
-        # Convert Container data values to string to match table data types
-        for key in container_data_values:
-            container_data_values[key] = str(container_data_values[key])
-
-        # Convert the table input values to a dict
-        expected_data = table_to_dictionary(context)
-
-        # Compare expected and actual values
-        assert container_data_values == expected_data
-    except KeyError:
-        raise KeyError(
-            f"The container {context.container.name} does not have a data key of {data_key}"
-        )
-    except AssertionError:
+    # Check if the data key has a subkey as well
+    data_path: list[str] = data_key.split(":")
+    container_data_values = context.container.data
+    for key in data_path:
+        if not isinstance(container_data_values, dict) or key not in container_data_values:
+            raise KeyError(
+                f"The container {context.container.name} does not have a data key of {data_key}"
+            )
+        container_data_values = container_data_values[key]
+
+    # Compare without modifying the downloaded container data
+    expected_data: dict = table_to_dictionary(context)
+    differences: list[Difference] = structural_diff(
+        expected_data, container_data_values, root=".".join(data_path), strict=True
+    )
+    if differences:
         raise AssertionError(
-            f"The container data attribute {data_key} does not match the containers values"
+            f"The container data attribute {data_key} does not match the containers values:\n{format_diff(differences)}"
         )
 
 
-@then('there are at least "{quantity}" artifacts labeled "{artifact_label}"')
-def validate_minimum_labeled_artifacts(
-    context: Context, quantity: str, artifact_label: str
+@then('there are {comparison} "{quantity}" artifacts labeled "{artifact_label}"')
+@requires(ARTIFACTS)
+def validate_labeled_artifact_quantity(
+    context: Context, comparison: str, quantity: str, artifact_label: str
 ):
-    """Validates that there are at least a minimum quantity of artifacts sharing the same label
-    Example: Then there are at least "3" artifacts labeled as "event"
+    """Validates the quantity of artifacts sharing the same label using at least, exactly, or at most
+    Example: Then there are at least "3" artifacts labeled "event"
     Params:
         context (Context): scenario context
-        quantity (str): desired minimum quantity
+        comparison (str): "at least", "exactly", or "at most"
+        quantity (str): desired quantity
         artifact_label (str): artifact_label_match
 
     Raises:
-        AssertionError: If the count of matching artifacts is lower than the requested amount
+        AssertionError: If the count of matching artifacts doesn't satisfy the comparison
 
     """
-    if not context.container:
-        raise ContainerNotConfigured()
+    assert_container(context.container)
+    assert_quantity(
+        get_container_index(context).artifact_labels[artifact_label],
+        comparison,
+        quantity,
+        f"artifacts labeled {artifact_label}",
+    )
 
-    artifact_labels = [artifact.label for artifact in context.container.artifacts]
-    matching_count: int = artifact_labels(artifact_label)
 
-    if not context.container.artifact_names.count(artifact_label) >= int(quantity):
-        raise AssertionError(
-            f"{quantity} labeled artifacts must be labeled as {artifact_label}, but only found {matching_count}"
-        )
+@then('there are {comparison} "{quantity}" artifacts named "{artifact_name}"')
+@requires(ARTIFACTS)
+def validate_named_artifact_quantity(
+    context: Context, comparison: str, quantity: str, artifact_name: str
+):
+    """Validates the quantity of artifacts sharing the same name using at least, exactly, or at most
+    Example: Then there are exactly "1" artifacts named "blocked domain"
+
+    Raises:
+        AssertionError: If the count of matching artifacts doesn't satisfy the comparison
+    """
+    assert_container(context.container)
+    assert_quantity(
+        get_container_index(context).artifact_names[artifact_name],
+        comparison,
+        quantity,
+        f"artifacts named {artifact_name}",
+    )
+
+
+@then('there are {comparison} "{quantity}" artifacts with the cef "{cef_key}" key')
+@requires(ARTIFACTS)
+def validate_cef_key_artifact_quantity(
+    context: Context, comparison: str, quantity: str, cef_key: str
+):
+    """Validates the quantity of artifacts with a non-empty value for a CEF key using at least, exactly, or at most
+    Example: Then there are at least "10" artifacts with the cef "destinationDnsDomain" key
+
+    Raises:
+        AssertionError: If the count of matching artifacts doesn't satisfy the comparison
+    """
+    assert_container(context.container)
+    assert_quantity(
+        get_container_index(context).artifact_cef_keys[cef_key],
+        comparison,
+        quantity,
+        f"artifacts with the cef key {cef_key}",
+    )
+
+
+@then('there are {comparison} "{quantity}" artifacts tagged "{tag}"')
+@requires(ARTIFACTS)
+def validate_tagged_artifact_quantity(
+    context: Context, comparison: str, quantity: str, tag: str
+):
+    """Validates the quantity of artifacts carrying a tag using at least, exactly, or at most
+    Example: Then there are at most "0" artifacts tagged "blocked"
+
+    Raises:
+        AssertionError: If the count of matching artifacts doesn't satisfy the comparison
+    """
+    assert_container(context.container)
+    assert_quantity(
+        get_container_index(context).artifact_tags[tag],
+        comparison,
+        quantity,
+        f"artifacts tagged {tag}",
+    )
 
 
 @then('the action "{action_name}" has the "{field}" below')
+@requires(RESULTS)
 def validate_action_field(context: Context, action_name: str, field: str):
     """Validates an attribute of an action using a larger body of text
 
@@ -474,6 +642,7 @@ def validate_action_field(context: Context, action_name: str, field: str):
 
 
 @then('the action "{action_name}" has the "{field}" of "{value}"')
+@requires(RESULTS)
 def validate_action_attr(context: Context, action_name: str, field: str, value: str):
     """Validates an attribute of an action
 
@@ -501,8 +670,139 @@ def validate_action_attr(context: Context, action_name: str, field: str, value:
     assert str(getattr(action, field)) == value
 
 
+@then('an action result contains "{text}"')
+@requires(RESULTS)
+def validate_any_result_contains(context: Context, text: str):
+    """Validates that the results of any action on the container mention the text, such as an indicator
+    Example: Then an action result contains "10.0.0.1"
+
+    Raises:
+        AssertionError: If no action result mentions the text
+    """
+    assert_container(context.container)
+    if not get_container_index(context).result_text.search(text):
+        raise AssertionError(f"No action result on the container mentions {text}")
+
+
+@then('the action "{action_name}" result contains "{text}"')
+@requires(RESULTS)
+def validate_action_result_contains(context: Context, action_name: str, text: str):
+    """Validates that the results of the named action mention the text
+    Example: Then the action "url_reputation_1" result contains "evil.com"
+
+    Raises:
+        ActionNotFound: If the action didn't run on the container
+        AssertionError: If the results of the action don't mention the text
+    """
+    assert_container(context.container)
+    if action_name not in context.container.action_names:
+        raise ActionNotFound(action_name)
+    if not get_container_index(context).result_text.search(text, sources=[action_name]):
+        raise AssertionError(f"The results of the action {action_name} don't mention {text}")
+
+
+@then('no action result contains "{text}"')
+@requires(RESULTS)
+def validate_no_result_contains(context: Context, text: str):
+    """Validates that no action result on the container mentions the text
+    Example: Then no action result contains "10.0.0.1"
+
+    Raises:
+        AssertionError: If an action result mentions the text
+    """
+    assert_container(context.container)
+    matches: list[tuple[str, str]] = get_container_index(context).result_text.search(text)
+    if matches:
+        actions: list[str] = sorted({action_name for action_name, _ in matches})
+        raise AssertionError(f"The results of the actions {actions} mention {text}")
+
+
+@then('in the container "{container_name}", {validation}')
+# The validation declares what it reads when it runs
+@requires()
+def validate_named_container(context: Context, container_name: str, validation: str):
+    """Runs a validation against a container declared in the scenario without changing the selected container
+    Example: Then in the container "Correlated case", the note "Summary" is created
+
+    Params:
+        context (Context): scenario context
+        container_name (str): name the container was declared or registered with
+        validation (str): any validation step, without the Then keyword
+
+    Raises:
+        ContainerNotRegistered: If no container was declared under the name
+    """
+    selected: Container = getattr(context, "container", None)
+    select_container(context, container_name)
+    try:
+        context.execute_steps(f"Then {validation}")
+    finally:
+        context.container = selected
+
+
+@then("on every sampled container, {validation}")
+@requires()
+def validate_sampled_containers(context: Context, validation: str):
+    """Runs a validation against every container sampled by the load test, keeping the selected container
+    Example: Then on every sampled container, the artifact "blocked domain" has the "tags" of "[blocked]"
+
+    Raises:
+        AssertionError: If no load test ran or the validation fails on a sampled container
+    """
+    load_test = getattr(context, "load_test", None)
+    if not load_test or not load_test.samples():
+        raise AssertionError("No containers were sampled. Run a load test step first")
+
+    selected: Container = getattr(context, "container", None)
+    try:
+        for run in load_test.samples():
+            context.container = run.container
+            try:
+                context.execute_steps(f"Then {validation}")
+            except AssertionError as error:
+                raise AssertionError(f"Sampled container {run.container.name} (id {run.container.id}): {error}")
+    finally:
+        context.container = selected
+
+
+@then('the load test success rate is at least "{percent}" percent')
+@requires()
+def validate_load_success_rate(context: Context, percent: str):
+    """Example: Then the load test success rate is at least "99" percent"""
+    report: dict = context.load_test.report()
+    assert report["success_rate"] >= float(percent), (
+        f"Load test success rate {report['success_rate']}% is below {percent}%: {report['statuses']} {report['errors']}"
+    )
+
+
+@then('the load test "{statistic}" latency is below "{seconds}" seconds')
+@requires()
+def validate_load_latency(context: Context, statistic: str, seconds: str):
+    """Checks a completion latency percentile (p50, p95, or p99) of the successful runs
+    Example: Then the load test "p95" latency is below "120" seconds
+    """
+    if statistic.lower() not in LATENCY_PERCENTILES:
+        raise AssertionError(f'Unknown latency statistic "{statistic}", use {", ".join(LATENCY_PERCENTILES)}')
+    report: dict = context.load_test.report()
+    key: str = f"{statistic.lower()}_seconds"
+    assert report[key] is not None and report[key] < float(seconds), (
+        f"Load test {statistic} latency of {report[key]} seconds is not below {seconds} seconds"
+    )
+
+
+@then('the load test sustains at least "{rate}" containers per minute')
+@requires()
+def validate_load_throughput(context: Context, rate: str):
+    """Example: Then the load test sustains at least "30" containers per minute"""
+    report: dict = context.load_test.report()
+    assert report["containers_per_minute"] >= float(rate), (
+        f"Load test processed {report['containers_per_minute']} containers per minute, expected {rate}"
+    )
+
+
 @then("delete the container")
 @then("the container is deleted")
+@requires()
 def delete_container(context: Context):
     """Deletes the container within phantom & any associated artifacts"""
     context.phantom.delete_container(context.container)
@@ -510,6 +810,7 @@ def delete_container(context: Context):
 
 @then('"{comment}" is commented')
 @then('the comment "{comment}" is added')
+@requires(COMMENTS)
 def validate_comment(context: Context, comment: str):
     """Checks if a comment is added to the container
 
@@ -520,11 +821,42 @@ def validate_comment(context: Context, comment: str):
     Raises:
         AssertionError: If the comment isn't found on the container
     """
-    if not comment in context.container.comments:
+    if comment not in get_container_index(context).comments:
         raise AssertionError(f"Comment {comment} not in {context.container.comments} ")
 
 
+@then('a comment containing "{text}" is added')
+@requires(COMMENTS)
+def validate_comment_contains(context: Context, text: str):
+    """Checks if any comment on the container contains the text
+    Example: Then a comment containing "is currently not blocked" is added
+
+    Raises:
+        AssertionError: If no comment contains the text
+    """
+    if not get_container_index(context).comment_search.search(text):
+        raise AssertionError(
+            f"No comment containing {text} in {context.container.comments}"
+        )
+
+
+@then('a comment matching "{pattern}" is added')
+@requires(COMMENTS)
+def validate_comment_matches(context: Context, pattern: str):
+    """Checks if any comment on the container matches the regular expression
+    Example: Then a comment matching ".* is currently not blocked" is added
+
+    Raises:
+        AssertionError: If no comment matches the pattern
+    """
+    if not get_container_index(context).comment_search.search_regex(pattern):
+        raise AssertionError(
+            f"No comment matching {pattern} in {context.container.comments}"
+        )
+
+
 @then('the note "{note_title}" is created')
+@requires(NOTES)
 def validate_note(context: Context, note_title: str):
     """Validates that a note matching the provided name was added to the container
 
@@ -535,14 +867,74 @@ def validate_note(context: Context, note_title: str):
     Raises:
         AssertionError: If the note isn't found in the current notes
     """
-    note_titles: list[str] = [note.title for note in context.container.notes]
-    if not note_title in note_titles:
+    note_titles: set[str] = get_container_index(context).note_titles
+    if note_title not in note_titles:
         raise AssertionError(
             f"Failed to find note {note_title}. Available notes: {note_titles}"
         )
 
 
+@then('a note with a title containing "{text}" is created')
+@requires(NOTES)
+def validate_note_title_contains(context: Context, text: str):
+    """Validates that a note with a title containing the text was added to the container
+    Example: Then a note with a title containing "Enrichment" is created
+
+    Raises:
+        AssertionError: If no note title contains the text
+    """
+    index: ContainerIndex = get_container_index(context)
+    if not index.note_search.search(text):
+        raise AssertionError(
+            f"Failed to find a note title containing {text}. Available notes: {index.note_titles}"
+        )
+
+
+@then('a note with a title matching "{pattern}" is created')
+@requires(NOTES)
+def validate_note_title_matches(context: Context, pattern: str):
+    """Validates that a note with a title matching the regular expression was added to the container
+    Example: Then a note with a title matching "Enrichment for .*" is created
+
+    Raises:
+        AssertionError: If no note title matches the pattern
+    """
+    index: ContainerIndex = get_container_index(context)
+    if not index.note_search.search_regex(pattern):
+        raise AssertionError(
+            f"Failed to find a note title matching {pattern}. Available notes: {index.note_titles}"
+        )
+
+
+@then('a note mentions "{text}"')
+@requires(NOTES)
+def validate_note_mentions(context: Context, text: str):
+    """Validates that the title or content of a note on the container mentions the text
+    Example: Then a note mentions "evil.com"
+
+    Raises:
+        AssertionError: If no note mentions the text
+    """
+    index: ContainerIndex = get_container_index(context)
+    if not index.note_text.search(text):
+        raise AssertionError(f"No note mentions {text}. Available notes: {index.note_titles}")
+
+
+@then('a comment mentions "{text}"')
+@requires(COMMENTS)
+def validate_comment_mentions(context: Context, text: str):
+    """Validates that a comment on the container mentions the text
+    Example: Then a comment mentions "10.0.0.1"
+
+    Raises:
+        AssertionError: If no comment mentions the text
+    """
+    if not get_container_index(context).comment_text.search(text):
+        raise AssertionError(f"No comment mentioning {text} in {context.container.comments}")
+
+
 @then('there are "{notes_quantity}" total notes')
+@requires(NOTES)
 def step_impl(context: Context, notes_quantity: str):
     """Validates that a note matching the provided name was added to the container
 
@@ -557,6 +949,8 @@ def step_impl(context: Context, notes_quantity: str):
 
 
 @then('a container is created under the label "{container_label}"')
+@references(labels="container_label")
+@requires(RESULTS)
 def step_impl(context: Context, container_label: str):
     """Switches the context container to the resulting container. Finds a "create" container action under the existing
     context.container actions
@@ -585,6 +979,12 @@ def step_impl(context: Context, container_label: str):
             f"Unexpected error has ocurred. Unable to find resulting container from source container {context.container.id}"
         )
 
-    context.container = Container(id=resulting_container_id)
-    context.phantom.update_container_values(context.container)
+    # The created container is registered next to the source container instead of replacing it
+    created_container: Container = Container(id=resulting_container_id)
+    refresh_container(context, created_container)
+    registry = get_registry(context)
+    name: str = created_container.name
+    if name in registry.containers and registry.get(name) is not created_container:
+        name = f"container {resulting_container_id}"
+    register_container(context, name, created_container)
     assert context.container.label == container_label
@@ -0,0 +1,93 @@
+import copy
+from typing import Callable, Optional
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container
+from dataset_artifacts import DatasetArtifacts
+from playbook_cache import canonical_digest, configuration_inputs
+
+"""
+Warm start of containers shared by the scenarios of a feature. Scenarios tagged @read_only promise not to change
+their container, so when an earlier @read_only scenario of the same feature declared the same container, artifacts, and
+datasets (usually through a shared Background), the creation step reuses the container it created instead of creating
+a new one. Templates are kept until the end of the feature.
+"""
+
+READ_ONLY_TAG: str = "read_only"
+
+
+class ContainerTemplate:
+    def __init__(self, container: Container):
+        """State of a container right after it was created
+
+        Attributes:
+            container (Container): Copy of the created container, artifacts included
+            delete (bool): Delete the container at the end of the feature, set when a sharing scenario is @cleanup
+            reuses (int): Scenarios that reused the container
+        """
+        self.container: Container = copy.deepcopy(container)
+        self.delete: bool = False
+        self.reuses: int = 0
+
+    def restore(self, container: Container) -> Container:
+        """Copies the created state into the declared container, keeping the playbooks the scenario declared"""
+        playbooks: list = container.playbooks
+        container.__dict__.update(copy.deepcopy(self.container).__dict__)
+        container.playbooks = playbooks
+        return container
+
+
+class WarmStart:
+    def __init__(self):
+        """Created containers of the current feature by configuration digest"""
+        self.templates: dict[str, ContainerTemplate] = {}
+        self.created: int = 0
+        self.reused: int = 0
+
+    @staticmethod
+    def digest(container: Container, datasets: list[DatasetArtifacts] = ()) -> str:
+        return canonical_digest(configuration_inputs(container, datasets))
+
+    def is_template(self, container: Container) -> bool:
+        return bool(container.id) and any(
+            template.container.id == container.id for template in self.templates.values()
+        )
+
+    def create(
+        self,
+        container: Container,
+        datasets: list[DatasetArtifacts],
+        create: Callable[[], Container],
+        cleanup: bool = False,
+    ) -> Container:
+        """Reuses the container created for an identical configuration, or creates it with create() and keeps it as
+        the template of the configuration
+
+        Args:
+            container (Container): Declared container, not created yet
+            datasets (list[DatasetArtifacts]): Generated artifacts declared for the container
+            create (Callable): Creates the container in Splunk SOAR
+            cleanup (bool): The scenario is tagged @cleanup, the container is deleted at the end of the feature
+        """
+        key: str = self.digest(container, datasets)
+        template: Optional[ContainerTemplate] = self.templates.get(key)
+        if template:
+            template.restore(container)
+            template.reuses += 1
+            self.reused += 1
+        else:
+            create()
+            template = self.templates[key] = ContainerTemplate(container)
+            self.created += 1
+        template.delete = template.delete or cleanup
+        return container
+
+    def release(self, client: Optional[PhantomClient]) -> None:
+        """Ends the feature. Deletes the templates created or reused by @cleanup scenarios"""
+        if client:
+            for template in self.templates.values():
+                if template.delete and template.container.id:
+                    client.delete_container(template.container)
+        self.templates.clear()
+
+    def metrics(self) -> dict:
+        return {"created": self.created, "reused": self.reused}
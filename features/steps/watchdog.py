@@ -0,0 +1,255 @@
+import ctypes
+import json
+import threading
+import time
+from typing import Callable, Iterable, Optional
+from behave.model import Step
+from behave.runner import Context
+from soarsdk.client import PhantomClient
+from soarsdk.objects import Container
+from exceptions import ScenarioTimeout
+from playbook_tracker import ACTIVE_STATUSES
+import utility_functions as utils
+
+"""
+Module to stop scenarios that run too long, such as a playbook waiting on an unanswered prompt or a slow asset. When a
+step or the whole scenario runs out of time, the active playbook runs of the scenario's containers are cancelled on the
+server and the step is failed with a ScenarioTimeout raised in the thread running it. The exception is only raised
+while the step definition itself runs, never in the step hooks or in behave, and is raised again every few seconds until
+the step definition returns, since step code may catch exceptions while polling.
+
+The exception is raised between Python instructions, so it can't interrupt a blocking call such as a socket read. A
+step blocked on a request is only stopped once the request returns, so requests that may hang need a timeout.
+"""
+
+# Step arguments holding the seconds a step waits on purpose, e.g. 'the started playbooks finish within "600" seconds'
+WAIT_ARGUMENTS: tuple = ("seconds", "count")
+
+
+def cancel_active_runs(client: PhantomClient, containers: Iterable[Container]) -> list[int]:
+    """Cancels the pending and running playbook runs of the containers. Returns the cancelled run ids"""
+    container_ids: list[int] = [container.id for container in containers if container.id]
+    if not container_ids:
+        return []
+    records: list[dict] = client._handle_request(
+        method="GET",
+        url="playbook_run?",
+        params={
+            "_filter_container__in": json.dumps(container_ids),
+            "_filter_status__in": json.dumps(list(ACTIVE_STATUSES)),
+            "page_size": 0,
+        },
+        return_data_only=True,
+    )
+    cancelled: list[int] = []
+    for record in records or []:
+        client._handle_request(method="POST", url=f"playbook_run/{record['id']}", json={"cancel": True})
+        cancelled.append(record["id"])
+    return cancelled
+
+
+def wait_seconds(context: Context, step: Step) -> float:
+    """Seconds the step waits on purpose, given as one of its arguments"""
+    match = utils.step_match(context, step)
+    for argument in (match.arguments or []) if match else []:
+        if argument.name in WAIT_ARGUMENTS:
+            try:
+                return float(argument.value)
+            except (TypeError, ValueError):
+                return 0.0
+    return 0.0
+
+
+def _raise_in(thread_id: int, exception: Optional[type]) -> None:
+    """Queues the exception in the thread, None clears an exception queued before that hasn't been raised yet"""
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread_id), ctypes.py_object(exception) if exception else None
+    )
+
+
+class ScenarioWatchdog:
+    def __init__(
+        self,
+        step_timeout: Optional[float] = None,
+        scenario_timeout: Optional[float] = None,
+        repeat_interval: float = 5.0,
+    ):
+        """Time limits of every step and scenario
+
+        Args:
+            step_timeout (float, optional): Seconds a step may run. Steps that wait a given number of seconds get that
+                many seconds on top
+            scenario_timeout (float, optional): Seconds a whole scenario may run
+            repeat_interval (float): Seconds between raising the timeout again while the step keeps running
+
+        Attributes:
+            timeout (dict): Details of the timeout of the running scenario, None while it is on time
+        """
+        self.step_timeout: Optional[float] = step_timeout
+        self.scenario_timeout: Optional[float] = scenario_timeout
+        self.repeat_interval: float = repeat_interval
+        self.scenario_started: Optional[float] = None
+        self.timeout: Optional[dict] = None
+        self.timeouts: int = 0
+        self.cancelled_runs: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._disarmed: Optional[threading.Event] = None
+        self._armed: Optional[Step] = None
+        self._thread_id: Optional[int] = None
+        # Step definitions running on the watched thread, nested ones included
+        self._running: int = 0
+
+    @classmethod
+    def from_userdata(cls, userdata) -> Optional["ScenarioWatchdog"]:
+        """Creates a watchdog from behave -D options. Returns None when neither timeout is configured
+
+        Example: behave -D step_timeout=900 -D scenario_timeout=1800
+        """
+        step_timeout: Optional[str] = userdata.get("step_timeout")
+        scenario_timeout: Optional[str] = userdata.get("scenario_timeout")
+        if not step_timeout and not scenario_timeout:
+            return None
+        return cls(
+            step_timeout=float(step_timeout) if step_timeout else None,
+            scenario_timeout=float(scenario_timeout) if scenario_timeout else None,
+        )
+
+    def start_scenario(self) -> None:
+        self.disarm()
+        self.scenario_started = time.monotonic()
+        self.timeout = None
+
+    def budget(self, waits: float = 0.0) -> Optional[float]:
+        """Seconds the next step may run, the smaller of its own limit and the time left for the scenario"""
+        limits: list[float] = []
+        if self.step_timeout is not None:
+            limits.append(self.step_timeout + waits)
+        if self.scenario_timeout is not None and self.scenario_started is not None:
+            limits.append(self.scenario_timeout - (time.monotonic() - self.scenario_started))
+        return max(min(limits), 0.0) if limits else None
+
+    def arm(self, step: Step, cancel: Callable[[], list[int]], waits: float = 0.0) -> bool:
+        """Watches the step about to run on the current thread. Steps it runs with context.execute_steps() are
+        covered by its watch and aren't armed again
+
+        Args:
+            step (Step): Step about to run, its keyword and name are used in the failure message
+            cancel (Callable): Cancels the scenario's playbook runs and returns their ids
+            waits (float): Seconds the step waits on purpose
+
+        Returns:
+            bool: True when the step is watched
+        """
+        if self._armed is not None:
+            return False
+        budget: Optional[float] = self.budget(waits)
+        if budget is None:
+            return False
+        disarmed: threading.Event = threading.Event()
+        with self._lock:
+            self._disarmed = disarmed
+            self._armed = step
+            self._thread_id = threading.get_ident()
+        threading.Thread(
+            target=self._watch,
+            args=(disarmed, self._thread_id, f"{step.keyword} {step.name}", budget, cancel),
+            name="scenario-watchdog",
+            daemon=True,
+        ).start()
+        return True
+
+    def disarm(self, step: Optional[Step] = None) -> Optional[dict]:
+        """Stops watching the step (defaults to the watched one) and clears a timeout queued for its thread that
+        hasn't been raised yet, so it can't reach behave or the next hook. Steps nested in the watched step leave it
+        armed. Returns the timeout details when the step timed out
+        """
+        if step is not None and step is not self._armed:
+            return None
+        with self._lock:
+            if self._disarmed:
+                self._disarmed.set()
+                _raise_in(self._thread_id, None)
+            self._disarmed = None
+            self._armed = None
+            self._thread_id = None
+            self._running = 0
+        return self.timeout
+
+    def call(self, step_call: Callable[[], None]) -> None:
+        """Runs a step definition, see utility_functions.wrap_step_calls(). Timeouts are only raised into the watched
+        thread while a step definition runs on it
+        """
+        if threading.get_ident() != self._thread_id:
+            return step_call()
+        with self._lock:
+            self._running += 1
+        try:
+            return step_call()
+        finally:
+            with self._lock:
+                self._running = max(self._running - 1, 0)
+                if not self._running:
+                    _raise_in(threading.get_ident(), None)
+
+    def _watch(
+        self,
+        disarmed: threading.Event,
+        thread_id: int,
+        label: str,
+        budget: float,
+        cancel: Callable[[], list[int]],
+    ) -> None:
+        step_started: float = time.monotonic()
+        if disarmed.wait(budget):
+            return
+
+        now: float = time.monotonic()
+        scenario_elapsed: float = now - (self.scenario_started or step_started)
+        scenario_expired: bool = (
+            self.scenario_timeout is not None and scenario_elapsed >= self.scenario_timeout
+        )
+        timeout: dict = {
+            "limit": "scenario" if scenario_expired else "step",
+            "step": label,
+            "limit_seconds": round(budget, 3),
+            "step_seconds": round(now - step_started, 3),
+            "scenario_seconds": round(scenario_elapsed, 3),
+            "step_timeout": self.step_timeout,
+            "scenario_timeout": self.scenario_timeout,
+            "cancelled_runs": [],
+        }
+        try:
+            timeout["cancelled_runs"] = cancel()
+        except Exception as error:
+            timeout["cancel_error"] = f"{type(error).__name__}: {error}"
+        self.timeout = timeout
+        self.timeouts += 1
+        self.cancelled_runs += len(timeout["cancelled_runs"])
+
+        exception: type = type(
+            ScenarioTimeout.__name__, (ScenarioTimeout,), {"details": describe(timeout), "__module__": ScenarioTimeout.__module__}
+        )
+        while True:
+            with self._lock:
+                if disarmed.is_set():
+                    return
+                # Outside of a step definition the exception would reach behave itself. A step that returned is
+                # failed by after_step instead
+                if self._running:
+                    _raise_in(thread_id, exception)
+            if disarmed.wait(self.repeat_interval):
+                return
+
+    def metrics(self) -> dict:
+        return {"timeouts": self.timeouts, "cancelled_runs": self.cancelled_runs}
+
+
+def describe(timeout: dict) -> str:
+    message: str = (
+        f"The {timeout['limit']} time limit was reached {timeout['limit_seconds']} seconds into '{timeout['step']}'. "
+        f"The step ran {timeout['step_seconds']} seconds, the scenario {timeout['scenario_seconds']} seconds. "
+        f"Cancelled playbook runs: {timeout['cancelled_runs']}"
+    )
+    if timeout.get("cancel_error"):
+        message += f". Cancelling the playbook runs failed: {timeout['cancel_error']}"
+    return message
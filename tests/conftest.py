@@ -0,0 +1,44 @@
+import os
+import sys
+from typing import Callable
+from unittest import mock
+import pytest
+import requests
+from soarsdk.client import PhantomClient
+
+# Step modules import each other by bare name, as behave loads them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "features", "steps"))
+
+
+def json_response(data) -> requests.Response:
+    response: requests.Response = requests.Response()
+    response.status_code = 200
+    response._content = requests.compat.json.dumps(data).encode()
+    response.headers["Content-Type"] = "application/json"
+    return response
+
+
+def encoded_url(call: mock._Call) -> str:
+    """URL the session would send for a recorded session.get/post call, query string included"""
+    return requests.Request("GET", call.kwargs["url"], params=call.kwargs["params"]).prepare().url
+
+
+@pytest.fixture
+def client() -> Callable[..., PhantomClient]:
+    """Builds a PhantomClient whose session answers every request from a handler of (method, url, params, body)"""
+
+    def build(handler: Callable[[str, str, dict, dict], object]) -> PhantomClient:
+        phantom: PhantomClient = PhantomClient.__new__(PhantomClient)
+        phantom.base_url = "https://soar.example/"
+        phantom.rest_url = phantom.base_url + "rest/"
+        phantom.requests_log = []
+        phantom.action_builder = []
+        phantom._TLS_VERIFY = False
+        phantom.session = mock.Mock()
+        for method in ("get", "post", "delete"):
+            getattr(phantom.session, method).side_effect = lambda method=method, **kwargs: json_response(
+                handler(method, kwargs["url"], dict(kwargs.get("params") or {}), kwargs.get("json") or {})
+            )
+        return phantom
+
+    return build
@@ -0,0 +1,57 @@
+import pytest
+from cef_diff import Difference, coerce_cell, format_diff, structural_diff
+
+
+@pytest.mark.parametrize("text", ["True", "None", "null", "[1, 2]", '{"a": 1}', "007", " padded "])
+def test_cells_match_identical_cef_strings(text: str):
+    assert structural_diff({"value": text}, {"value": text}) == []
+
+
+@pytest.mark.parametrize(
+    "cell, actual",
+    [
+        ("8080", 8080),
+        ("1.5", 1.5),
+        ("true", True),
+        ("False", False),
+        ("null", None),
+        ("[1, 2]", [1, 2]),
+        ('{"port": 8080, "tags": ["a"]}', {"port": 8080, "tags": ["a"]}),
+    ],
+)
+def test_cells_match_the_values_they_represent(cell: str, actual):
+    assert structural_diff({"value": cell}, {"value": actual}) == []
+
+
+def test_coerce_cell_keeps_lossy_numbers_as_text():
+    assert coerce_cell("007") == "007"
+    assert coerce_cell("1e3") == "1e3"
+    assert coerce_cell("[not json]") == "[not json]"
+    assert coerce_cell(" 42 ") == 42
+
+
+def test_reports_every_difference_with_its_path():
+    expected: dict = {"host": "a", "ports": ["80", "443"], "nested": '{"user": "admin"}', "gone": "x"}
+    actual: dict = {"host": "b", "ports": [80, 8443], "nested": {"user": "root"}, "extra": 1}
+
+    differences: list[Difference] = structural_diff(expected, actual, root="cef", strict=True)
+
+    assert [(difference.path, difference.kind) for difference in differences] == [
+        ("cef.gone", Difference.MISSING),
+        ("cef.extra", Difference.UNEXPECTED),
+        ("cef.host", Difference.CHANGED),
+        ("cef.ports[1]", Difference.CHANGED),
+        ("cef.nested.user", Difference.CHANGED),
+    ]
+    assert "cef.ports[1]: expected 443 | actual 8443" in format_diff(differences)
+
+
+def test_does_not_modify_the_actual_values():
+    actual: dict = {"ports": [80], "user": {"name": "admin"}}
+    structural_diff({"ports": "[81]", "user": '{"name": "root"}'}, actual)
+    assert actual == {"ports": [80], "user": {"name": "admin"}}
+
+
+def test_lists_of_different_length_are_one_difference():
+    differences: list[Difference] = structural_diff({"ports": "[80]"}, {"ports": [80, 443]})
+    assert [str(difference) for difference in differences] == ["ports: expected [80] | actual [80, 443]"]
@@ -0,0 +1,113 @@
+import json
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlsplit
+from behave.model_core import Status
+from behave.parser import parse_feature
+from conftest import encoded_url
+from change_selection import ChangeSelection, playbook_versions, scenario_digest
+from preflight import BATCH_SIZE
+from scenario_timings import scenario_key
+
+FEATURE: str = """
+Feature: Triage
+
+  Scenario: Blocked domains
+    Given a new container
+    Then the artifact has the following values
+      | domain      |
+      | example.com |
+
+  Scenario: Passing
+    Given a new container
+
+  Scenario: New
+    Given a new container
+"""
+
+
+def fingerprint(**changes) -> dict:
+    return {"scenario": "s", "modules": {"steps.py": "m"}, "support": "x", "playbooks": {"triage": "v1"}, **changes}
+
+
+def finished(name: str, status: Status) -> SimpleNamespace:
+    return SimpleNamespace(filename="triage.feature", name=name, status=status)
+
+
+def test_playbook_versions_are_queried_in_batches(client):
+    names: list[str] = [f"playbook_{number:03}" for number in range(BATCH_SIZE + 5)] + ["local/playbook_000"]
+    phantom = client(
+        lambda method, url, params, body: {
+            "data": [
+                {"name": name, "id": 1, "version": 3}
+                for name in json.loads(params["_filter_name__in"])
+                if name != "missing"
+            ]
+        }
+    )
+
+    versions: dict[str, str] = playbook_versions(phantom, names + ["missing"])
+
+    queries: list[dict] = [parse_qs(urlsplit(encoded_url(call)).query) for call in phantom.session.get.call_args_list]
+    assert [len(json.loads(query["_filter_name__in"][0])) for query in queries] == [BATCH_SIZE, 6]
+    assert versions["local/playbook_000"] == versions["playbook_000"]
+    assert versions["missing"] != versions["playbook_000"]
+
+
+def test_is_changed_compares_every_fingerprint_of_a_passing_run(tmp_path):
+    selection: ChangeSelection = ChangeSelection(str(tmp_path / "changes.json"))
+    selection.entries = {
+        "same": {**fingerprint(), "status": "passed"},
+        "failed": {**fingerprint(), "status": "failed"},
+        "playbook": {**fingerprint(playbooks={"triage": "v0"}), "status": "passed"},
+        "module": {**fingerprint(modules={"steps.py": "old"}), "status": "passed"},
+    }
+    selection.fingerprints = {key: fingerprint() for key in ("same", "failed", "playbook", "module", "new")}
+
+    assert {key: selection.is_changed(key) for key in selection.fingerprints} == {
+        "same": False,
+        "failed": True,
+        "playbook": True,
+        "module": True,
+        "new": True,
+    }
+
+
+def test_scenario_digest_covers_table_cells():
+    before = parse_feature(FEATURE).scenarios[0]
+    after = parse_feature(FEATURE.replace("example.com", "example.org")).scenarios[0]
+
+    assert scenario_digest(before) != scenario_digest(after)
+    assert scenario_digest(before) == scenario_digest(parse_feature(FEATURE).scenarios[0])
+
+
+def test_save_merges_the_scenarios_of_other_processes(tmp_path):
+    path: str = str(tmp_path / "changes.json")
+    first: ChangeSelection = ChangeSelection(path).load()
+    second: ChangeSelection = ChangeSelection(path).load()
+    context = SimpleNamespace()
+    for selection, name, status in ((first, "Passing", Status.passed), (second, "New", Status.failed)):
+        selection.fingerprints[scenario_key("triage.feature", name)] = fingerprint()
+        selection.record(context, finished(name, status))
+
+    first.save()
+    second.save()
+
+    with open(path) as map_file:
+        stored: dict = json.load(map_file)
+    assert {key: entry["status"] for key, entry in stored.items()} == {
+        "triage.feature::Passing": "passed",
+        "triage.feature::New": "failed",
+    }
+
+
+def test_order_runs_failed_and_new_scenarios_first(tmp_path):
+    feature = parse_feature(FEATURE, filename="triage.feature")
+    selection: ChangeSelection = ChangeSelection(str(tmp_path / "changes.json"))
+    selection.entries = {
+        scenario_key("triage.feature", "Blocked domains"): {"status": "passed"},
+        scenario_key("triage.feature", "Passing"): {"status": "passed"},
+    }
+
+    selection.order([feature])
+
+    assert [scenario.name for scenario in feature.scenarios] == ["New", "Blocked domains", "Passing"]
@@ -0,0 +1,47 @@
+import re
+import pytest
+from container_index import SubstringIndex, TextIndex, regex_literals
+
+
+@pytest.mark.parametrize(
+    "pattern, literals",
+    [
+        (r"error \d+ in module", ["error ", " in module"]),
+        (r"[ab\]cdef]xyz", ["xyz"]),
+        (r"[]x]abcdef", ["abcdef"]),
+        (r"[^]a]zzzabc", ["zzzabc"]),
+        (r"abc[a-z]{2,3}defg", ["abc", "defg"]),
+        (r"host\.example\.com", ["host.example.com"]),
+        (r"first|second", []),
+    ],
+)
+def test_regex_literals(pattern, literals):
+    assert regex_literals(pattern) == literals
+
+
+def test_escaped_bracket_in_a_class_is_not_required():
+    documents: list[str] = ["port]8080", "port:8080"]
+    pattern: str = r"port[:\]abc]8080"
+
+    assert SubstringIndex(documents).search_regex(pattern) == [
+        document for document in documents if re.search(pattern, document)
+    ]
+
+
+def test_text_index_matches_whole_words_ignoring_case():
+    index: TextIndex = TextIndex(
+        [
+            ("block ip", "Blocked 10.0.0.1 on the firewall"),
+            ("block ip", "Blocked 10.0.0.15 on the firewall"),
+            ("lookup", "10.0.0.1 is known as BAD.example.com"),
+            ("lookup", "10.0.0.1 is known as BAD.example.com"),
+        ]
+    )
+
+    assert index.search("10.0.0.1") == [
+        ("block ip", "Blocked 10.0.0.1 on the firewall"),
+        ("lookup", "10.0.0.1 is known as BAD.example.com"),
+    ]
+    assert index.search("bad.example.com", sources=["block ip"]) == []
+    assert index.search("bad.example.com", sources=["lookup"]) == [("lookup", "10.0.0.1 is known as BAD.example.com")]
+    assert index.search("the fire") == []
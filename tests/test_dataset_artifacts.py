@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+from soarsdk.objects import Container
+from dataset_artifacts import DatasetArtifacts, iter_dataset_rows, row_to_artifact
+
+
+def test_rows_become_artifact_payloads(tmp_path):
+    dataset = tmp_path / "domains.csv"
+    dataset.write_text("name,tags,domain,empty\nfirst,\"a,b\",example.com,\n,,example.org,\n")
+
+    payloads: list[dict] = [row_to_artifact(row, index, 7, "event") for index, row in enumerate(iter_dataset_rows(str(dataset)), 1)]
+
+    assert payloads[0]["name"] == "first" and payloads[0]["tags"] == ["a", "b"]
+    assert payloads[0]["cef"] == {"domain": "example.com"}
+    assert payloads[1]["name"] == "generated artifact 2" and payloads[1]["container_id"] == 7
+
+
+def test_concurrent_creations_each_return_their_own_count(client, tmp_path):
+    dataset = tmp_path / "rows.jsonl"
+    dataset.write_text("".join(f'{{"name": "row {number}"}}\n' for number in range(25)))
+    posted: list[int] = []
+    phantom = client(lambda method, url, params, body: posted.append(len(body)) or {"success": True})
+    artifacts: DatasetArtifacts = DatasetArtifacts(str(dataset), batch_size=10)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        counts: list[int] = list(pool.map(lambda number: artifacts.create(phantom, Container(id=number)), range(40)))
+
+    assert counts == [25] * 40
+    assert artifacts.created == 25 * 40
+    assert sum(posted) == 25 * 40 and max(posted) == 10
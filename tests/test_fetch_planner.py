@@ -0,0 +1,124 @@
+from types import SimpleNamespace
+from behave.model_core import Status
+from soarsdk.objects import Container
+from container_registry import ContainerRegistry, refresh_all_containers
+from fetch_planner import ARTIFACTS, CONTAINER, PLAYBOOKS, RESULTS, FetchPlanner, collects, mutates, requires
+
+
+@collects
+def collect_results(context): ...
+
+
+@mutates
+def add_note(context): ...
+
+
+@requires(ARTIFACTS)
+def read_artifacts(context): ...
+
+
+def undeclared(context): ...
+
+
+def scenario_context(phantom, *functions) -> SimpleNamespace:
+    """Scenario whose steps run the functions in order, the first one being the running step"""
+    steps: list[SimpleNamespace] = [SimpleNamespace(status=Status.untested, func=function) for function in functions]
+    return SimpleNamespace(
+        scenario=SimpleNamespace(all_steps=steps),
+        _runner=SimpleNamespace(step_registry=SimpleNamespace(find_match=lambda step: step)),
+        phantom=phantom,
+        fetch_planner=FetchPlanner(),
+    )
+
+
+def soar(client, requested: list):
+    def handler(method, url, params, body):
+        requested.append(url.rsplit("/", 1)[-1])
+        if url.endswith("container?"):
+            return {"data": [{"id": int(params["_filter_id"]), "name": "container"}]}
+        return {"data": []}
+
+    phantom = client(handler)
+    phantom.session.hooks = {"response": []}
+    respond = phantom.session.get.side_effect
+
+    def get(**kwargs):
+        # Response hooks run as they would on a requests session
+        response = respond(**kwargs)
+        for hook in list(phantom.session.hooks["response"]):
+            hook(response, stream=False)
+        return response
+
+    phantom.session.get.side_effect = get
+    return phantom
+
+
+def test_plan_reads_the_steps_up_to_the_next_collection(client):
+    context = scenario_context(soar(client, []), collect_results, read_artifacts, collect_results, undeclared)
+
+    assert context.fetch_planner.plan(context) == {CONTAINER, ARTIFACTS}
+
+
+def test_undeclared_steps_read_everything_with_dependencies(client):
+    context = scenario_context(soar(client, []), collect_results, undeclared)
+
+    planned: set[str] = context.fetch_planner.plan(context)
+
+    assert {RESULTS, PLAYBOOKS} <= planned
+
+
+def test_unchanged_container_is_collected_without_downloads(client):
+    requested: list[str] = []
+    context = scenario_context(soar(client, requested), collect_results, read_artifacts)
+    container: Container = Container(id=5)
+
+    context.fetch_planner.refresh(context, container)
+    downloads: int = len(requested)
+    context.fetch_planner.refresh(context, container)
+
+    assert downloads == 2 and len(requested) == downloads
+    assert context.fetch_planner.metrics()["coalesced_collections"] == 1
+
+
+def test_stale_container_is_refreshed_once_by_the_first_reading_step(client):
+    requested: list[str] = []
+    context = scenario_context(soar(client, requested), collect_results, read_artifacts)
+    container: Container = Container(id=5)
+    context.container = container
+    planner: FetchPlanner = context.fetch_planner
+    planner.refresh(context, container)
+    planner.mark_stale(container)
+    planner.mark_stale(container)
+    refreshes: list[int] = []
+
+    for _ in range(2):
+        planner.ensure(
+            context,
+            SimpleNamespace(func=read_artifacts),
+            refresh=lambda: refreshes.append(1) or planner.refresh(context, container),
+        )
+
+    assert len(refreshes) == 1
+    assert planner.metrics()["automatic_refreshes"] == 1
+
+
+def test_collecting_every_container_goes_through_the_planner(client):
+    requested: list[str] = []
+    phantom = soar(client, requested)
+    context = scenario_context(phantom, collect_results, read_artifacts)
+    context.containers = ContainerRegistry(workers=4)
+    containers: list[Container] = [
+        context.containers.register(f"container {number}", Container(id=number)) for number in range(1, 9)
+    ]
+    for container in containers:
+        context.fetch_planner.mark_stale(container)
+
+    refresh_all_containers(context)
+
+    planner: FetchPlanner = context.fetch_planner
+    assert all(not planner.state(container).stale for container in containers)
+    assert planner.state(containers[0]).resources == {CONTAINER, ARTIFACTS}
+    assert planner.metrics()["collections"] == 8
+    # Concurrent fetches on the shared session measure each response once and leave no hook behind
+    assert planner.costs[CONTAINER]["calls"] == planner.costs[CONTAINER]["fetches"] == 8
+    assert phantom.session.hooks["response"] == []
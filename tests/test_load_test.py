@@ -0,0 +1,60 @@
+import itertools
+import threading
+from types import SimpleNamespace
+import pytest
+from soarsdk.objects import Container
+from load_test import LATENCY_PERCENTILES, LoadTest, LoadTestSettings, percentile
+
+
+def test_percentile_uses_the_nearest_rank():
+    values: list[float] = [float(value) for value in range(1, 101)]
+    assert [percentile(values, float(name[1:])) for name in LATENCY_PERCENTILES] == [50.0, 95.0, 99.0]
+    assert percentile([], 50) is None
+
+
+def test_runs_finish_through_the_playbook_tracker(client):
+    ids = itertools.count(100)
+    lock: threading.Lock = threading.Lock()
+
+    def handler(method: str, url: str, params: dict, body: dict) -> dict:
+        endpoint: str = url.split("rest/")[1].rstrip("?")
+        with lock:
+            if method == "post" and endpoint == "container":
+                return {"success": True, "id": next(ids)}
+            if endpoint == "container":
+                return {"data": [{"id": int(params["_filter_id"]), "name": "load", "label": "events"}]}
+            if method == "post" and endpoint == "playbook_run":
+                return {"playbook_run_id": body["container_id"] * 10}
+            if endpoint == "playbook_run":
+                container: int = int(params["_filter_container"])
+                # Running on the first tick, finished on the ticks filtered by update_time
+                if "_filter_update_time__gte" not in params:
+                    return {"data": [{"id": container * 10, "status": "running", "update_time": "2026-10-19T10:00:00"}]}
+                assert params["_filter_update_time__gte"] == '"2026-10-19T10:00:00"'
+                return {"data": [{"id": container * 10, "status": "success", "update_time": "2026-10-19T10:00:01"}]}
+            return {"data": []}
+
+    load_test = LoadTest(
+        client(handler),
+        Container(name="load", label="events"),
+        "triage",
+        LoadTestSettings(containers=4, rate=0, concurrency=2, sample=2, timeout=5),
+        poll_interval=0,
+    )
+
+    report: dict = load_test.run().report()
+
+    assert report["statuses"] == {"success": 4}, report["errors"]
+    assert report["success_rate"] == 100.0
+    assert all(report[f"{name}_seconds"] is not None for name in LATENCY_PERCENTILES)
+    assert len(load_test.samples()) == 2
+
+
+def test_latency_validation_only_accepts_percentiles():
+    import validation_steps
+
+    context = SimpleNamespace(load_test=SimpleNamespace(report=lambda: {"elapsed_seconds": 1.0, "p95_seconds": 2.0}))
+
+    validation_steps.validate_load_latency(context, "P95", "5")
+    with pytest.raises(AssertionError, match="Unknown latency statistic"):
+        validation_steps.validate_load_latency(context, "elapsed", "5")
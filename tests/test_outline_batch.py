@@ -0,0 +1,31 @@
+from behave.parser import parse_steps
+from soarsdk.objects import Artifact, Container
+from outline_batch import OutlineBatch, step_source
+
+
+def test_step_source_parses_back_to_the_same_step():
+    step = parse_steps('Given the artifact "a|b" has the following "cef" values\n| key | value |\n| path | c\\|d |')[0]
+    text_step = parse_steps('When the note is\n"""\n  first\nsecond\n"""')[0]
+
+    parsed = parse_steps(step_source(step) + "\n" + step_source(text_step))
+
+    assert [(row.keyword, row.name) for row in parsed] == [(step.keyword, step.name), (text_step.keyword, text_step.name)]
+    assert parsed[0].table.headings == ["key", "value"] and list(parsed[0].table[0]) == ["path", "c|d"]
+    assert parsed[1].text == "  first\nsecond"
+
+
+def test_views_hold_their_row_and_the_artifacts_added_after_creation():
+    batch: OutlineBatch = OutlineBatch([])
+    packed: Container = batch.pack(
+        {
+            1: Container(name="Batch", label="events", artifacts=[Artifact(name="alpha", label="event")]),
+            2: Container(name="Batch", label="events", artifacts=[Artifact(name="beta", label="event")]),
+        }
+    )
+    packed.artifacts.append(Artifact(name="created by playbook", label="event"))
+    batch.container = packed
+    batch.views = {1: Container(name="Batch", label="events"), 2: Container(name="Batch", label="events")}
+
+    assert [artifact.name for artifact in batch.view(1).artifacts] == ["alpha", "created by playbook"]
+    assert [artifact.name for artifact in batch.view(2).artifacts] == ["beta", "created by playbook"]
+    assert [artifact.name for artifact in packed.artifacts] == ["alpha #1", "beta #2", "created by playbook"]
@@ -0,0 +1,132 @@
+import collections
+import json
+import threading
+import time
+from unittest import mock
+import parallel_runner
+from parallel_runner import ScenarioJob, WorkStealingPool, assign_jobs, collect_jobs
+from scenario_timings import ScenarioTimings, scenario_key
+
+FEATURE: str = """
+Feature: Triage
+
+  Scenario: Blocked domains
+    Given a new container
+
+  @serial
+  Scenario: Activate playbook
+    Given a new container
+
+  Scenario: Allowed domains
+    Given a new container
+
+  @serial
+  Scenario: Change settings
+    Given a new container
+"""
+
+
+def job(name: str, estimate: float, tags: list[str] = ()) -> ScenarioJob:
+    return ScenarioJob(location=f"triage.feature:{name}", key=name, tags=list(tags), estimate=estimate)
+
+
+def names(queue: collections.deque) -> list[str]:
+    return [queued.key for queued in queue]
+
+
+def test_longest_jobs_go_to_the_least_loaded_worker():
+    jobs: list[ScenarioJob] = [job(name, estimate) for name, estimate in zip("abcdef", (3, 7, 2, 5, 6, 4))]
+
+    queues: list[collections.deque] = assign_jobs(jobs, workers=2)
+
+    assert [names(queue) for queue in queues] == [["b", "f", "a"], ["e", "d", "c"]]
+    assert [sum(queued.estimate for queued in queue) for queue in queues] == [14, 13]
+    assert [names(queue) for queue in assign_jobs(jobs, workers=8)][:6] == [["b"], ["e"], ["d"], ["f"], ["a"], ["c"]]
+
+
+def test_idle_workers_steal_the_smallest_job_of_the_busiest_worker():
+    queues: list[collections.deque] = [
+        collections.deque([job("a", 10), job("b", 1)]),
+        collections.deque(),
+        collections.deque([job("c", 4), job("d", 3), job("e", 2)]),
+    ]
+    pool: WorkStealingPool = WorkStealingPool(queues, run_job=lambda queued: None)
+
+    stolen: ScenarioJob = pool._next_job(1)
+
+    assert stolen.key == "b" and pool.steals == 1
+    # 10 seconds are left on the first worker and 9 on the third
+    assert pool._next_job(1).key == "a"
+    assert pool._next_job(0).key == "e" and pool.steals == 3
+    assert names(queues[2]) == ["c", "d"]
+
+
+def test_pool_runs_every_job_once_stealing_from_a_long_queue():
+    queues: list[collections.deque] = [
+        collections.deque([job("long", 5), job("b", 1), job("c", 1), job("d", 1)]),
+        collections.deque(),
+    ]
+    ran: dict[int, list[str]] = collections.defaultdict(list)
+
+    def run_job(queued: ScenarioJob) -> None:
+        ran[threading.get_ident()].append(queued.key)
+        time.sleep(queued.estimate * 0.05)
+
+    pool: WorkStealingPool = WorkStealingPool(queues, run_job)
+    pool.run()
+
+    assert sorted(ran.values()) == [["d", "c", "b"], ["long"]]
+    assert pool.steals == 3
+
+
+def test_serial_jobs_run_alone_after_the_parallel_jobs(tmp_path, capsys):
+    feature_file = tmp_path / "triage.feature"
+    feature_file.write_text(FEATURE)
+    timings_file = tmp_path / "timings.json"
+    timings_file.write_text(
+        json.dumps(
+            {
+                scenario_key(str(feature_file), "Blocked domains"): 2.0,
+                scenario_key(str(feature_file), "Allowed domains"): 1.0,
+            }
+        )
+    )
+    events: list[tuple[str, str]] = []
+    running: list[int] = [0]
+    overlapping: list[str] = []
+    lock: threading.Lock = threading.Lock()
+
+    def run_job(queued: ScenarioJob) -> None:
+        with lock:
+            running[0] += 1
+            if queued.serial and running[0] > 1:
+                overlapping.append(queued.key)
+            events.append(("start", queued.key))
+        time.sleep(0.02)
+        queued.returncode = 0
+        with lock:
+            running[0] -= 1
+            events.append(("end", queued.key))
+
+    with mock.patch.object(parallel_runner, "behave_job_runner", return_value=run_job):
+        returncode: int = parallel_runner.main([str(tmp_path), "-w", "2", "--timings", str(timings_file)])
+
+    started: list[str] = [key.split("::")[1] for event, key in events if event == "start"]
+    assert returncode == 0 and not overlapping
+    assert sorted(started[:2]) == ["Allowed domains", "Blocked domains"]
+    assert started[2:] == ["Activate playbook", "Change settings"]
+    assert "4 passed, 0 failed" in capsys.readouterr().out
+
+
+def test_collect_jobs_estimates_unknown_scenarios_from_the_known_ones(tmp_path):
+    feature_file = tmp_path / "triage.feature"
+    feature_file.write_text(FEATURE)
+    timings: ScenarioTimings = ScenarioTimings(str(tmp_path / "timings.json"))
+    timings.durations = {scenario_key(str(feature_file), "Blocked domains"): 8.0}
+
+    jobs: list[ScenarioJob] = collect_jobs([str(tmp_path)], timings, tags=["~@serial"])
+
+    assert [(queued.key.split("::")[1], queued.estimate) for queued in jobs] == [
+        ("Blocked domains", 8.0),
+        ("Allowed domains", 8.0),
+    ]
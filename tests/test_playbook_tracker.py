@@ -0,0 +1,66 @@
+import json
+from datetime import datetime
+from urllib.parse import parse_qs, urlsplit
+from soarsdk.objects import Container, Playbook
+from conftest import encoded_url
+from playbook_tracker import PlaybookRunTracker
+
+
+def run_record(run_id: int, status: str, update_time: str) -> dict:
+    return {"id": run_id, "container": 7, "status": status, "update_time": update_time}
+
+
+def run_queries(phantom) -> list[dict]:
+    return [
+        parse_qs(urlsplit(encoded_url(call)).query)
+        for call in phantom.session.get.call_args_list
+        if call.kwargs["url"].endswith("rest/playbook_run")
+    ]
+
+
+def test_poll_sends_the_update_time_filter_encoded_once(client):
+    phantom = client(lambda method, url, params, body: {"data": [run_record(1, "running", "2026-10-19T10:00:00.000Z")]})
+    tracker = PlaybookRunTracker(phantom, Container(id=7), poll_interval=0)
+    tracker.track(1, Playbook(name="triage"))
+
+    tracker.poll()
+    tracker.poll()
+
+    first, second = run_queries(phantom)
+    assert "_filter_update_time__gte" not in first
+    assert first["_filter_container"] == ["7"]
+    assert second["_filter_update_time__gte"] == ['"2026-10-19T10:00:00.000Z"']
+    assert second["sort"] == ["update_time"]
+
+
+def test_wait_finishes_runs_reported_after_the_first_tick(client):
+    ticks: list[list[dict]] = [
+        [run_record(1, "running", "2026-10-19T10:00:00.000Z")],
+        [run_record(1, "running", "2026-10-19T10:00:00.000Z")],
+        [run_record(1, "success", "2026-10-19T10:00:05.000Z")],
+    ]
+
+    def handler(method: str, url: str, params: dict, body: dict) -> dict:
+        if url.endswith("action_run"):
+            return {"data": [{"id": 11, "playbook_run": 1, "status": "success"}]}
+        records: list[dict] = ticks.pop(0) if ticks else []
+        if "_filter_update_time__gte" not in params:
+            return {"data": records}
+        # The server decodes the JSON filter value, a value that isn't a timestamp matches no record
+        try:
+            since: datetime = datetime.fromisoformat(json.loads(params["_filter_update_time__gte"]))
+        except ValueError:
+            return {"data": []}
+        return {"data": [record for record in records if datetime.fromisoformat(record["update_time"]) >= since]}
+
+    phantom = client(handler)
+    playbook: Playbook = Playbook(name="triage")
+    tracker = PlaybookRunTracker(phantom, Container(id=7), poll_interval=0)
+    finished: list = []
+    tracker.track(1, playbook, on_complete=finished.append)
+
+    tracker.wait(timeout=5)
+
+    assert [run.run_id for run in finished] == [1]
+    assert playbook.status == "success"
+    assert tracker.runs[1].actions == {11: "success"}
@@ -0,0 +1,122 @@
+import json
+from types import SimpleNamespace
+import pytest
+from behave.parser import parse_feature
+from soarsdk.objects import Container, Playbook
+from exceptions import PreflightFailed
+from preflight import Preflight, references
+
+PLAYBOOKS: list[dict] = [
+    {"id": 11, "name": "triage", "scm": 1},
+    {"id": 12, "name": "triage", "scm": 2},
+    {"id": 13, "name": "enrich", "scm": 1},
+]
+REPOSITORIES: list[dict] = [{"id": 1, "name": "local"}, {"id": 2, "name": "community"}]
+
+FEATURE: str = """
+Feature: Triage
+
+  Scenario: Known playbooks
+    Given the playbook "enrich" on a "events" container
+    Given the playbook "local/triage" on a "events" container
+
+  Scenario: Unknown names
+    Given the playbook "missing_playbook" on a "unknown_label" container
+"""
+
+
+@references(playbooks="playbook_name", labels="label")
+def configure_playbook(context, playbook_name, label): ...
+
+
+def soar(client, queries: list):
+    def handler(method, url, params, body):
+        endpoint: str = url.split("rest/")[1].rstrip("?")
+        queries.append(endpoint)
+        if endpoint == "playbook":
+            names: list[str] = json.loads(params["_filter_name__in"])
+            return {"data": [record for record in PLAYBOOKS if record["name"] in names]}
+        if endpoint == "scm":
+            return {"data": REPOSITORIES}
+        if endpoint == "system_settings/events":
+            return {"label": ["events", "incidents"]}
+        return {"data": []}
+
+    return client(handler)
+
+
+def step_context() -> SimpleNamespace:
+    """Matches every step to configure_playbook with the quoted values as its arguments"""
+
+    def find_match(step):
+        playbook_name, label = step.name.split('"')[1::2]
+        arguments: dict = {"playbook_name": playbook_name, "label": label}
+        return SimpleNamespace(
+            func=configure_playbook,
+            arguments=[SimpleNamespace(name=name, value=value) for name, value in arguments.items()],
+        )
+
+    return SimpleNamespace(config=None, _runner=SimpleNamespace(step_registry=SimpleNamespace(find_match=find_match)))
+
+
+def test_repository_names_are_matched_against_the_scm_ids(client):
+    queries: list[str] = []
+    preflight: Preflight = Preflight()
+
+    missing: list[str] = preflight.resolve_playbooks(
+        soar(client, queries), ["local/triage", "community/triage", "enrich", "other/triage"]
+    )
+
+    assert missing == ["other/triage"]
+    assert preflight.playbook_ids == {"local/triage": 11, "community/triage": 12, "enrich": 13}
+    assert queries == ["playbook", "scm"]
+
+
+def test_names_in_several_repositories_are_left_to_the_server(client):
+    queries: list[str] = []
+    preflight: Preflight = Preflight()
+
+    missing: list[str] = preflight.resolve_playbooks(soar(client, queries), ["triage", "enrich"])
+
+    assert missing == []
+    assert preflight.ambiguous == {"triage"} and "triage" not in preflight.playbook_ids
+    assert preflight.playbook_names == {11: "triage", 12: "triage", 13: "enrich"}
+    # Without a repository in any name, the repositories aren't listed
+    assert queries == ["playbook"]
+
+
+def test_resolved_names_are_not_queried_again(client):
+    queries: list[str] = []
+    phantom = soar(client, queries)
+    preflight: Preflight = Preflight()
+    preflight.resolve_playbooks(phantom, ["enrich"])
+
+    assert preflight.resolve_playbooks(phantom, ["enrich"]) == []
+    assert queries == ["playbook"]
+
+
+def test_missing_names_raise_before_any_container_is_created(client):
+    queries: list[str] = []
+    features = [parse_feature(FEATURE)]
+
+    with pytest.raises(PreflightFailed) as failure:
+        Preflight().run(step_context(), soar(client, queries), features)
+
+    message: str = str(failure.value)
+    assert 'playbook "missing_playbook"' in message and 'container label "unknown_label"' in message
+    assert "enrich" not in message and "events" not in message
+    assert "container" not in queries
+
+
+def test_known_names_pass_and_are_started_by_id(client):
+    features = [parse_feature(FEATURE)]
+    features[0].scenarios[1].skip()
+
+    preflight: Preflight = Preflight().run(step_context(), soar(client, []), features)
+
+    container: Container = Container(playbooks=[Playbook(name="local/triage"), Playbook(name="unchecked")])
+    preflight.apply(container)
+
+    assert preflight.playbook_ids == {"enrich": 13, "local/triage": 11}
+    assert [playbook.playbook_id for playbook in container.playbooks] == [11, None]
+    assert preflight.metrics()["labels_checked"] is True and preflight.metrics()["runs_started_by_id"] == 1
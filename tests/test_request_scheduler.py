@@ -0,0 +1,182 @@
+import io
+import json
+import threading
+import time
+from typing import Optional
+from unittest import mock
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+from conftest import json_response
+import request_scheduler
+from request_scheduler import (
+    BULK_PRIORITY,
+    DEFAULT_PRIORITY,
+    POLL_PRIORITY,
+    RequestScheduler,
+    TokenBucket,
+    install,
+)
+
+URL: str = "https://soar.example/rest/"
+
+
+class Clock:
+    def __init__(self):
+        self.now: float = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> Clock:
+    fake: Clock = Clock()
+    with mock.patch.object(request_scheduler.time, "time", fake):
+        yield fake
+
+
+def status_response(status: int, retry_after: Optional[str] = None) -> requests.Response:
+    response: requests.Response = json_response({})
+    response.status_code = status
+    response.raw = io.BytesIO()
+    if retry_after:
+        response.headers["Retry-After"] = retry_after
+    return response
+
+
+def scheduled_session(scheduler: RequestScheduler, *responses):
+    """Session routed through the scheduler whose adapter answers with the responses in order"""
+    session: requests.Session = requests.Session()
+    install(session, scheduler)
+    send = mock.patch.object(HTTPAdapter, "send", side_effect=list(responses))
+    sleep = mock.patch.object(request_scheduler.time, "sleep")
+    return session, send, sleep
+
+
+def test_bucket_refills_at_its_rate(clock):
+    bucket: TokenBucket = TokenBucket(rate=2, capacity=2)
+
+    assert [bucket.try_acquire() for _ in range(2)] == [0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.try_acquire() == 0.0
+    clock.now += 60
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, pytest.approx(0.5)]
+
+
+def test_state_file_shares_the_bucket_between_processes(clock, tmp_path):
+    state_file: str = str(tmp_path / "bucket.json")
+    first: TokenBucket = TokenBucket(rate=1, capacity=2, state_file=state_file)
+    second: TokenBucket = TokenBucket(rate=1, capacity=2, state_file=state_file)
+
+    assert first.try_acquire() == 0.0
+    assert second.try_acquire() == 0.0
+    assert first.try_acquire() == pytest.approx(1.0)
+    with open(state_file) as state:
+        assert json.load(state) == {"tokens": 0.0, "updated": clock.now}
+    clock.now += 1
+    assert second.try_acquire() == 0.0
+
+
+@pytest.mark.parametrize(
+    "method, endpoint, priority",
+    [
+        ("GET", "playbook_run/12", POLL_PRIORITY),
+        ("GET", "action_run", POLL_PRIORITY),
+        ("GET", "container/3", DEFAULT_PRIORITY),
+        ("POST", "playbook_run", DEFAULT_PRIORITY),
+        ("POST", "artifact", BULK_PRIORITY),
+        ("POST", "container", BULK_PRIORITY),
+    ],
+)
+def test_priority_of_endpoints(method, endpoint, priority):
+    request: requests.PreparedRequest = requests.Request(method, URL + endpoint).prepare()
+
+    assert RequestScheduler(rate=10).priority(request) == priority
+
+
+def test_waiting_requests_are_released_by_priority():
+    scheduler: RequestScheduler = RequestScheduler(rate=10)
+    released: list[int] = []
+    opened: threading.Event = threading.Event()
+
+    def try_acquire() -> float:
+        # Called by the request first in line only
+        if not opened.is_set():
+            return 0.01
+        released.append(scheduler._waiting[0][0])
+        return 0.0
+
+    scheduler.bucket.try_acquire = try_acquire
+    threads: list[threading.Thread] = []
+    for priority in (BULK_PRIORITY, DEFAULT_PRIORITY, POLL_PRIORITY, BULK_PRIORITY, POLL_PRIORITY):
+        threads.append(threading.Thread(target=scheduler.acquire, args=(priority,)))
+        threads[-1].start()
+    while scheduler.queue_depth < len(threads):
+        time.sleep(0.001)
+    opened.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert released == [POLL_PRIORITY, POLL_PRIORITY, DEFAULT_PRIORITY, BULK_PRIORITY, BULK_PRIORITY]
+    assert scheduler.metrics()["requests"] == 5 and scheduler.max_queue_depth == 5
+
+
+def test_backoff_uses_full_jitter_up_to_the_cap():
+    scheduler: RequestScheduler = RequestScheduler(rate=10, backoff_base=0.5, backoff_cap=3)
+
+    with mock.patch.object(request_scheduler.random, "uniform", side_effect=lambda low, high: high) as uniform:
+        delays: list[float] = [scheduler.backoff(attempt) for attempt in range(5)]
+
+    assert [call.args for call in uniform.call_args_list] == [(0, 0.5), (0, 1.0), (0, 2.0), (0, 3), (0, 3)]
+    assert delays == [0.5, 1.0, 2.0, 3, 3]
+    assert 0 <= scheduler.backoff(10) <= 3
+
+
+def test_idempotent_requests_are_retried_honouring_retry_after():
+    scheduler: RequestScheduler = RequestScheduler(rate=1000, backoff_base=0.5)
+    session, send, sleep = scheduled_session(
+        scheduler, status_response(503), status_response(429, retry_after="7"), status_response(200)
+    )
+
+    with send as adapter_send, sleep as slept:
+        response: requests.Response = session.get(URL + "container/3")
+
+    assert response.status_code == 200
+    assert adapter_send.call_count == 3
+    first, second = [call.args[0] for call in slept.call_args_list]
+    assert 0 <= first <= 0.5 and second >= 7
+    assert scheduler.metrics()["retries"] == 2 and scheduler.metrics()["throttled"] == 2
+
+
+def test_retries_stop_after_max_retries():
+    scheduler: RequestScheduler = RequestScheduler(rate=1000, max_retries=2)
+    session, send, sleep = scheduled_session(scheduler, *[status_response(502) for _ in range(3)])
+
+    with send as adapter_send, sleep:
+        response: requests.Response = session.get(URL + "container/3")
+
+    assert response.status_code == 502 and adapter_send.call_count == 3
+
+
+def test_posts_are_not_retried():
+    scheduler: RequestScheduler = RequestScheduler(rate=1000)
+    session, send, sleep = scheduled_session(scheduler, status_response(500))
+
+    with send as adapter_send, sleep as slept:
+        response: requests.Response = session.post(URL + "container", json={"name": "test"})
+
+    assert response.status_code == 500
+    assert adapter_send.call_count == 1 and not slept.called
+    assert scheduler.metrics()["retries"] == 0 and scheduler.metrics()["throttled"] == 1
+
+
+def test_posts_are_not_retried_after_a_connection_error():
+    scheduler: RequestScheduler = RequestScheduler(rate=1000)
+    session, send, sleep = scheduled_session(scheduler, requests.exceptions.ConnectionError("reset"))
+
+    with send as adapter_send, sleep, pytest.raises(requests.exceptions.ConnectionError):
+        session.post(URL + "artifact", json={"name": "test"})
+
+    assert adapter_send.call_count == 1
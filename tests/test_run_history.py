@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+from typing import Optional
+from behave.model_core import Status
+from run_history import ERROR_LENGTH, RunHistory, days_ago, format_rows, main
+
+
+def finished(name: str, duration: float, status: Status = Status.passed) -> SimpleNamespace:
+    error: Optional[str] = "x" * (ERROR_LENGTH + 10) if status == Status.failed else None
+    steps: list[SimpleNamespace] = [
+        SimpleNamespace(keyword="Given", name="a new container", status=Status.passed, duration=0.5, error_message=None),
+        SimpleNamespace(keyword="Then", name="it is closed", status=status, duration=duration - 0.5, error_message=error),
+    ]
+    return SimpleNamespace(filename="triage.feature", name=name, status=status, duration=duration, all_steps=steps)
+
+
+def record(history: RunHistory, name: str, duration: float, days: float = 0, status: Status = Status.passed) -> None:
+    scenario_id: int = history.record_scenario(f"triage.feature::{name}", finished(name, duration, status))
+    if days:
+        with history.connection:
+            history.connection.execute(
+                "UPDATE scenarios SET recorded_at = ? WHERE id = ?", (days_ago(days), scenario_id)
+            )
+
+
+def test_record_scenario_stores_steps_and_playbook_runs(tmp_path):
+    history: RunHistory = RunHistory(str(tmp_path / "history.sqlite"))
+    history.start_run("nightly", ["--tags", "triage"])
+    metrics: dict = {
+        "container_ids": [3],
+        "api_calls": 12,
+        "playbook_durations": [{"playbook": "triage", "status": "success", "seconds": 4.2}],
+    }
+
+    history.record_scenario("triage.feature::Blocked", finished("Blocked", 2.0, Status.failed), metrics)
+
+    scenario = history.connection.execute("SELECT * FROM scenarios").fetchone()
+    steps = history.connection.execute("SELECT * FROM steps ORDER BY position").fetchall()
+    playbooks = history.connection.execute("SELECT * FROM playbook_runs").fetchall()
+    assert (scenario["status"], scenario["api_calls"], scenario["container_ids"]) == ("failed", 12, "[3]")
+    assert [step["status"] for step in steps] == ["passed", "failed"]
+    assert steps[0]["error"] is None and len(steps[1]["error"]) == ERROR_LENGTH
+    assert [(playbook["playbook"], playbook["seconds"]) for playbook in playbooks] == [("triage", 4.2)]
+    history.close()
+
+
+def test_workers_with_the_same_label_share_a_run(tmp_path):
+    path: str = str(tmp_path / "history.sqlite")
+    first, second = RunHistory(path), RunHistory(path)
+
+    assert first.start_run("nightly") == second.start_run("nightly")
+    assert first.start_run("other") != second.run_id
+    first.close()
+    second.close()
+
+
+def test_slowest_averages_the_recent_runs(tmp_path):
+    history: RunHistory = RunHistory(str(tmp_path / "history.sqlite"))
+    history.start_run()
+    record(history, "Fast", 1.0)
+    record(history, "Slow", 4.0)
+    record(history, "Slow", 6.0, status=Status.failed)
+    record(history, "Old", 60.0, days=40)
+
+    rows = history.slowest(days=30)
+
+    assert [(row["scenario_key"], row["runs"], row["average"], row["failures"]) for row in rows] == [
+        ("triage.feature::Slow", 2, 5.0, 1),
+        ("triage.feature::Fast", 1, 1.0, 0),
+    ]
+    history.close()
+
+
+def test_regressed_compares_passing_runs_with_the_baseline(tmp_path):
+    history: RunHistory = RunHistory(str(tmp_path / "history.sqlite"))
+    history.start_run()
+    for days in (10, 20):
+        record(history, "Slower", 2.0, days=days)
+        record(history, "Steady", 3.0, days=days)
+    record(history, "Slower", 3.0)
+    record(history, "Steady", 3.0)
+    record(history, "Steady", 30.0, status=Status.failed)
+
+    rows = history.regressed(days=7, baseline_days=30)
+
+    assert [(row["scenario_key"], row["before"], row["after"], row["percent"]) for row in rows] == [
+        ("triage.feature::Slower", 2.0, 3.0, 50.0)
+    ]
+    history.close()
+
+
+def test_format_rows_aligns_the_columns(tmp_path):
+    history: RunHistory = RunHistory(str(tmp_path / "history.sqlite"))
+    history.start_run()
+    record(history, "Blocked domains", 2.5)
+
+    lines: list[str] = format_rows(history.slowest()).splitlines()
+
+    assert lines[0].split() == ["scenario_key", "runs", "average", "longest", "failures", "api_calls"]
+    assert lines[1].split()[:4] == ["triage.feature::Blocked", "domains", "1", "2.50"]
+    assert lines[0].index("runs") == lines[1].index(" 1 ") + 1
+    assert format_rows([]) == "No scenarios recorded for this period"
+    history.close()
+
+
+def test_command_line_reports_the_slowest_scenarios(tmp_path, capsys):
+    path: str = str(tmp_path / "history.sqlite")
+    history: RunHistory = RunHistory(path)
+    history.start_run()
+    record(history, "Blocked", 2.0)
+    history.close()
+
+    assert main([path, "slowest", "--days", "1"]) == 0
+    assert "triage.feature::Blocked" in capsys.readouterr().out
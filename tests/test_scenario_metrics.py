@@ -0,0 +1,53 @@
+import io
+import requests
+from requests.adapters import BaseAdapter
+from urllib3.response import HTTPResponse
+from scenario_metrics import ScenarioMetrics, response_size
+
+
+class ChunkedAdapter(BaseAdapter):
+    """Answers every request with a body sent without a Content-Length"""
+
+    def send(self, request, stream=False, **kwargs):
+        raw: HTTPResponse = HTTPResponse(body=io.BytesIO(b'{"data": []}'), status=200, preload_content=False)
+        response: requests.Response = requests.Response()
+        response.status_code = 200
+        response.raw = raw
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def session_with(metrics: ScenarioMetrics) -> requests.Session:
+    session: requests.Session = requests.Session()
+    session.mount("https://", ChunkedAdapter())
+    session.hooks["response"].append(metrics.on_response)
+    return session
+
+
+def test_streamed_bodies_are_left_for_the_caller():
+    metrics: ScenarioMetrics = ScenarioMetrics()
+
+    response: requests.Response = session_with(metrics).get("https://soar.example/rest/container/1/export", stream=True)
+
+    assert metrics.api_calls == 1 and metrics.bytes_downloaded == 0
+    assert b"".join(response.iter_content(4)) == b'{"data": []}'
+
+
+def test_bodies_that_are_not_streamed_are_measured():
+    metrics: ScenarioMetrics = ScenarioMetrics()
+
+    response: requests.Response = session_with(metrics).get("https://soar.example/rest/container")
+
+    assert metrics.bytes_downloaded == len(b'{"data": []}')
+    assert response.json() == {"data": []}
+
+
+def test_content_length_is_used_when_given():
+    response: requests.Response = requests.Response()
+    response.headers["Content-Length"] = "2048"
+    response.raw = io.BytesIO(b"")
+    assert response_size(response, stream=True) == 2048
@@ -0,0 +1,92 @@
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from exceptions import ScenarioTimeout
+from watchdog import ScenarioWatchdog, _raise_in
+
+
+def step(name: str) -> SimpleNamespace:
+    return SimpleNamespace(keyword="When", name=name)
+
+
+def test_a_step_over_its_limit_is_stopped_and_its_runs_cancelled():
+    watchdog: ScenarioWatchdog = ScenarioWatchdog(step_timeout=0.05, repeat_interval=0.05)
+    watchdog.start_scenario()
+    hung = step("the playbook hangs")
+    watchdog.arm(hung, cancel=lambda: [41, 42])
+
+    def hang() -> None:
+        deadline: float = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    with pytest.raises(ScenarioTimeout) as raised:
+        watchdog.call(hang)
+    timeout: dict = watchdog.disarm(hung)
+
+    assert timeout["limit"] == "step" and timeout["cancelled_runs"] == [41, 42]
+    assert "When the playbook hangs" in raised.value.details
+    assert watchdog.metrics() == {"timeouts": 1, "cancelled_runs": 2}
+
+
+def test_nested_steps_keep_the_outer_step_watched():
+    watchdog: ScenarioWatchdog = ScenarioWatchdog(step_timeout=60)
+    watchdog.start_scenario()
+    outer, inner = step("in the container \"a\", the action \"b\" is \"success\""), step("the action \"b\" is \"success\"")
+
+    assert watchdog.arm(outer, cancel=list)
+    assert not watchdog.arm(inner, cancel=list)
+    assert watchdog.disarm(inner) is None
+    assert watchdog._armed is outer and not watchdog._disarmed.is_set()
+
+    watchdog.disarm(outer)
+    assert watchdog._armed is None
+
+
+def test_disarm_clears_a_timeout_queued_but_not_raised():
+    watchdog: ScenarioWatchdog = ScenarioWatchdog(step_timeout=60)
+    watchdog.start_scenario()
+    finished: threading.Event = threading.Event()
+    raised: list = []
+    release: threading.Lock = threading.Lock()
+    release.acquire()
+
+    def step_thread():
+        try:
+            # Blocked in C, a queued exception is only raised once the thread runs Python code again
+            release.acquire()
+            for _ in range(1000):
+                pass
+        except ScenarioTimeout as error:
+            raised.append(error)
+        finished.set()
+
+    thread: threading.Thread = threading.Thread(target=step_thread)
+    thread.start()
+    watched = step("the step returns")
+    watchdog._armed, watchdog._thread_id, watchdog._disarmed = watched, thread.ident, threading.Event()
+    _raise_in(thread.ident, ScenarioTimeout)
+
+    watchdog.disarm(watched)
+    release.release()
+    thread.join(5)
+
+    assert finished.is_set() and raised == []
+
+
+def test_timeouts_are_only_raised_while_a_step_definition_runs():
+    watchdog: ScenarioWatchdog = ScenarioWatchdog(step_timeout=0.05, repeat_interval=0.01)
+    watchdog.start_scenario()
+    returned = step("the step returns before its hooks finish")
+    watchdog.arm(returned, cancel=list)
+
+    watchdog.call(lambda: None)
+    # Behave's own code and the after_step hook run here, past the limit and several repeat intervals
+    deadline: float = time.monotonic() + 0.3
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+    timeout: dict = watchdog.disarm(returned)
+
+    assert timeout["step"] == "When the step returns before its hooks finish"
+    assert watchdog.metrics()["timeouts"] == 1